@@ -0,0 +1,3 @@
+"""
+性能測定用のベンチマーク（外部APIのローカル代替サーバーとシナリオ実行）
+"""
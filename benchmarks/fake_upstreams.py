@@ -0,0 +1,623 @@
+"""
+ベンチマーク用の外部APIローカル代替サーバー
+
+- OpenAI互換サーバー: Azure OpenAI の chat completions と OpenAI の images/generations
+  （画像は固定の 1024x1536 PNG、応答遅延は設定可能）
+- Supabase互換サーバー: PostgREST（インメモリのテーブル）と Storage
+  アプリが使う範囲のクエリ（select・埋め込み・eq/in/or などのフィルター・order・limit/offset・
+  count=exact・insert/update/delete）と reserve_order_id_block RPC に対応する。
+  未実装のRPC・ビューは PostgREST と同じく404を返すため、アプリ側のフォールバック経路で動作する
+
+単体起動（手動確認用）:
+    python -m benchmarks.fake_upstreams --openai-port 18001 --supabase-port 18002
+"""
+import io
+import json
+import time
+import uuid
+import base64
+import random
+import argparse
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from PIL import Image, ImageDraw
+
+IMAGE_BUCKET = 'cocktail-images'
+
+# テーブル -> 主キーの種類（uuid または serial）
+_ID_TYPES = {
+    'events': 'uuid',
+    'cocktails': 'uuid',
+    'surveys': 'uuid',
+    'survey_questions': 'uuid',
+    'survey_question_options': 'uuid',
+    'survey_responses': 'uuid',
+    'survey_answers': 'uuid',
+}
+# マイグレーションで作成されるテーブル（ビュー・未作成の関数は404になる）
+_TABLES = [
+    'events', 'cocktails', 'poured_cocktails', 'prompts', 'cocktail_prompts',
+    'violation_reports', 'violation_report_counters',
+    'surveys', 'survey_questions', 'survey_question_options', 'survey_responses', 'survey_answers',
+    'survey_statistics_summary', 'survey_question_statistics', 'survey_option_statistics',
+]
+# 一意制約（違反時は PostgREST と同じく 409 / 23505 を返す）
+_UNIQUE_COLUMNS = {'cocktails': ['order_id']}
+# 埋め込み（親テーブル, 埋め込み名）-> (親の列, 子の列, 配列で返すか)
+_RELATIONS = {
+    ('cocktail_prompts', 'prompts'): ('prompt_id', 'id', False),
+    ('surveys', 'survey_questions'): ('id', 'survey_id', True),
+    ('survey_questions', 'survey_question_options'): ('id', 'question_id', True),
+    ('survey_questions', 'survey_question_statistics'): ('id', 'question_id', False),
+    ('survey_question_options', 'survey_option_statistics'): ('id', 'option_id', False),
+    ('survey_responses', 'survey_answers'): ('id', 'response_id', True),
+}
+
+
+def make_png(width: int, height: int) -> bytes:
+    """透過背景の中央にグラデーションとノイズの図形を置いたRGBA PNG（生成画像に近い圧縮率にする）"""
+    red = Image.linear_gradient('L').resize((width, height))
+    green = red.transpose(Image.Transpose.FLIP_TOP_BOTTOM)
+    blue = Image.effect_noise((width, height), 24)
+    mask = Image.new('L', (width, height), 0)
+    ImageDraw.Draw(mask).ellipse((width // 5, height // 6, width * 4 // 5, height * 5 // 6), fill=255)
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    image.paste(Image.merge('RGB', (red, green, blue)), mask=mask)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# PostgRESTのクエリ解釈
+
+def _split_top_level(text: str) -> List[str]:
+    """括弧と引用符の外側のカンマで分割"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+
+def _unquote_value(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _compare(left: Any, right: str) -> Optional[int]:
+    if left is None:
+        return None
+    if isinstance(left, (int, float)) and not isinstance(left, bool):
+        try:
+            right_number = float(right)
+        except ValueError:
+            return None
+        return (left > right_number) - (left < right_number)
+    left = _as_text(left)
+    return (left > right) - (left < right)
+
+
+def _match(row: Dict[str, Any], column: str, expression: str) -> bool:
+    """1列の条件（"eq.1", "in.(a,b)", "not.is.null" など）を評価"""
+    negate = expression.startswith('not.')
+    if negate:
+        expression = expression[4:]
+    operator, _, operand = expression.partition('.')
+    value = row.get(column)
+    if operator == 'eq':
+        result = _as_text(value) == _unquote_value(operand)
+    elif operator == 'neq':
+        result = _as_text(value) != _unquote_value(operand)
+    elif operator in ('gt', 'gte', 'lt', 'lte'):
+        compared = _compare(value, _unquote_value(operand))
+        result = compared is not None and {
+            'gt': compared > 0, 'gte': compared >= 0, 'lt': compared < 0, 'lte': compared <= 0,
+        }[operator]
+    elif operator == 'in':
+        candidates = {_unquote_value(item) for item in _split_top_level(operand.strip('()'))}
+        result = _as_text(value) in candidates
+    elif operator == 'is':
+        result = _as_text(value) == operand
+    elif operator == 'cs':
+        wanted = {_unquote_value(item) for item in _split_top_level(operand.strip('{}'))}
+        result = wanted <= {_as_text(item) for item in (value or [])}
+    else:
+        raise ValueError(f"unsupported operator: {operator}")
+    return not result if negate else result
+
+
+def _match_logical(row: Dict[str, Any], operator: str, conditions: str) -> bool:
+    """or=(...) / and=(...) の条件を評価（入れ子の and(...) / or(...) にも対応）"""
+    results = []
+    for condition in _split_top_level(conditions.strip()[1:-1]):
+        if condition.startswith(('and(', 'or(')):
+            nested_operator, _, rest = condition.partition('(')
+            results.append(_match_logical(row, nested_operator, '(' + rest))
+        else:
+            column, _, expression = condition.partition('.')
+            results.append(_match(row, column, expression))
+    return any(results) if operator == 'or' else all(results)
+
+
+def _parse_select(select: str) -> List[Tuple[str, Optional[str]]]:
+    """select 句を (列名, 埋め込みのselect) のリストに分解"""
+    items = []
+    for part in _split_top_level(select or '*'):
+        if '(' in part:
+            name, _, rest = part.partition('(')
+            items.append((name.strip(), rest[:-1]))
+        else:
+            items.append((part.strip(), None))
+    return items
+
+
+class FakeDatabase:
+    """PostgRESTの代わりに使うインメモリのテーブル群"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {table: [] for table in _TABLES}
+        self.serials: Dict[str, int] = {}
+        self.order_id_sequence = 0
+        self.lock = threading.Lock()
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(table, [])
+
+    def _fill_defaults(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        if row.get('id') is None:
+            if _ID_TYPES.get(table) == 'uuid':
+                row['id'] = str(uuid.uuid4())
+            else:
+                self.serials[table] = self.serials.get(table, 0) + 1
+                row['id'] = self.serials[table]
+        row.setdefault('created_at', _now())
+        if table == 'survey_responses':
+            row.setdefault('submitted_at', row['created_at'])
+        return row
+
+    def insert(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """行を追加（一意制約違反は ValueError('23505')）"""
+        with self.lock:
+            existing = self.rows(table)
+            inserted = [self._fill_defaults(table, row) for row in rows]
+            for column in _UNIQUE_COLUMNS.get(table, []):
+                taken = {row.get(column) for row in existing}
+                for row in inserted:
+                    if row.get(column) in taken:
+                        raise ValueError('23505', f'duplicate key value violates unique constraint "{table}_{column}_key"')
+                    taken.add(row.get(column))
+            existing.extend(inserted)
+            return inserted
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> Tuple[List[Dict[str, Any]], int, int]:
+        """フィルター・並び替え・ページングを適用し (行, offset, 総件数) を返す"""
+        with self.lock:
+            rows = self._filter(self.rows(table), params)
+        total = len(rows)
+        options = dict(params)
+        for key in reversed(_split_top_level(options.get('order', ''))):
+            column, _, direction = key.partition('.')
+            descending = direction.startswith('desc')
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=descending)
+            rows = present + missing if not descending else missing + present
+        offset = int(options.get('offset', 0))
+        limit = options.get('limit')
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        select = _parse_select(options.get('select', '*'))
+        return [self._project(table, row, select) for row in rows], offset, total
+
+    def update(self, table: str, params: List[Tuple[str, str]], values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = self._filter(self.rows(table), params)
+            for row in rows:
+                row.update(values)
+            return [dict(row) for row in rows]
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self.lock:
+            removed = self._filter(self.rows(table), params)
+            removed_ids = {id(row) for row in removed}
+            self.tables[table] = [row for row in self.rows(table) if id(row) not in removed_ids]
+            return [dict(row) for row in removed]
+
+    def reserve_order_ids(self, count: int) -> List[int]:
+        with self.lock:
+            start = self.order_id_sequence + 1
+            self.order_id_sequence += count
+            return list(range(start, start + count))
+
+    @staticmethod
+    def _filter(rows: List[Dict[str, Any]], params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        conditions = [(key, value) for key, value in params if key not in ('select', 'order', 'limit', 'offset', 'columns')]
+        if not conditions:
+            return list(rows)
+        matched = []
+        for row in rows:
+            for key, value in conditions:
+                if key in ('or', 'and'):
+                    if not _match_logical(row, key, value):
+                        break
+                elif not _match(row, key, value):
+                    break
+            else:
+                matched.append(row)
+        return matched
+
+    def _project(self, table: str, row: Dict[str, Any], select: List[Tuple[str, Optional[str]]]) -> Dict[str, Any]:
+        projected: Dict[str, Any] = {}
+        for name, embedded_select in select:
+            if embedded_select is None:
+                if name == '*':
+                    projected.update(row)
+                else:
+                    projected[name] = row.get(name)
+                continue
+            relation = _RELATIONS.get((table, name))
+            if relation is None:
+                raise KeyError(f"relationship {table} -> {name} not found")
+            local_column, remote_column, many = relation
+            children = [
+                self._project(name, child, _parse_select(embedded_select))
+                for child in self.rows(name)
+                if _as_text(child.get(remote_column)) == _as_text(row.get(local_column))
+            ]
+            projected[name] = children if many else (children[0] if children else None)
+        return projected
+
+
+@dataclass
+class SeedData:
+    """シナリオで使う初期データのID"""
+    event_id: str
+    survey_id: str
+    order_ids: List[str] = field(default_factory=list)
+
+
+def seed(database: FakeDatabase, storage: Dict[str, bytes], cocktails: int = 50, survey_responses: int = 200) -> SeedData:
+    """イベント・アンケート（集計サマリー込み）・カクテルと画像を投入"""
+    rng = random.Random(42)
+    event = database.insert('events', [{'name': 'ベンチマークイベント', 'is_active': True}])[0]
+    survey = database.insert('surveys', [{
+        'event_id': event['id'], 'title': 'ベンチマークアンケート', 'is_active': True
+    }])[0]
+
+    questions = database.insert('survey_questions', [
+        {'survey_id': survey['id'], 'question_type': 'single_choice', 'question_text': '今日の気分は？', 'is_required': True, 'display_order': 1},
+        {'survey_id': survey['id'], 'question_type': 'multiple_choice', 'question_text': '好きな味は？', 'is_required': False, 'display_order': 2},
+        {'survey_id': survey['id'], 'question_type': 'text', 'question_text': '最近あった出来事', 'is_required': False, 'display_order': 3},
+    ])
+    options: Dict[str, List[Dict[str, Any]]] = {}
+    for question, texts in zip(questions[:2], [['元気', '普通', '疲れ気味', 'わくわく'], ['甘い', '酸っぱい', '苦い', 'フルーティー', 'ハーブ']]):
+        options[question['id']] = database.insert('survey_question_options', [
+            {'question_id': question['id'], 'option_text': text, 'display_order': index + 1}
+            for index, text in enumerate(texts)
+        ])
+
+    # 回答とトリガーで更新されるサマリーテーブル
+    option_counts: Dict[str, int] = {}
+    text_samples: List[str] = []
+    for index in range(survey_responses):
+        response = database.insert('survey_responses', [{'survey_id': survey['id']}])[0]
+        single = rng.choice(options[questions[0]['id']])
+        multiple = rng.sample(options[questions[1]['id']], rng.randint(1, 3))
+        text = f"ベンチマーク回答{index}"
+        database.insert('survey_answers', [
+            {'response_id': response['id'], 'question_id': questions[0]['id'], 'selected_option_ids': [single['id']]},
+            {'response_id': response['id'], 'question_id': questions[1]['id'], 'selected_option_ids': [option['id'] for option in multiple]},
+            {'response_id': response['id'], 'question_id': questions[2]['id'], 'answer_text': text},
+        ])
+        for option in [single] + multiple:
+            option_counts[option['id']] = option_counts.get(option['id'], 0) + 1
+        text_samples.insert(0, text)
+    database.insert('survey_statistics_summary', [{'survey_id': survey['id'], 'total_responses': survey_responses}])
+    database.insert('survey_question_statistics', [
+        {'question_id': question['id'], 'survey_id': survey['id'], 'answered_count': survey_responses,
+         'text_samples': text_samples[:100] if question['question_type'] == 'text' else []}
+        for question in questions
+    ])
+    database.insert('survey_option_statistics', [
+        {'option_id': option['id'], 'question_id': question_id, 'selected_count': option_counts.get(option['id'], 0)}
+        for question_id, question_options in options.items()
+        for option in question_options
+    ])
+
+    # カクテルと保存済み画像（アプリが保存する 720x1080 と同じサイズ）
+    image = make_png(720, 1080)
+    started_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    seed_data = SeedData(event_id=event['id'], survey_id=survey['id'])
+    for index in range(cocktails):
+        order_id = str(900000 + index)
+        row = database.insert('cocktails', [{
+            'order_id': order_id,
+            'event_id': event['id'],
+            'status': 200,
+            'name': f"シードカクテル{index}",
+            'flavor_ratio1': '40%', 'flavor_ratio2': '30%', 'flavor_ratio3': '20%', 'flavor_ratio4': '10%',
+            'comment': 'ベンチマーク用のカクテル',
+            'is_visible': True,
+            'copyright_confirmed': True,
+            'violation_reports_count': 0,
+            'created_at': (started_at + timedelta(seconds=index)).isoformat(),
+        }])[0]
+        storage[f"{IMAGE_BUCKET}/cocktails/{row['id']}.png"] = image
+        seed_data.order_ids.append(order_id)
+    return seed_data
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    """JSON応答の共通処理（HTTP/1.1 keep-alive）"""
+
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーとボディを別々に書き込むため、Nagleアルゴリズムによる遅延を避ける
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None, raw: Optional[bytes] = None, content_type: str = 'application/json') -> None:
+        body = raw if raw is not None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+
+def make_openai_handler(llm_delay: float, image_delay: float, image_size: Tuple[int, int] = (1024, 1536)) -> type:
+    """Azure OpenAI chat completions / OpenAI images generations の代替ハンドラ"""
+    image_b64 = base64.b64encode(make_png(*image_size)).decode('ascii')
+    counter = {'value': 0}
+    counter_lock = threading.Lock()
+
+    class OpenAIHandler(_JsonHandler):
+        def do_POST(self):
+            self._body()
+            path = urlsplit(self.path).path
+            if path.endswith('/chat/completions'):
+                time.sleep(llm_delay)
+                with counter_lock:
+                    counter['value'] += 1
+                    number = counter['value']
+                recipe = {
+                    'cocktail_name': f"ミッドナイト・ハーバー{number}",
+                    'concept': '港の夜景をイメージした爽やかな一杯',
+                    'color': {'name': '深い青', 'target_rgb': '30,60,150'},
+                    'recipe': [
+                        {'syrup': 'ベリー', 'ratio': '40%'},
+                        {'syrup': '青りんご', 'ratio': '30%'},
+                        {'syrup': 'シトラス', 'ratio': '20%'},
+                        {'syrup': 'ホワイト', 'ratio': '10%'},
+                    ],
+                }
+                self._send(200, {
+                    'id': f"chatcmpl-{number}",
+                    'object': 'chat.completion',
+                    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {
+                        'role': 'assistant', 'content': json.dumps(recipe, ensure_ascii=False)
+                    }}],
+                    'usage': {'prompt_tokens': 800, 'completion_tokens': 150, 'total_tokens': 950},
+                })
+            elif path.endswith('/images/generations'):
+                time.sleep(image_delay)
+                self._send(200, {'created': int(time.time()), 'data': [{'b64_json': image_b64}]})
+            else:
+                self._send(404, {'error': {'message': f"unknown path {path}"}})
+
+    return OpenAIHandler
+
+
+def make_supabase_handler(database: FakeDatabase, storage: Dict[str, bytes], db_delay: float, storage_delay: float) -> type:
+    """PostgREST / Storage の代替ハンドラ"""
+    storage_lock = threading.Lock()
+
+    class SupabaseHandler(_JsonHandler):
+        def _route(self) -> None:
+            url = urlsplit(self.path)
+            if url.path.startswith('/rest/v1/'):
+                time.sleep(db_delay)
+                self._postgrest(url.path[len('/rest/v1/'):], parse_qsl(url.query, keep_blank_values=True))
+            elif url.path.startswith('/storage/v1/object/'):
+                time.sleep(storage_delay)
+                self._storage(unquote(url.path[len('/storage/v1/object/'):]))
+            else:
+                self._send(404, {'message': 'not found'})
+
+        do_GET = do_POST = do_PATCH = do_DELETE = do_PUT = do_HEAD = _route
+
+        def _postgrest_error(self, status: int, code: str, message: str) -> None:
+            self._send(status, {'code': code, 'message': message, 'details': None, 'hint': None})
+
+        def _postgrest(self, resource: str, params: List[Tuple[str, str]]) -> None:
+            body = self._body()
+            if resource.startswith('rpc/'):
+                arguments = json.loads(body or b'{}')
+                if resource == 'rpc/reserve_order_id_block':
+                    self._send(200, database.reserve_order_ids(int(arguments.get('p_count', 20))))
+                else:
+                    self._postgrest_error(404, 'PGRST202', f"Could not find the function public.{resource[4:]}")
+                return
+            if resource not in database.tables:
+                self._postgrest_error(404, '42P01', f'relation "public.{resource}" does not exist')
+                return
+            try:
+                if self.command in ('GET', 'HEAD'):
+                    rows, offset, total = database.select(resource, params)
+                    headers = {}
+                    if 'count=' in (self.headers.get('Prefer') or ''):
+                        headers['Content-Range'] = f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}"
+                    self._send(200, rows, headers)
+                elif self.command == 'POST':
+                    payload = json.loads(body)
+                    self._send(201, database.insert(resource, payload if isinstance(payload, list) else [payload]))
+                elif self.command == 'PATCH':
+                    self._send(200, database.update(resource, params, json.loads(body)))
+                elif self.command == 'DELETE':
+                    self._send(200, database.delete(resource, params))
+                else:
+                    self._postgrest_error(405, 'PGRST117', f"unsupported method {self.command}")
+            except ValueError as e:
+                if e.args and e.args[0] == '23505':
+                    self._postgrest_error(409, '23505', e.args[1])
+                else:
+                    self._postgrest_error(400, 'PGRST100', str(e))
+            except KeyError as e:
+                self._postgrest_error(400, 'PGRST200', str(e))
+
+        def _storage(self, path: str) -> None:
+            if path.startswith(('public/', 'authenticated/')):
+                path = path.split('/', 1)[1]
+            if self.command in ('POST', 'PUT'):
+                body = self._body()
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('multipart/'):
+                    message = BytesParser().parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + body)
+                    for part in message.get_payload():
+                        if part.get_param('name', header='content-disposition') == 'file':
+                            body = part.get_payload(decode=True)
+                with storage_lock:
+                    if self.command == 'POST' and path in storage and self.headers.get('x-upsert') != 'true':
+                        self._send(400, {'statusCode': '409', 'error': 'Duplicate', 'message': 'The resource already exists'})
+                        return
+                    storage[path] = body
+                self._send(200, {'Key': path, 'Id': str(uuid.uuid4())})
+            elif self.command in ('GET', 'HEAD'):
+                data = storage.get(path)
+                if data is None:
+                    self._send(400, {'statusCode': '404', 'error': 'not_found', 'message': 'Object not found'})
+                else:
+                    self._send(200, raw=data, content_type='image/png')
+            else:
+                self._send(405, {'message': 'method not allowed'})
+
+    return SupabaseHandler
+
+
+class FakeUpstreams:
+    """OpenAI互換・Supabase互換サーバーをバックグラウンドスレッドで起動"""
+
+    def __init__(
+        self,
+        openai_port: int = 0,
+        supabase_port: int = 0,
+        llm_delay: float = 1.0,
+        image_delay: float = 3.0,
+        db_delay: float = 0.005,
+        storage_delay: float = 0.01,
+        cocktails: int = 50,
+        survey_responses: int = 200,
+    ):
+        self.database = FakeDatabase()
+        self.storage: Dict[str, bytes] = {}
+        self.seed = seed(self.database, self.storage, cocktails, survey_responses)
+        self._servers = [
+            ThreadingHTTPServer(('127.0.0.1', openai_port), make_openai_handler(llm_delay, image_delay)),
+            ThreadingHTTPServer(('127.0.0.1', supabase_port), make_supabase_handler(self.database, self.storage, db_delay, storage_delay)),
+        ]
+        for server in self._servers:
+            server.daemon_threads = True
+
+    @property
+    def openai_url(self) -> str:
+        return f"http://127.0.0.1:{self._servers[0].server_address[1]}"
+
+    @property
+    def supabase_url(self) -> str:
+        return f"http://127.0.0.1:{self._servers[1].server_address[1]}"
+
+    def app_environment(self) -> Dict[str, str]:
+        """アプリをこの代替サーバーに向けるための環境変数"""
+        return {
+            'SUPABASE_URL': self.supabase_url,
+            'SUPABASE_SERVICE_ROLE_KEY': 'benchmark-service-role-key',
+            'AZURE_OPENAI_API_KEY_LLM': 'benchmark-llm-key',
+            'AZURE_OPENAI_ENDPOINT_LLM': self.openai_url,
+            'AZURE_OPENAI_ENDPOINT_LLM_MINI': f"{self.openai_url}/openai/deployments/mini/chat/completions",
+            'GPT_API_KEY': 'benchmark-image-key',
+            'IMAGE_API_URL': f"{self.openai_url}/v1/images/generations",
+        }
+
+    def start(self) -> 'FakeUpstreams':
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+
+def add_upstream_arguments(parser: argparse.ArgumentParser) -> None:
+    """代替サーバーの遅延・データ量の引数（run.py と共通）"""
+    parser.add_argument('--llm-delay', type=float, default=1.0, help='chat completions の応答遅延（秒）')
+    parser.add_argument('--image-delay', type=float, default=3.0, help='images/generations の応答遅延（秒）')
+    parser.add_argument('--db-delay', type=float, default=0.005, help='PostgRESTリクエストごとの遅延（秒）')
+    parser.add_argument('--storage-delay', type=float, default=0.01, help='Storageリクエストごとの遅延（秒）')
+    parser.add_argument('--cocktails', type=int, default=50, help='初期投入するカクテル件数')
+    parser.add_argument('--survey-responses', type=int, default=200, help='初期投入するアンケート回答件数')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='OpenAI / Supabase のローカル代替サーバー')
+    parser.add_argument('--openai-port', type=int, default=18001)
+    parser.add_argument('--supabase-port', type=int, default=18002)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        args.openai_port, args.supabase_port, args.llm_delay, args.image_delay,
+        args.db_delay, args.storage_delay, args.cocktails, args.survey_responses,
+    ).start()
+    print("代替サーバー起動中（Ctrl+Cで終了）。アプリ側の環境変数:")
+    for key, value in upstreams.app_environment().items():
+        print(f"export {key}={value}")
+    print(f"# event_id={upstreams.seed.event_id} survey_id={upstreams.seed.survey_id}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+
+if __name__ == '__main__':
+    main()
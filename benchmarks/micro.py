@@ -0,0 +1,322 @@
+"""
+CPU処理のマイクロベンチマーク（保存済みベースラインとの比較で性能劣化を検出）
+
+各ベンチマークは1回の呼び出しを繰り返し計測し、ラウンドごとの1回あたり時間の最小値を
+benchmarks/baselines/micro.json の値と比較する（中央値は他プロセスの影響で揺れやすいため、
+ノイズの影響を受けにくい最小値を使う）。しきい値を超えて遅くなった場合は終了コード1
+
+しきい値は設定値と、ベースライン・今回の計測それぞれのばらつき（標準偏差÷最小値）の
+NOISE_SIGMAS 倍のうち大きい方（ばらつきの大きいベンチマークは誤検出しないよう自動で緩める）
+
+例:
+    python -m benchmarks.micro                      # 計測してベースラインと比較
+    python -m benchmarks.micro --filter validate    # 名前に validate を含むものだけ
+    python -m benchmarks.micro --save-baseline      # 現在の結果をベースラインとして保存
+
+ベースラインは計測したマシンに依存するため、ハードウェアを変えた場合は保存し直す
+"""
+import os
+import sys
+import json
+import time
+import base64
+import platform
+import argparse
+import statistics
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# アプリのモジュールはimport時にSupabaseクライアントを作るため、未設定なら接続しないダミー値を使う
+# （計測対象はDBに接続しない処理のみ）
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_ANON_KEY', 'micro-benchmark')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPOSITORY_ROOT, 'benchmarks', 'baselines', 'micro.json')
+DEFAULT_THRESHOLD = 0.25
+NOISE_SIGMAS = 3.0
+
+
+@dataclass
+class MicroBenchmark:
+    """setup() が返す引数なしの関数を計測する"""
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    threshold: Optional[float] = None
+
+
+BENCHMARKS: List[MicroBenchmark] = []
+
+
+def micro_benchmark(name: str, threshold: Optional[float] = None) -> Callable:
+    """ベンチマークを登録するデコレータ（threshold 未指定時は --threshold の値）"""
+    def decorator(setup: Callable[[], Callable[[], Any]]) -> Callable[[], Callable[[], Any]]:
+        BENCHMARKS.append(MicroBenchmark(name, setup, threshold))
+        return setup
+    return decorator
+
+
+# 計測対象
+
+def _generated_image_base64() -> str:
+    """画像生成APIが返すのと同じ 1024x1536 PNG のbase64"""
+    from benchmarks.fake_upstreams import make_png
+    return base64.b64encode(make_png(1024, 1536)).decode('ascii')
+
+
+@micro_benchmark('image.crop_and_resize', threshold=0.3)
+def _crop_and_resize():
+    from utils.image_utils import crop_and_resize_base64_image
+    image_base64 = _generated_image_base64()
+    return lambda: crop_and_resize_base64_image(image_base64)
+
+
+@micro_benchmark('image.base64_decode')
+def _base64_decode():
+    image_base64 = _generated_image_base64()
+    return lambda: base64.b64decode(image_base64)
+
+
+@micro_benchmark('image.base64_encode')
+def _base64_encode():
+    image_bytes = base64.b64decode(_generated_image_base64())
+    return lambda: base64.b64encode(image_bytes).decode('utf-8')
+
+
+@micro_benchmark('text.validate_cocktail_name.pass')
+def _validate_name_pass():
+    from utils.text_utils import load_fusion_filter_words, validate_cocktail_name
+    filter_words = load_fusion_filter_words()
+    # フィルターを通過する名前は全単語と照合するため最も遅いケース
+    return lambda: validate_cocktail_name('ミッドナイト・ハーバー', filter_words)
+
+
+@micro_benchmark('text.validate_cocktail_name.generic')
+def _validate_name_generic():
+    from utils.text_utils import load_fusion_filter_words, validate_cocktail_name
+    filter_words = load_fusion_filter_words()
+    return lambda: validate_cocktail_name('本日のカクテル3', filter_words)
+
+
+@micro_benchmark('text.extract_json_from_text')
+def _extract_json():
+    from utils.text_utils import extract_json_from_text
+    recipe = {
+        'cocktail_name': 'ミッドナイト・ハーバー',
+        'concept': '港の夜景をイメージした爽やかな一杯。' * 5,
+        'color': {'name': '深い青', 'target_rgb': '30,60,150'},
+        'recipe': [
+            {'syrup': 'ベリー', 'ratio': '40%'},
+            {'syrup': '青りんご', 'ratio': '30%'},
+            {'syrup': 'シトラス', 'ratio': '20%'},
+            {'syrup': 'ホワイト', 'ratio': '10%'},
+        ],
+    }
+    text = "以下がレシピです。\n```json\n" + json.dumps(recipe, ensure_ascii=False, indent=2) + "\n```\nお楽しみください。"
+    return lambda: extract_json_from_text(text)
+
+
+@micro_benchmark('text.build_recipe_system_prompt')
+def _build_recipe_system_prompt():
+    from utils.text_utils import build_recipe_system_prompt, load_syrup_info_txt
+    syrup_dict = load_syrup_info_txt()
+    return lambda: build_recipe_system_prompt(syrup_dict, None)
+
+
+@micro_benchmark('cocktail.build_user_prompt.large_survey')
+def _build_user_prompt():
+    from db import database as dbmodule
+    from db.event_context import EventContext
+    from db.survey_definition import SurveyDefinition
+    from models.requests import CreateCocktailRequest
+    from services.cocktail_service import CocktailService
+
+    # 選択式20問（各10択）＋記述式20問のアンケート
+    questions = []
+    for index in range(40):
+        question = {
+            'id': f'q{index}',
+            'question_text': f'質問{index}: 今日のイベントで印象に残ったことは？',
+            'question_type': 'multiple_choice' if index < 20 else 'text',
+            'display_order': index,
+            'options': [],
+        }
+        if index < 20:
+            question['options'] = [
+                {'id': f'q{index}-o{option}', 'option_text': f'選択肢{option}', 'display_order': option}
+                for option in range(10)
+            ]
+        questions.append(question)
+    survey = SurveyDefinition({
+        'id': 'benchmark-survey', 'event_id': 'benchmark-event', 'title': 'ベンチマークアンケート',
+        'description': '大規模アンケート', 'is_active': True, 'questions': questions,
+    })
+    event_context = EventContext({'id': 'benchmark-event', 'name': 'ベンチマークイベント'}, survey.survey_id, survey)
+    responses = [
+        {'question_id': f'q{index}', 'selected_option_ids': [f'q{index}-o{option}' for option in range(0, 10, 3)]}
+        for index in range(20)
+    ] + [
+        {'question_id': f'q{index}', 'answer_text': 'とても楽しい時間を過ごせました。' * 3}
+        for index in range(20, 40)
+    ]
+    req = CreateCocktailRequest(
+        recent_event='ベンチマーク', name='ベンチ', career='エンジニア', hobby='散歩',
+        event_id='benchmark-event', survey_responses=responses,
+    )
+
+    def run():
+        # DBを参照しないよう、キャッシュ済みのイベント情報を返す
+        original = dbmodule.get_event_context
+        dbmodule.get_event_context = lambda event_id: event_context
+        try:
+            return CocktailService._build_user_prompt(req, 'benchmark-event')
+        finally:
+            dbmodule.get_event_context = original
+    return run
+
+
+# 計測と比較
+
+def measure(func: Callable[[], Any], rounds: int, min_round_time: float) -> Dict[str, float]:
+    """1ラウンドが min_round_time 秒以上になる回数を求め、rounds ラウンド計測（1回あたりの秒数）"""
+    func()  # 初回呼び出し（import・キャッシュ）を計測から除く
+    loops = 1
+    while True:
+        started_at = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started_at
+        if elapsed >= min_round_time:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_round_time / elapsed) + 1))
+
+    per_call = []
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - started_at) / loops)
+    return {
+        'median_us': round(statistics.median(per_call) * 1e6, 3),
+        'min_us': round(min(per_call) * 1e6, 3),
+        'stdev_us': round(statistics.stdev(per_call) * 1e6, 3) if len(per_call) > 1 else 0.0,
+        'loops': loops,
+        'rounds': rounds,
+    }
+
+
+def _machine() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'processor': platform.processor() or platform.machine(),
+        'system': platform.system(),
+    }
+
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, Dict[str, float]], path: str = BASELINE_PATH) -> None:
+    """結果をベースラインとして保存（計測しなかったベンチマークの既存値は残す）"""
+    baselines = load_baselines(path)
+    baselines.setdefault('benchmarks', {}).update(results)
+    baselines['machine'] = _machine()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def _relative_noise(result: Dict[str, float]) -> float:
+    """計測のばらつき（標準偏差÷最小値）"""
+    return result.get('stdev_us', 0.0) / result['min_us'] if result.get('min_us') else 0.0
+
+
+def effective_threshold(
+    configured: float,
+    result: Dict[str, float],
+    baseline: Dict[str, float],
+    noise_sigmas: float = NOISE_SIGMAS,
+) -> float:
+    """劣化とみなす増加率（設定値と、計測のばらつきから求めた値の大きい方）"""
+    return max(configured, noise_sigmas * max(_relative_noise(result), _relative_noise(baseline)))
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baselines: Dict[str, Any],
+    default_threshold: float,
+) -> List[str]:
+    """ベースラインより threshold 以上遅くなったベンチマークの一覧（表示用の行）"""
+    thresholds = {benchmark.name: benchmark.threshold for benchmark in BENCHMARKS}
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get('benchmarks', {}).get(name)
+        if not baseline or not baseline.get('min_us'):
+            continue
+        configured = thresholds.get(name)
+        if configured is None:
+            configured = default_threshold
+        threshold = effective_threshold(configured, result, baseline)
+        ratio = result['min_us'] / baseline['min_us']
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {baseline['min_us']}us -> {result['min_us']}us "
+                f"(+{(ratio - 1) * 100:.1f}%, しきい値 +{threshold * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='CPU処理のマイクロベンチマーク')
+    parser.add_argument('--filter', default='', help='名前にこの文字列を含むベンチマークのみ実行')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--min-round-time', type=float, default=0.1, help='1ラウンドの最小計測時間（秒）')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='劣化とみなす増加率（0.25 = 25%%。計測のばらつきが大きい場合は自動で緩める）')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='結果をベースラインとして保存')
+    args = parser.parse_args(argv)
+
+    selected = [benchmark for benchmark in BENCHMARKS if args.filter in benchmark.name]
+    baselines = load_baselines(args.baseline)
+    if baselines.get('machine') and baselines['machine'] != _machine() and not args.save_baseline:
+        print(f"⚠️ ベースラインは別の環境で計測されています: {baselines['machine']}")
+
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'benchmark':<42} {'min us':>12} {'median us':>12} {'stdev us':>10} {'baseline us':>12} {'change':>8}")
+    for benchmark in selected:
+        result = measure(benchmark.setup(), args.rounds, args.min_round_time)
+        results[benchmark.name] = result
+        baseline = baselines.get('benchmarks', {}).get(benchmark.name)
+        baseline_text = f"{baseline['min_us']:>12}" if baseline else f"{'-':>12}"
+        change = f"{(result['min_us'] / baseline['min_us'] - 1) * 100:+.1f}%" if baseline and baseline.get('min_us') else '-'
+        print(
+            f"{benchmark.name:<42} {result['min_us']:>12} {result['median_us']:>12} {result['stdev_us']:>10} {baseline_text} {change:>8}",
+            flush=True,
+        )
+
+    if args.save_baseline:
+        save_baselines(results, args.baseline)
+        print(f"\nベースラインを保存しました: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    if regressions:
+        print("\n❌ 性能劣化を検出しました:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ 性能劣化なし")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+記録済みリクエストのリプレイ（イベント前の容量見積もり用）
+
+記録の形式:
+- JSONL: 1行1リクエスト {"timestamp": ISO8601 または UNIX秒, "method": "POST", "path": "/cocktail/", "body": {...}}
+  （"ts"/"time" も timestamp として扱う。body は省略可）
+- gunicornのアクセスログ（gunicorn.conf.py の access_log_format）
+  ボディは記録されないため、POST /cocktail/ と POST /order/ はベンチマークのシナリオと同じボディを補う
+
+記録時刻の間隔を --speed 倍で再現して送信し、レイテンシ分布・エラー率・スケジュール遅延（送信側の詰まり）と
+/metrics から取得した処理中リクエスト数（ワーカーの飽和状況）を表示する
+
+例:
+    # 代替サーバーとアプリを起動して2倍速でリプレイ
+    python -m benchmarks.replay access.log --speed 2
+    # 起動済みのインスタンス（代替サーバーに向けたもの）に対してリプレイ
+    python -m benchmarks.replay recorded.jsonl --target http://127.0.0.1:8000
+"""
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from benchmarks.fake_upstreams import FakeUpstreams, SeedData, add_upstream_arguments
+from benchmarks.run import free_port, git_revision, percentile, start_app, summarize, wait_until_ready
+from benchmarks.scenarios import SCENARIOS
+
+_ACCESS_LOG_PATTERN = re.compile(
+    r'^\S+ \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) '
+)
+_UUID_PATTERN = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+_NUMBER_SEGMENT = re.compile(r'/\d+(?=/|$)')
+_IN_PROGRESS_PATTERN = re.compile(r'^ai_bartender_requests_in_progress(?:\{[^}]*\})? ([0-9.eE+-]+)$', re.MULTILINE)
+
+
+@dataclass
+class RecordedRequest:
+    offset: float  # 最初のリクエストからの経過秒数（記録時刻）
+    method: str
+    path: str
+    body: Optional[Any] = None
+
+
+def _parse_timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+
+def load_jsonl(lines: Iterable[str]) -> List[Tuple[float, str, str, Optional[Any]]]:
+    records = []
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        timestamp = entry.get('timestamp', entry.get('ts', entry.get('time')))
+        records.append((_parse_timestamp(timestamp), entry.get('method', 'GET').upper(), entry['path'], entry.get('body')))
+    return records
+
+
+def load_access_log(lines: Iterable[str]) -> List[Tuple[float, str, str, Optional[Any]]]:
+    """アクセスログを読み込む（秒単位の時刻のため、同じ秒のリクエストはその1秒間に均等に並べる）"""
+    per_second: Dict[float, List[Tuple[str, str]]] = defaultdict(list)
+    for line in lines:
+        match = _ACCESS_LOG_PATTERN.match(line)
+        if not match:
+            continue
+        second = datetime.strptime(match.group('time'), '%d/%b/%Y:%H:%M:%S %z').timestamp()
+        per_second[second].append((match.group('method'), match.group('path')))
+    records = []
+    for second, entries in per_second.items():
+        for index, (method, path) in enumerate(entries):
+            records.append((second + index / len(entries), method, path, None))
+    return records
+
+
+def load_recording(path: str) -> List[RecordedRequest]:
+    """記録ファイルを読み込み、記録時刻順の RecordedRequest にする"""
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    first = next((line for line in lines if line.strip()), '')
+    records = load_jsonl(lines) if first.lstrip().startswith('{') else load_access_log(lines)
+    if not records:
+        raise SystemExit(f"リクエストを読み込めませんでした: {path}")
+    records.sort(key=lambda record: record[0])
+    started_at = records[0][0]
+    return [RecordedRequest(timestamp - started_at, method, path, body) for timestamp, method, path, body in records]
+
+
+def _pick(values: List[str], key: str) -> str:
+    """記録上のIDを初期データのIDに対応付ける（同じ記録IDは常に同じ値）"""
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    return values[int(digest, 16) % len(values)]
+
+
+def adapt_to_seed(request: RecordedRequest, seed: SeedData, index: int) -> Tuple[str, Optional[Any]]:
+    """本番のID（注文番号・イベント・アンケート）を代替サーバーの初期データに置き換え、欠けたボディを補う"""
+    url = urlsplit(request.path)
+    path = url.path
+    if path.startswith('/surveys/'):
+        path = _UUID_PATTERN.sub(seed.survey_id, path, count=1)
+    elif path.startswith('/events/'):
+        path = _UUID_PATTERN.sub(seed.event_id, path, count=1)
+    query = []
+    for key, value in parse_qsl(url.query, keep_blank_values=True):
+        if key == 'order_id' and value != 'all':
+            value = _pick(seed.order_ids, value)
+        elif key == 'event_id':
+            value = seed.event_id
+        query.append((key, value))
+
+    body = request.body
+    if request.method == 'POST' and path in ('/order/', '/cocktail/order'):
+        recorded_order_id = str((body or {}).get('order_id', index))
+        body = {'order_id': _pick(seed.order_ids, recorded_order_id)}
+    elif request.method == 'POST' and path in ('/cocktail/', '/cocktail/anonymous') and body is None:
+        body = SCENARIOS['create_cocktail'].build(seed, index)[2]
+        if path == '/cocktail/anonymous':
+            body.pop('name', None)
+    elif isinstance(body, dict) and 'event_id' in body:
+        body = {**body, 'event_id': seed.event_id}
+    return urlunsplit(('', '', path, urlencode(query), '')), body
+
+
+def endpoint_key(method: str, path: str) -> str:
+    """集計用のエンドポイント名（ID部分を {id} にまとめる）"""
+    url = urlsplit(path)
+    normalized = _NUMBER_SEGMENT.sub('/{id}', _UUID_PATTERN.sub('{id}', url.path))
+    if url.query and 'order_id=all' in url.query:
+        normalized += '?order_id=all'
+    return f"{method} {normalized}"
+
+
+class InProgressSampler:
+    """/metrics の処理中リクエスト数を定期的に取得"""
+
+    def __init__(self, base_url: str, interval: float = 0.5):
+        self.base_url = base_url
+        self.interval = interval
+        self.samples: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='in-progress-sampler', daemon=True)
+
+    def _run(self) -> None:
+        session = requests.Session()
+        while not self._stop.wait(self.interval):
+            try:
+                text = session.get(f"{self.base_url}/metrics", timeout=2).text
+            except requests.RequestException:
+                continue
+            values = [float(value) for value in _IN_PROGRESS_PATTERN.findall(text)]
+            if values:
+                # /metrics 自身の1件を除く
+                self.samples.append(max(0.0, sum(values) - 1))
+
+    def start(self) -> 'InProgressSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        if not self.samples:
+            return {'samples': 0}
+        return {
+            'samples': len(self.samples),
+            'mean': round(sum(self.samples) / len(self.samples), 2),
+            'p95': percentile(sorted(self.samples), 0.95),
+            'max': max(self.samples),
+        }
+
+
+def replay(
+    base_url: str,
+    recording: List[RecordedRequest],
+    speed: float,
+    max_concurrency: int,
+    seed: Optional[SeedData] = None,
+    timeout: float = 120.0,
+) -> Dict[str, Any]:
+    """記録時刻の間隔を speed 倍にして送信し、集計結果を返す"""
+    local = threading.local()
+    lock = threading.Lock()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    statuses: Counter = Counter()
+    lags: List[float] = []
+
+    def send(request: RecordedRequest, index: int, scheduled_at: float) -> None:
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        path, body = adapt_to_seed(request, seed, index) if seed else (request.path, request.body)
+        key = endpoint_key(request.method, request.path)
+        started_at = time.perf_counter()
+        try:
+            response = local.session.request(request.method, base_url + path, json=body, timeout=timeout)
+            status = str(response.status_code)
+            failed = response.status_code >= 500 or response.status_code == 429
+        except requests.RequestException as e:
+            status, failed = type(e).__name__, True
+        latency = time.perf_counter() - started_at
+        with lock:
+            latencies[key].append(latency)
+            statuses[status] += 1
+            # 送信予定時刻から実際の送信までの遅れ（送信側の同時実行数が足りない場合に増える）
+            lags.append(started_at - scheduled_at)
+            if failed:
+                errors[key] += 1
+
+    sampler = InProgressSampler(base_url).start()
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for index, request in enumerate(recording):
+            scheduled_at = started_at + request.offset / speed
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, request, index, scheduled_at)
+    elapsed = time.perf_counter() - started_at
+    in_progress = sampler.stop()
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    total_errors = sum(errors.values())
+    sorted_lags = sorted(lags)
+    return {
+        'requests': len(all_latencies),
+        'recorded_duration_sec': round(recording[-1].offset, 2),
+        'replay_duration_sec': round(elapsed, 2),
+        'speed': speed,
+        'error_rate': round(total_errors / len(all_latencies), 4) if all_latencies else 0.0,
+        'overall': summarize(all_latencies, total_errors, elapsed),
+        'endpoints': {
+            key: summarize(values, errors[key], elapsed)
+            for key, values in sorted(latencies.items(), key=lambda item: -len(item[1]))
+        },
+        'status_codes': dict(statuses),
+        'schedule_lag_ms': {
+            'p95': round(percentile(sorted_lags, 0.95) * 1000, 2),
+            'max': round(sorted_lags[-1] * 1000, 2) if sorted_lags else 0.0,
+        },
+        'server_in_progress': in_progress,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    overall = report['overall']
+    print(f"\nリクエスト {report['requests']}件 / 記録 {report['recorded_duration_sec']}秒 → "
+          f"再生 {report['replay_duration_sec']}秒（{report['speed']}倍速）")
+    print(f"エラー率 {report['error_rate'] * 100:.2f}%  ステータス {report['status_codes']}")
+    print(f"全体: {overall['requests_per_sec']} req/s, p50 {overall['p50_ms']}ms, p95 {overall['p95_ms']}ms, p99 {overall['p99_ms']}ms")
+    in_progress = report['server_in_progress']
+    if in_progress.get('samples'):
+        print(f"処理中リクエスト（サーバー側）: 平均 {in_progress['mean']}, p95 {in_progress['p95']}, 最大 {in_progress['max']}")
+    else:
+        print("処理中リクエスト（サーバー側）: /metrics から取得できませんでした")
+    print(f"送信スケジュール遅延: p95 {report['schedule_lag_ms']['p95']}ms, 最大 {report['schedule_lag_ms']['max']}ms")
+    print()
+    header = f"{'endpoint':<45} {'reqs':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for key, result in report['endpoints'].items():
+        print(f"{key:<45} {result['requests']:>6} {result['errors']:>6} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='記録済みリクエストのリプレイ')
+    parser.add_argument('recording', help='JSONL またはgunicornのアクセスログ')
+    parser.add_argument('--speed', type=float, default=1.0, help='再生速度（2 = 記録の2倍の密度で送信）')
+    parser.add_argument('--max-concurrency', type=int, default=256, help='送信側の最大同時リクエスト数')
+    parser.add_argument('--target', help='起動済みインスタンスのURL（省略時は代替サーバーとアプリを起動）')
+    parser.add_argument('--server', choices=['uvicorn', 'gunicorn'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4, help='アプリのワーカー数（--target 未指定時）')
+    parser.add_argument('--output', help='結果JSONの保存先')
+    add_upstream_arguments(parser)
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording)
+    upstreams = process = None
+    seed = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        upstreams = FakeUpstreams(
+            llm_delay=args.llm_delay, image_delay=args.image_delay,
+            db_delay=args.db_delay, storage_delay=args.storage_delay,
+            cocktails=args.cocktails, survey_responses=args.survey_responses,
+        ).start()
+        seed = upstreams.seed
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = start_app(args.server, port, args.workers, {**upstreams.app_environment(), 'LOG_LEVEL': 'WARNING'})
+
+    try:
+        if process is not None:
+            wait_until_ready(base_url, process)
+        print(f"▶ {len(recording)}件を {args.speed}倍速でリプレイ: {base_url}", flush=True)
+        report = replay(base_url, recording, args.speed, args.max_concurrency, seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=15)
+        if upstreams is not None:
+            upstreams.stop()
+
+    commit, dirty = git_revision()
+    report.update({'commit': commit, 'dirty': dirty, 'recording': args.recording, 'workers': None if args.target else args.workers})
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を保存しました: {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+ベンチマーク実行（代替サーバーを起動し、アプリを別プロセスで起動してシナリオごとに負荷をかける）
+
+シナリオごとの p50/p95/p99 レイテンシと requests/sec を表示し、
+benchmarks/results/<コミット>.json に保存する（同じコミットで再実行すると上書き）
+
+例:
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios pour_polling,survey_statistics --concurrency 16 --requests 1000
+    python -m benchmarks.run --server gunicorn --workers 4 --llm-delay 2 --image-delay 8
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.fake_upstreams import FakeUpstreams, SeedData, add_upstream_arguments
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT_DIR = os.path.join(REPOSITORY_ROOT, 'benchmarks', 'results')
+
+
+def git_revision() -> Tuple[str, bool]:
+    """現在のコミットIDと未コミットの変更の有無"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return commit, bool(status)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def percentile(sorted_values: List[float], ratio: float) -> float:
+    """最近傍順位法のパーセンタイル（sorted_values は昇順）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(ratio * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """レイテンシ（秒）の一覧から集計結果を作成"""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'requests': count,
+        'errors': errors,
+        'requests_per_sec': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'mean_ms': round(sum(values) / count * 1000, 2) if count else 0.0,
+        'max_ms': round(values[-1] * 1000, 2) if count else 0.0,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(server: str, port: int, workers: int, environment: Dict[str, str]) -> subprocess.Popen:
+    """アプリを別プロセスで起動（uvicorn または gunicorn.conf.py を使った gunicorn）"""
+    env = {**os.environ, **environment}
+    if server == 'gunicorn':
+        env.update({'PORT': str(port), 'GUNICORN_WORKERS': str(workers)})
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app']
+    else:
+        command = [
+            sys.executable, '-m', 'uvicorn', 'main:app',
+            '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--log-level', 'warning',
+        ]
+    return subprocess.Popen(command, cwd=REPOSITORY_ROOT, env=env)
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"アプリが起動直後に終了しました（exit code {process.returncode}）")
+        try:
+            if requests.get(f"{base_url}/status_check", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"アプリが{timeout}秒以内に起動しませんでした")
+
+
+def run_scenario(
+    base_url: str,
+    scenario: Scenario,
+    seed: SeedData,
+    total_requests: int,
+    concurrency: int,
+    warmup: int = 0,
+    timeout: float = 120.0,
+) -> Dict[str, Any]:
+    """シナリオを concurrency 並列で total_requests 回実行して集計"""
+    local = threading.local()
+    counter_lock = threading.Lock()
+    counter = {'next': 0}
+
+    def session() -> requests.Session:
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return local.session
+
+    def send(index: int) -> Tuple[float, bool]:
+        method, path, body = scenario.build(seed, index)
+        started_at = time.perf_counter()
+        try:
+            response = session().request(method, base_url + path, json=body, timeout=timeout)
+            success = scenario.is_success(response)
+        except requests.RequestException:
+            success = False
+        return time.perf_counter() - started_at, success
+
+    for index in range(warmup):
+        send(index)
+
+    latencies: List[float] = []
+    errors = 0
+    results_lock = threading.Lock()
+
+    def worker() -> None:
+        nonlocal errors
+        while True:
+            with counter_lock:
+                index = counter['next']
+                if index >= total_requests:
+                    return
+                counter['next'] += 1
+            latency, success = send(warmup + index)
+            with results_lock:
+                latencies.append(latency)
+                if not success:
+                    errors += 1
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - started_at
+    return summarize(latencies, errors, elapsed)
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'scenario':<20} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        print(
+            f"{name:<20} {result['requests']:>6} {result['errors']:>6} {result['requests_per_sec']:>9} "
+            f"{result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}"
+        )
+
+
+def write_report(output_dir: str, report: Dict[str, Any]) -> str:
+    """結果をコミットごとのJSONに保存"""
+    os.makedirs(output_dir, exist_ok=True)
+    name = report['commit'][:12] + ('-dirty' if report['dirty'] else '')
+    path = os.path.join(output_dir, f"{name}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='AI Bartender API ベンチマーク')
+    parser.add_argument('--scenarios', default='all', help=f"カンマ区切り（{', '.join(SCENARIOS)}）または all")
+    parser.add_argument('--requests', type=int, default=None, help='シナリオごとのリクエスト数（省略時はシナリオの既定値）')
+    parser.add_argument('--concurrency', type=int, default=8, help='同時リクエスト数')
+    parser.add_argument('--warmup', type=int, default=5, help='計測前に送るリクエスト数')
+    parser.add_argument('--server', choices=['uvicorn', 'gunicorn'], default='uvicorn')
+    parser.add_argument('--workers', type=int, default=1, help='アプリのワーカー数')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    add_upstream_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    names = list(SCENARIOS) if args.scenarios == 'all' else [name.strip() for name in args.scenarios.split(',')]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"不明なシナリオ: {', '.join(unknown)}")
+
+    upstreams = FakeUpstreams(
+        llm_delay=args.llm_delay, image_delay=args.image_delay,
+        db_delay=args.db_delay, storage_delay=args.storage_delay,
+        cocktails=args.cocktails, survey_responses=args.survey_responses,
+    ).start()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_app(args.server, port, args.workers, {**upstreams.app_environment(), 'LOG_LEVEL': 'WARNING'})
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        wait_until_ready(base_url, process)
+        for name in names:
+            scenario = SCENARIOS[name]
+            total = args.requests or scenario.default_requests
+            print(f"▶ {name}: {scenario.description}（{total}件, 並列{args.concurrency}）", flush=True)
+            results[name] = run_scenario(base_url, scenario, upstreams.seed, total, args.concurrency, args.warmup)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        upstreams.stop()
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            key: value for key, value in vars(args).items() if key != 'output_dir'
+        },
+        'results': results,
+    }
+    print()
+    print_table(results)
+    print(f"\n結果を保存しました: {write_report(args.output_dir, report)}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
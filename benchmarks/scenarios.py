@@ -0,0 +1,65 @@
+"""
+ベンチマークのシナリオ定義（1リクエスト分のメソッド・パス・ボディを組み立てる）
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+from benchmarks.fake_upstreams import SeedData
+
+# (メソッド, パス, JSONボディ)
+RequestSpec = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+@dataclass
+class Scenario:
+    """計測対象のエンドポイントと既定のリクエスト数"""
+    name: str
+    description: str
+    build: Callable[[SeedData, int], RequestSpec]
+    default_requests: int = 200
+
+    def is_success(self, response: requests.Response) -> bool:
+        """HTTP 2xx かつ {"result": "error"} でない応答を成功とする"""
+        if not response.ok:
+            return False
+        if response.headers.get('content-type', '').startswith('application/json'):
+            body = response.json()
+            return not (isinstance(body, dict) and body.get('result') == 'error')
+        return True
+
+
+def _create_cocktail(seed: SeedData, index: int) -> RequestSpec:
+    return 'POST', '/cocktail/', {
+        'recent_event': f'ベンチマーク計測{index}回目',
+        'event_name': '',
+        'name': f'ベンチ{index}',
+        'career': 'エンジニア',
+        'hobby': '散歩',
+        'event_id': seed.event_id,
+    }
+
+
+def _gallery(seed: SeedData, index: int) -> RequestSpec:
+    return 'GET', '/order/?order_id=all', None
+
+
+def _pour_polling(seed: SeedData, index: int) -> RequestSpec:
+    # 注ぎ機は同じ注文番号を繰り返し問い合わせるため、シード済みの注文番号を順に使う
+    return 'POST', '/order/', {'order_id': seed.order_ids[index % len(seed.order_ids)]}
+
+
+def _survey_statistics(seed: SeedData, index: int) -> RequestSpec:
+    return 'GET', f'/surveys/{seed.survey_id}/statistics', None
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario('create_cocktail', 'POST /cocktail/（LLM・画像生成・保存まで）', _create_cocktail, default_requests=20),
+        Scenario('gallery', 'GET /order/?order_id=all（全件＋画像）', _gallery, default_requests=50),
+        Scenario('pour_polling', 'POST /order/（注ぎ機の注文照会）', _pour_polling),
+        Scenario('survey_statistics', 'GET /surveys/{id}/statistics', _survey_statistics),
+    ]
+}
@@ -19,7 +19,16 @@ class Settings:
     DEPLOYMENT_ID: str = "gpt-4.1"
     API_VERSION: str = "2023-12-01-preview"
     
+    # 公開OpenAI API（Azureのデプロイが使えない場合のフォールバック）
+    OPENAI_LLM_URL: str = os.environ.get("OPENAI_LLM_URL", "https://api.openai.com/v1/chat/completions")
+    OPENAI_LLM_MODEL: str = os.environ.get("OPENAI_LLM_MODEL", "gpt-4.1")
+    
+    # LLMプロバイダーのサーキットブレーカー（連続失敗で遮断し、RECOVERY_SECONDS 後に1件だけ試行）
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.environ.get("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RECOVERY_SECONDS: float = float(os.environ.get("LLM_CIRCUIT_RECOVERY_SECONDS", "30"))
+    
     # 画像生成設定
+    IMAGE_API_URL: str = os.environ.get("IMAGE_API_URL", "https://api.openai.com/v1/images/generations")
     IMAGE_MODEL: str = "gpt-image-1"
     IMAGE_SIZE: str = "1024x1536"
     IMAGE_QUALITY: str = "low"
@@ -27,7 +36,18 @@ class Settings:
     # タイムアウト設定
     LLM_TIMEOUT: int = 30
     IMAGE_TIMEOUT: int = 60
-    
+
+    # レート制限設定（全ワーカー共有。PER_MINUTE・MAX_CONCURRENCY を0にすると無効）
+    IMAGE_RATE_LIMIT_PER_MINUTE: float = float(os.environ.get("IMAGE_RATE_LIMIT_PER_MINUTE", "50"))
+    IMAGE_RATE_LIMIT_BURST: int = int(os.environ.get("IMAGE_RATE_LIMIT_BURST", "5"))
+    IMAGE_MAX_CONCURRENCY: int = int(os.environ.get("IMAGE_MAX_CONCURRENCY", "10"))
+    IMAGE_RATE_LIMIT_QUEUE_SECONDS: float = float(os.environ.get("IMAGE_RATE_LIMIT_QUEUE_SECONDS", "30"))
+    LLM_RATE_LIMIT_PER_MINUTE: float = float(os.environ.get("LLM_RATE_LIMIT_PER_MINUTE", "300"))
+    LLM_RATE_LIMIT_BURST: int = int(os.environ.get("LLM_RATE_LIMIT_BURST", "20"))
+    LLM_MAX_CONCURRENCY: int = int(os.environ.get("LLM_MAX_CONCURRENCY", "20"))
+    LLM_RATE_LIMIT_QUEUE_SECONDS: float = float(os.environ.get("LLM_RATE_LIMIT_QUEUE_SECONDS", "15"))
+    RATE_LIMIT_STATE_DIR: str = os.environ.get("RATE_LIMIT_STATE_DIR", "/tmp/ai_bartender_ratelimit")
+
     # 画像処理設定
     TARGET_WIDTH: int = 720
     TARGET_HEIGHT: int = 1080
@@ -35,10 +55,61 @@ class Settings:
     # リトライ設定
     MAX_NAME_RETRIES: int = 3
     MAX_ORDER_ID_ATTEMPTS: int = 10
+    LLM_MAX_ATTEMPTS: int = int(os.environ.get("LLM_MAX_ATTEMPTS", "3"))
+    IMAGE_MAX_ATTEMPTS: int = int(os.environ.get("IMAGE_MAX_ATTEMPTS", "2"))
+    LLM_RETRY_DEADLINE: float = float(os.environ.get("LLM_RETRY_DEADLINE", "45"))  # 再試行を含む全体の上限（秒）
+    IMAGE_RETRY_DEADLINE: float = float(os.environ.get("IMAGE_RETRY_DEADLINE", "90"))
+    RETRY_BASE_DELAY: float = float(os.environ.get("RETRY_BASE_DELAY", "0.5"))
+    RETRY_MAX_DELAY: float = float(os.environ.get("RETRY_MAX_DELAY", "8"))
+    RETRY_BUDGET_RATIO: float = float(os.environ.get("RETRY_BUDGET_RATIO", "0.2"))  # 呼び出し数に対するリトライの割合
+    RETRY_BUDGET_MIN_TOKENS: float = float(os.environ.get("RETRY_BUDGET_MIN_TOKENS", "10"))
+    # LLMのヘッジリクエスト（直近の p95 を超えても応答がない場合に2本目を送る）
+    LLM_HEDGE_ENABLED: bool = os.environ.get("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.environ.get("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_MIN_DELAY: float = float(os.environ.get("LLM_HEDGE_MIN_DELAY", "2"))
     
     # 注文ID設定
     ORDER_ID_MIN: int = 100000
     ORDER_ID_MAX: int = 999999
+    ORDER_ID_BLOCK_SIZE: int = int(os.environ.get("ORDER_ID_BLOCK_SIZE", "20"))
+    ORDER_ID_PERMUTATION_KEY: str = os.environ.get("ORDER_ID_PERMUTATION_KEY", "ai-bartender-order-id")
+    
+    # アンケート集計設定
+    SURVEY_STATS_TEXT_SAMPLE_LIMIT: int = int(os.environ.get("SURVEY_STATS_TEXT_SAMPLE_LIMIT", "100"))
+    SURVEY_EXPORT_PAGE_SIZE: int = int(os.environ.get("SURVEY_EXPORT_PAGE_SIZE", "500"))
+    
+    # 違反報告設定
+    VIOLATION_REPORTS_PAGE_SIZE: int = int(os.environ.get("VIOLATION_REPORTS_PAGE_SIZE", "50"))
+    VIOLATION_REPORTS_MAX_PAGE_SIZE: int = int(os.environ.get("VIOLATION_REPORTS_MAX_PAGE_SIZE", "200"))
+    # この件数以上の違反報告で自動非表示
+    VIOLATION_AUTO_HIDE_THRESHOLD: int = int(os.environ.get("VIOLATION_AUTO_HIDE_THRESHOLD", "1"))
+    
+    # キャッシュ設定（秒）
+    COCKTAIL_CACHE_TTL: float = float(os.environ.get("COCKTAIL_CACHE_TTL", "30"))
+    COCKTAIL_CACHE_MAX_ENTRIES: int = int(os.environ.get("COCKTAIL_CACHE_MAX_ENTRIES", "2048"))
+    SURVEY_CACHE_TTL: float = float(os.environ.get("SURVEY_CACHE_TTL", "60"))
+    EVENT_CONTEXT_CACHE_TTL: float = float(os.environ.get("EVENT_CONTEXT_CACHE_TTL", "60"))
+    EVENT_STATS_CACHE_TTL: float = float(os.environ.get("EVENT_STATS_CACHE_TTL", "10"))
+    PROMPT_USAGE_CACHE_TTL: float = float(os.environ.get("PROMPT_USAGE_CACHE_TTL", "300"))
+    
+    # ログ設定
+    LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.environ.get("LOG_FORMAT", "text")  # text または json
+    
+    # トレース設定
+    TRACING_EXPORTER: str = os.environ.get("TRACING_EXPORTER", "none")  # none / jsonl / otlp
+    TRACING_JSONL_PATH: str = os.environ.get("TRACING_JSONL_PATH", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.environ.get("TRACING_OTLP_ENDPOINT", "http://localhost:4318")
+    TRACING_SERVICE_NAME: str = os.environ.get("TRACING_SERVICE_NAME", "ai-bartender")
+    TRACING_SAMPLE_RATIO: float = float(os.environ.get("TRACING_SAMPLE_RATIO", "1.0"))
+    
+    # プロファイラ設定（PROFILER_ENABLED=true の場合のみ /debug/profile と SIGUSR2 が有効）
+    PROFILER_ENABLED: bool = os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+    PROFILER_TOKEN: Optional[str] = os.environ.get("PROFILER_TOKEN")
+    PROFILER_INTERVAL_MS: float = float(os.environ.get("PROFILER_INTERVAL_MS", "10"))
+    PROFILER_MAX_SECONDS: float = float(os.environ.get("PROFILER_MAX_SECONDS", "60"))
+    PROFILER_SIGNAL_SECONDS: float = float(os.environ.get("PROFILER_SIGNAL_SECONDS", "30"))
+    PROFILER_OUTPUT_DIR: str = os.environ.get("PROFILER_OUTPUT_DIR", "/tmp/ai_bartender_profiles")
     
     # ファイルパス
     SYRUP_INFO_FILE: str = "storage/syrup.txt"
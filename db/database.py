@@ -1,32 +1,94 @@
+import logging
 import os
-from typing import Optional, Dict, Any, List, Union
+import json
+import base64
+from typing import Optional, Dict, Any, List, Union, Iterator
 from datetime import datetime
 from dotenv import load_dotenv
-from .supabase_client import supabase_client
+from .supabase_client import (
+    supabase_client,
+    COCKTAIL_POUR_COLUMNS,
+    COCKTAIL_GALLERY_COLUMNS,
+    COCKTAIL_MODERATION_COLUMNS,
+)
+from config.settings import settings
+from utils.cache import TTLCache
+from .survey_definition import SurveyDefinition
+from .event_context import EventContext
 import uuid
 
+logger = logging.getLogger(__name__)
+
 load_dotenv(override=True)
 
+# 注文ID -> カクテル行のキャッシュ（注ぎ機のポーリング用）と UUID -> 注文ID の索引
+_cocktail_cache = TTLCache(settings.COCKTAIL_CACHE_TTL, settings.COCKTAIL_CACHE_MAX_ENTRIES)
+_cocktail_order_ids = TTLCache(settings.COCKTAIL_CACHE_TTL, settings.COCKTAIL_CACHE_MAX_ENTRIES)
+# アンケートID -> SurveyDefinition のキャッシュ（カクテル作成・回答送信用）
+_survey_definition_cache = TTLCache(settings.SURVEY_CACHE_TTL, copy_values=False)
+# イベントID -> EventContext のキャッシュ（カクテル作成用）
+_event_context_cache = TTLCache(settings.EVENT_CONTEXT_CACHE_TTL, copy_values=False)
+# イベントID -> 件数集計のキャッシュ（イベント中のダッシュボード更新用）
+_event_statistics_cache = TTLCache(settings.EVENT_STATS_CACHE_TTL)
+
 def create_tables():
     """テーブル作成"""
     try:
         supabase_client.create_tables()
-        print("Supabaseテーブルの作成が完了しました。")
+        logger.debug("Supabaseテーブルの作成が完了しました。")
     except Exception as e:
-        print(f"テーブル作成中にエラーが発生しました: {e}")
+        logger.error("テーブル作成中にエラーが発生しました: %s", e)
         raise
 
 def insert_cocktail(data: dict) -> Optional[str]:
     """カクテルデータを挿入（UUID文字列を返す）"""
     return supabase_client.insert_cocktail(data)
 
-def get_cocktail_by_order_id(order_id: str) -> Optional[Dict[str, Any]]:
-    """注文IDでカクテルを取得"""
-    return supabase_client.get_cocktail_by_order_id(order_id)
-
-def get_cocktail_by_id(cocktail_id: str) -> Optional[Dict[str, Any]]:
-    """UUIDでカクテルを取得"""
-    return supabase_client.get_cocktail_by_id(cocktail_id)
+def reserve_order_id_block(count: int) -> List[int]:
+    """注文ID用シーケンス番号をまとめて予約"""
+    return supabase_client.reserve_order_id_block(count)
+
+def insert_cocktail_with_order_id(data: dict, next_order_id, max_attempts: int) -> Optional[Dict[str, Any]]:
+    """カクテルを挿入（order_id重複時は再採番して再試行、挿入行を返す）"""
+    return supabase_client.insert_cocktail_with_order_id(data, next_order_id, max_attempts)
+
+def cache_cocktail(row: Optional[Dict[str, Any]]) -> None:
+    """カクテル行をキャッシュに登録"""
+    if not row or not row.get('order_id'):
+        return
+    order_id = str(row['order_id'])
+    # 挿入直後の行は全カラムを含むため、注ぎ機用のカラムに絞って保持する
+    pour_columns = [column.strip() for column in COCKTAIL_POUR_COLUMNS.split(',')]
+    _cocktail_cache.set(order_id, {column: row.get(column) for column in pour_columns if column in row})
+    if row.get('id'):
+        _cocktail_order_ids.set(str(row['id']), order_id)
+
+def invalidate_cocktail_cache(cocktail_uuid: Union[str, uuid.UUID] = None, order_id: str = None) -> None:
+    """カクテルのキャッシュを破棄（UUIDまたは注文IDで指定）"""
+    if cocktail_uuid:
+        cached_order_id = _cocktail_order_ids.get(str(cocktail_uuid))
+        _cocktail_order_ids.invalidate(str(cocktail_uuid))
+        order_id = order_id or cached_order_id
+    if order_id:
+        _cocktail_cache.invalidate(str(order_id))
+
+def get_cocktail_by_order_id(order_id: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """注文IDでカクテルを取得（キャッシュ経由、見つからない場合はキャッシュしない）
+
+    キャッシュはワーカーごとで他ワーカーの非表示・再表示を最大 COCKTAIL_CACHE_TTL 秒反映しないため、
+    表示状態を見て更新を判断する処理（管理操作・違反報告）では use_cache=False で最新の行を取得する
+    """
+    if use_cache:
+        cocktail = _cocktail_cache.get(str(order_id))
+        if cocktail is not None:
+            return cocktail
+    cocktail = supabase_client.get_cocktail_by_order_id(order_id)
+    cache_cocktail(cocktail)
+    return cocktail
+
+def get_cocktail_by_id(cocktail_id: str, columns: str = COCKTAIL_MODERATION_COLUMNS) -> Optional[Dict[str, Any]]:
+    """UUIDでカクテルを取得（管理用カラム）"""
+    return supabase_client.get_cocktail_by_id(cocktail_id, columns=columns)
 
 def get_uuid_from_order_id(order_id: str) -> Optional[str]:
     """order_idからUUIDを取得"""
@@ -36,9 +98,14 @@ def get_order_id_from_uuid(uuid_id: str) -> Optional[str]:
     """UUIDからorder_idを取得"""
     return supabase_client.get_order_id_from_uuid(uuid_id)
 
-def get_all_cocktails(limit: int = None, offset: int = 0, event_id: Union[str, uuid.UUID] = None) -> Dict[str, Any]:
+def get_all_cocktails(
+    limit: int = None,
+    offset: int = 0,
+    event_id: Union[str, uuid.UUID] = None,
+    columns: str = COCKTAIL_GALLERY_COLUMNS
+) -> Dict[str, Any]:
     """全カクテルを取得（ページネーション対応）、event_idでフィルター可能"""
-    return supabase_client.get_all_cocktails(limit=limit, offset=offset, event_id=event_id)
+    return supabase_client.get_all_cocktails(limit=limit, offset=offset, event_id=event_id, columns=columns)
 
 def insert_poured_cocktail(data: dict) -> Optional[int]:
     """注がれたカクテルデータを挿入"""
@@ -87,6 +154,10 @@ def link_cocktail_prompt(cocktail_uuid: str, prompt_id: int, prompt_type: str):
     """カクテルとプロンプトを関連付け（UUID使用）"""
     return supabase_client.link_cocktail_prompt(cocktail_uuid, prompt_id, prompt_type)
 
+def get_prompt_usage_counts(since: Optional[str] = None) -> Optional[Dict[int, Dict[str, Any]]]:
+    """プロンプトごとの使用回数と最終使用日時を取得（since以降のみ、集計に失敗した場合はNone）"""
+    return supabase_client.get_prompt_usage_counts(since)
+
 def get_cocktail_prompts(cocktail_uuid: str):
     """カクテルに関連付けられたプロンプトを取得（UUID使用）"""
     return supabase_client.get_cocktail_prompts(cocktail_uuid)
@@ -122,39 +193,105 @@ def insert_event(data: dict):
 
 def update_event(event_id: Union[str, uuid.UUID], data: dict):
     """イベントを更新"""
-    return supabase_client.update_event(event_id, data)
+    result = supabase_client.update_event(event_id, data)
+    invalidate_event_context(event_id)
+    return result
+
+def get_event_context(event_id: Union[str, uuid.UUID]) -> Optional[EventContext]:
+    """イベント名と有効なアンケート定義をまとめて取得（キャッシュ経由）"""
+    def load() -> Optional[EventContext]:
+        event = supabase_client.get_event_by_id(event_id)
+        if not event:
+            return None
+        surveys = supabase_client.get_surveys_by_event(str(event_id), is_active=True)
+        if not surveys:
+            return EventContext(event)
+        active_survey_id = str(surveys[0]['id'])
+        return EventContext(event, active_survey_id, get_survey_definition(active_survey_id))
+    return _event_context_cache.get_or_load(str(event_id), load)
+
+def get_event_statistics(event_id: Union[str, uuid.UUID]) -> Optional[Dict[str, int]]:
+    """イベントの件数集計を取得（短時間キャッシュ、取得に失敗した場合はキャッシュせずNone）"""
+    return _event_statistics_cache.get_or_load(
+        str(event_id), lambda: supabase_client.get_event_statistics(event_id)
+    )
+
+def invalidate_event_context(event_id: Union[str, uuid.UUID] = None) -> None:
+    """イベント情報のキャッシュを破棄（ID未指定時は全件）"""
+    if event_id:
+        _event_context_cache.invalidate(str(event_id))
+    else:
+        _event_context_cache.clear()
 
 # 違反報告関連の関数
 
-def report_violation(cocktail_uuid: str, reporter_ip: str, report_reason: str, report_category: str = 'inappropriate'):
-    """カクテルに対する違反報告を追加（UUID使用）"""
+def report_violation_by_order_id(
+    order_id: str,
+    reporter_ip: str,
+    report_reason: str,
+    report_category: str = 'inappropriate',
+    auto_hide_threshold: int = 1
+) -> Dict[str, Any]:
+    """注文番号のカクテルに違反報告を追加し、報告数の加算と自動非表示を1回のRPCで行う
+    
+    戻り値の status: 'reported'（登録）, 'duplicate'（同じIPから報告済み）, 'not_found'（カクテルなし）, 'error'
+    """
     try:
-        # 既に同じIPアドレスから報告済みかチェック
-        existing = supabase_client.client.table('violation_reports').select('id').eq('cocktail_id', cocktail_uuid).eq('reporter_id', reporter_ip).execute()
-        if existing.data:
-            return False  # 既に報告済み
-        
-        # 違反報告を追加
+        result = supabase_client.client.rpc('report_violation_by_order_id', {
+            'p_order_id': str(order_id),
+            'p_reporter_id': reporter_ip,
+            'p_report_reason': report_reason,
+            'p_report_category': report_category,
+            'p_auto_hide_threshold': auto_hide_threshold
+        }).execute()
+        outcome = result.data or {}
+        if outcome.get('status') == 'reported':
+            invalidate_cocktail_cache(outcome.get('cocktail_id'), order_id)
+        return outcome
+    except Exception as e:
+        logger.warning("違反報告RPCエラー（従来の処理にフォールバック）: %s", e)
+    
+    cocktail = get_cocktail_by_order_id(order_id, use_cache=False)
+    if not cocktail or not cocktail.get('id'):
+        return {'status': 'not_found', 'order_id': order_id}
+    return report_violation(cocktail['id'], reporter_ip, report_reason, report_category, auto_hide_threshold)
+
+def report_violation(
+    cocktail_uuid: str,
+    reporter_ip: str,
+    report_reason: str,
+    report_category: str = 'inappropriate',
+    auto_hide_threshold: int = 1
+) -> Dict[str, Any]:
+    """カクテルに対する違反報告を追加（UUID使用、テーブル単位の更新）"""
+    try:
+        # 重複報告は (cocktail_id, reporter_id) の一意制約で判定
         result = supabase_client.client.table('violation_reports').insert({
             'cocktail_id': cocktail_uuid,
             'reporter_id': reporter_ip,
             'report_reason': report_reason,
             'report_category': report_category
         }).execute()
+        if not result.data:
+            return {'status': 'error', 'cocktail_id': cocktail_uuid}
         
-        if result.data:
-            # カクテルの違反報告数を更新し、自動非表示処理を実行
-            count = update_violation_count(cocktail_uuid)
-            
-            # 違反報告があった場合は即座に非表示にする
-            if count >= 1:
-                hide_cocktail(cocktail_uuid, f"違反報告により非表示（報告数: {count}）")
-            
-            return True
-        return False
+        # カクテルの違反報告数を更新し、自動非表示処理を実行
+        count = update_violation_count(cocktail_uuid)
+        hidden = count >= auto_hide_threshold
+        if hidden:
+            hide_cocktail(cocktail_uuid, f"違反報告により自動非表示（報告数: {count}）")
+        
+        return {
+            'status': 'reported',
+            'cocktail_id': cocktail_uuid,
+            'violation_reports_count': count,
+            'hidden': hidden
+        }
     except Exception as e:
-        print(f"違反報告エラー: {e}")
-        return False
+        if getattr(e, 'code', None) == '23505':
+            return {'status': 'duplicate', 'cocktail_id': cocktail_uuid}
+        logger.error("違反報告エラー: %s", e)
+        return {'status': 'error', 'cocktail_id': cocktail_uuid}
 
 def update_violation_count(cocktail_uuid: str):
     """カクテルの違反報告数を更新（UUID使用）"""
@@ -165,10 +302,11 @@ def update_violation_count(cocktail_uuid: str):
         
         # カクテルテーブルの違反報告数を更新
         supabase_client.client.table('cocktails').update({'violation_reports_count': count}).eq('id', cocktail_uuid).execute()
+        invalidate_cocktail_cache(cocktail_uuid)
         
         return count
     except Exception as e:
-        print(f"違反報告数更新エラー: {e}")
+        logger.error("違反報告数更新エラー: %s", e)
         return 0
 
 def hide_cocktail(cocktail_uuid: str, reason: str = '違反報告により非表示'):
@@ -180,10 +318,11 @@ def hide_cocktail(cocktail_uuid: str, reason: str = '違反報告により非表
             'hidden_at': datetime.now().isoformat(),
             'hidden_reason': reason
         }).eq('id', cocktail_uuid).execute()
+        invalidate_cocktail_cache(cocktail_uuid)
         
         return len(result.data) > 0
     except Exception as e:
-        print(f"カクテル非表示エラー: {e}")
+        logger.error("カクテル非表示エラー: %s", e)
         return False
 
 def show_cocktail(cocktail_id: int):
@@ -194,161 +333,201 @@ def show_cocktail(cocktail_id: int):
             'hidden_at': None,
             'hidden_reason': None
         }).eq('id', cocktail_id).execute()
+        invalidate_cocktail_cache(cocktail_id)
         
         return len(result.data) > 0
     except Exception as e:
-        print(f"カクテル再表示エラー: {e}")
+        logger.error("カクテル再表示エラー: %s", e)
         return False
 
+# 違反報告一覧で取得するカラム（カクテル情報を含む）
+VIOLATION_REPORT_LIST_COLUMNS = (
+    'id, cocktail_id, report_category, report_reason, status, created_at, updated_at, '
+    'cocktails (id, order_id, name, comment, '
+    'flavor_ratio1, flavor_ratio2, flavor_ratio3, flavor_ratio4, user_name, is_visible)'
+)
+VIOLATION_REPORT_STATUSES = ['pending', 'reviewing', 'resolved', 'rejected']
+IMAGE_BUCKET = 'cocktail-images'
+
+def build_public_image_url(path: str, bucket: str = IMAGE_BUCKET) -> str:
+    """公開バケットの画像URLを組み立てる（SDKの get_public_url と同じ形式、通信なし）"""
+    return f"{supabase_client.url.rstrip('/')}/storage/v1/object/public/{bucket}/{path}"
+
+def _violation_status_filter(status_filter: Optional[str], show_all: bool) -> Optional[List[str]]:
+    """一覧の対象ステータス（Noneは全ステータス）"""
+    if show_all:
+        return None
+    if status_filter:
+        return [status_filter]
+    # デフォルトは未処理・確認中
+    return ['pending', 'reviewing']
+
+def _format_violation_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """違反報告をAPIレスポンス用に整形"""
+    cocktail = report.get('cocktails') or {}
+    
+    # レシピを構築
+    recipe = []
+    if cocktail.get('flavor_ratio1', '0%') != '0%':
+        recipe.append({'syrup': 'ベリー', 'ratio': cocktail.get('flavor_ratio1', '0%')})
+    if cocktail.get('flavor_ratio2', '0%') != '0%':
+        recipe.append({'syrup': '青りんご', 'ratio': cocktail.get('flavor_ratio2', '0%')})
+    if cocktail.get('flavor_ratio3', '0%') != '0%':
+        recipe.append({'syrup': 'シトラス', 'ratio': cocktail.get('flavor_ratio3', '0%')})
+    if cocktail.get('flavor_ratio4', '0%') != '0%':
+        recipe.append({'syrup': 'ホワイト', 'ratio': cocktail.get('flavor_ratio4', '0%')})
+    
+    # 画像URL（UUIDベースのファイル名、UUIDがない場合は古いorder_id形式）
+    image_key = cocktail.get('id') or cocktail.get('order_id')
+    image_url = build_public_image_url(f"cocktails/{image_key}.png") if image_key else ''
+    
+    return {
+        'id': report['id'],
+        'cocktail_id': report['cocktail_id'],
+        'order_id': cocktail.get('order_id', ''),  # 注文番号を追加
+        'cocktail_name': cocktail.get('name', ''),
+        'cocktail_creator': cocktail.get('user_name', ''),
+        'cocktail_concept': cocktail.get('comment', ''),
+        'cocktail_image': image_url,
+        'cocktail_recipe': recipe,
+        'report_category': report['report_category'],
+        'report_reason': report['report_reason'],
+        'status': report.get('status', 'pending'),
+        'created_at': report['created_at'],
+        'updated_at': report.get('updated_at') or report['created_at']
+    }
+
 def get_violation_reports(cocktail_id: str = None, status_filter: str = None, show_all: bool = False):
     """違反報告一覧を取得（カクテル情報を含む）"""
     try:
-        print(f"違反報告取得開始 - cocktail_id: {cocktail_id}, status_filter: {status_filter}, show_all: {show_all}")
-        
-        # まず全レコード数を確認
-        all_count = supabase_client.client.table('violation_reports').select('id', count='exact').execute()
-        print(f"violation_reports テーブル全体のレコード数: {all_count.count}")
-        
-        # 非表示カクテルの数も確認
-        try:
-            hidden_count = supabase_client.client.table('cocktails').select('id', count='exact').eq('is_visible', False).execute()
-            print(f"非表示カクテル数: {hidden_count.count}")
-        except Exception as e:
-            print(f"非表示カクテル数取得エラー: {e}")
-        
-        # カクテル情報も含めて取得
-        query = supabase_client.client.table('violation_reports').select('''
-            *,
-            cocktails (
-                id,
-                order_id,
-                name,
-                comment,
-                flavor_ratio1,
-                flavor_ratio2,
-                flavor_ratio3,
-                flavor_ratio4,
-                user_name,
-                is_visible
-            )
-        ''')
+        query = supabase_client.client.table('violation_reports').select(VIOLATION_REPORT_LIST_COLUMNS)
         
         if cocktail_id:
             # cocktail_idはUUID文字列として扱う
             query = query.eq('cocktail_id', cocktail_id)
         
-        # ステータスフィルター処理
-        if show_all:
-            print("すべてのステータスを表示")
-            # ステータスフィルターなし
-        elif status_filter:
-            print(f"特定ステータスフィルター適用: {status_filter}")
-            query = query.eq('status', status_filter)
-        else:
-            print("デフォルトフィルター適用: pending, reviewing")
-            query = query.in_('status', ['pending', 'reviewing'])
+        statuses = _violation_status_filter(status_filter, show_all)
+        if statuses:
+            query = query.in_('status', statuses)
         
         result = query.order('created_at', desc=True).execute()
-        print(f"クエリ結果: {len(result.data) if result.data else 0}件")
-        if result.data:
-            for report in result.data[:3]:  # 最初の3件だけログ出力
-                print(f"  報告ID: {report.get('id')}, ステータス: {report.get('status', 'None')}")
-        
-        # ステータス別の件数も確認
+        return [_format_violation_report(report) for report in result.data or []]
+    except Exception as e:
+        logger.error("違反報告取得エラー: %s", e)
+        return []
+
+def encode_violation_cursor(report: Dict[str, Any]) -> str:
+    """一覧の続きを取得するためのカーソル（最後の報告の created_at と id）"""
+    payload = json.dumps({'created_at': report['created_at'], 'id': report['id']})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_violation_cursor(cursor: str) -> Dict[str, Any]:
+    """カーソルを復元（不正な値はValueError）
+
+    値はPostgRESTのフィルター文字列に埋め込むため、日時として解釈できたものを書式化し直して使う
+    （引用符やカンマを含む値で条件を追加されないようにする）
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        if not isinstance(payload['created_at'], str):
+            raise TypeError("created_at が文字列ではありません")
+        created_at = datetime.fromisoformat(payload['created_at'])
+        return {'created_at': created_at.isoformat(), 'id': int(payload['id'])}
+    except Exception as e:
+        raise ValueError(f"無効なカーソル: {cursor}") from e
+
+def get_violation_reports_page(
+    cocktail_id: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    show_all: bool = False,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """違反報告一覧を新しい順に1ページ取得（(created_at, id) のキーセットページネーション）"""
+    after = decode_violation_cursor(cursor) if cursor else None
+    
+    query = supabase_client.client.table('violation_reports').select(VIOLATION_REPORT_LIST_COLUMNS)
+    if cocktail_id:
+        query = query.eq('cocktail_id', cocktail_id)
+    statuses = _violation_status_filter(status_filter, show_all)
+    if statuses:
+        query = query.in_('status', statuses)
+    if after:
+        # 前ページ最後の報告より古い報告（タイムスタンプは + や : を含むため引用符で囲む）
+        created_at = after['created_at']
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{after["id"]})'
+        )
+    
+    # 次ページの有無を判定するため1件多く取得
+    result = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+    rows = result.data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        'reports': [_format_violation_report(report) for report in rows],
+        'next_cursor': encode_violation_cursor(rows[-1]) if has_more else None,
+        'status_counts': get_violation_status_counts()
+    }
+
+def get_violation_status_counts() -> Dict[str, int]:
+    """ステータス別の違反報告数（集計ビュー → ステータスごとの件数クエリの順で試行）"""
+    counts = {status: 0 for status in VIOLATION_REPORT_STATUSES}
+    try:
+        result = supabase_client.client.table('violation_report_status_counts').select('status, report_count').execute()
+        for row in result.data or []:
+            status = row.get('status') or 'pending'
+            counts[status] = counts.get(status, 0) + row['report_count']
+        return counts
+    except Exception as e:
+        logger.warning("違反報告ステータス集計ビュー取得エラー（件数クエリにフォールバック）: %s", e)
+    
+    for status in VIOLATION_REPORT_STATUSES:
         try:
-            status_counts = supabase_client.client.table('violation_reports').select('status').execute()
-            statuses = [r.get('status') for r in status_counts.data] if status_counts.data else []
-            print(f"実際のステータス値: {set(statuses)}")
+            result = supabase_client.client.table('violation_reports').select('id', count='exact').eq('status', status).limit(1).execute()
+            counts[status] = result.count or 0
         except Exception as e:
-            print(f"ステータス確認エラー: {e}")
-        
-        # データを整形
-        formatted_reports = []
-        for report in result.data:
-            cocktail = report.get('cocktails', {})
-            
-            # レシピを構築
-            recipe = []
-            if cocktail.get('flavor_ratio1', '0%') != '0%':
-                recipe.append({'syrup': 'ベリー', 'ratio': cocktail.get('flavor_ratio1', '0%')})
-            if cocktail.get('flavor_ratio2', '0%') != '0%':
-                recipe.append({'syrup': '青りんご', 'ratio': cocktail.get('flavor_ratio2', '0%')})
-            if cocktail.get('flavor_ratio3', '0%') != '0%':
-                recipe.append({'syrup': 'シトラス', 'ratio': cocktail.get('flavor_ratio3', '0%')})
-            if cocktail.get('flavor_ratio4', '0%') != '0%':
-                recipe.append({'syrup': 'ホワイト', 'ratio': cocktail.get('flavor_ratio4', '0%')})
-            
-            # 画像URLの処理（バケットから取得・ID対応）
-            cocktail_uuid = cocktail.get('id', '')
-            order_id = cocktail.get('order_id', '')
-            image_url = ''
-            
-            if cocktail_uuid:
-                # UUIDベースのファイル名で画像URL生成
-                filename = f"cocktails/{cocktail_uuid}.png"
-                url_response = supabase_client.client.storage.from_("cocktail-images").get_public_url(filename)
-                
-                # URL レスポンスの構造を確認
-                if hasattr(url_response, 'public_url'):
-                    image_url = url_response.public_url
-                elif hasattr(url_response, 'publicURL'):
-                    image_url = url_response.publicURL
-                elif isinstance(url_response, str):
-                    image_url = url_response
-                elif isinstance(url_response, dict):
-                    image_url = url_response.get('public_url') or url_response.get('publicURL') or ''
-                else:
-                    image_url = str(url_response) if url_response else ''
-                    
-            elif order_id:
-                # フォールバック：UUIDがない場合は古いorder_id形式で試す
-                filename = f"cocktails/{order_id}.png"
-                url_response = supabase_client.client.storage.from_("cocktail-images").get_public_url(filename)
-                
-                if hasattr(url_response, 'public_url'):
-                    image_url = url_response.public_url
-                elif hasattr(url_response, 'publicURL'):
-                    image_url = url_response.publicURL
-                elif isinstance(url_response, str):
-                    image_url = url_response
-                elif isinstance(url_response, dict):
-                    image_url = url_response.get('public_url') or url_response.get('publicURL') or ''
-                else:
-                    image_url = str(url_response) if url_response else ''
-                
-                # URL の末尾に余分な ? があれば削除
-                if image_url and image_url.endswith('?'):
-                    image_url = image_url.rstrip('?')
-            else:
-                image_url = ''
-            
-            formatted_report = {
-                'id': report['id'],
-                'cocktail_id': report['cocktail_id'],
-                'order_id': cocktail.get('order_id', ''),  # 注文番号を追加
-                'cocktail_name': cocktail.get('name', ''),
-                'cocktail_creator': cocktail.get('user_name', ''),
-                'cocktail_concept': cocktail.get('comment', ''),
-                'cocktail_image': image_url,
-                'cocktail_recipe': recipe,
-                'report_category': report['report_category'],
-                'report_reason': report['report_reason'],
-                'status': report.get('status', 'pending'),
-                'created_at': report['created_at'],
-                'updated_at': report.get('updated_at', report['created_at'])
-            }
-            formatted_reports.append(formatted_report)
-        
-        return formatted_reports
+            logger.error("違反報告数取得エラー（%s）: %s", status, e)
+    return counts
+
+def get_violation_category_counts() -> Dict[str, int]:
+    """カテゴリ別の違反報告数（カウンターテーブル → 報告のカテゴリ列の集計の順で試行）"""
+    try:
+        result = supabase_client.client.table('violation_report_counters').select('key, report_count').eq('dimension', 'category').execute()
+        return {row['key']: row['report_count'] for row in result.data or [] if row['report_count'] > 0}
+    except Exception as e:
+        logger.warning("違反報告カテゴリ集計取得エラー（報告の集計にフォールバック）: %s", e)
+    
+    counts: Dict[str, int] = {}
+    try:
+        result = supabase_client.client.table('violation_reports').select('report_category').execute()
+        for row in result.data or []:
+            category = row.get('report_category') or 'other'
+            counts[category] = counts.get(category, 0) + 1
     except Exception as e:
-        print(f"違反報告取得エラー: {e}")
+        logger.error("違反報告カテゴリ集計エラー: %s", e)
+    return counts
+
+def get_most_reported_cocktails(limit: int = 10) -> List[Dict[str, Any]]:
+    """違反報告数の多いカクテル（cocktails.violation_reports_count を使用）"""
+    try:
+        result = supabase_client.client.table('cocktails').select('id, order_id, violation_reports_count').gt(
+            'violation_reports_count', 0
+        ).order('violation_reports_count', desc=True).limit(limit).execute()
+        return [
+            {'cocktail_id': row['id'], 'order_id': row.get('order_id'), 'report_count': row['violation_reports_count']}
+            for row in result.data or []
+        ]
+    except Exception as e:
+        logger.error("違反報告数上位カクテル取得エラー: %s", e)
         return []
 
 def update_violation_report_status(report_id: int, status: str):
     """違反報告のステータスを更新"""
     try:
-        valid_statuses = ['pending', 'reviewing', 'resolved', 'rejected']
-        if status not in valid_statuses:
+        if status not in VIOLATION_REPORT_STATUSES:
             raise ValueError(f"無効なステータス: {status}")
         
         # まず報告を取得してカクテルIDを確認
@@ -368,26 +547,38 @@ def update_violation_report_status(report_id: int, status: str):
         # rejected: 違反ではないと判断された場合
         # resolved: 対応済み（問題が解決され、カクテルは表示されるべき）
         if status in ['rejected', 'resolved'] and result.data:
-            print(f"違反報告が{status}になりました。カクテルID {cocktail_id} を再表示します。")
+            logger.debug("違反報告が%sになりました。カクテルID %s を再表示します。", status, cocktail_id)
             show_cocktail_result = supabase_client.client.table('cocktails').update({
                 'is_visible': True
             }).eq('id', cocktail_id).execute()
-            print(f"カクテル再表示結果: {bool(show_cocktail_result.data)}")
+            invalidate_cocktail_cache(cocktail_id)
+            logger.debug("カクテル再表示結果: %s", bool(show_cocktail_result.data))
         
         return bool(result.data)
     except Exception as e:
-        print(f"違反報告ステータス更新エラー: {e}")
+        logger.error("違反報告ステータス更新エラー: %s", e)
         return False
 
 # アンケート関連の関数
 
 def create_survey(data: dict) -> Optional[str]:
     """アンケートを作成"""
-    return supabase_client.create_survey(data)
+    result = supabase_client.create_survey(data)
+    invalidate_event_context(data.get('event_id'))
+    return result
 
 def create_survey_with_questions(survey_data: dict, questions: List[dict]) -> Optional[str]:
     """アンケートを質問と選択肢とともに一括作成"""
-    return supabase_client.create_survey_with_questions(survey_data, questions)
+    survey = create_survey_definition(survey_data, questions)
+    return str(survey['id']) if survey else None
+
+def create_survey_definition(survey_data: dict, questions: List[dict]) -> Optional[Dict[str, Any]]:
+    """アンケート・質問・選択肢を1回で作成し、質問・選択肢込みのアンケートを返す"""
+    survey = supabase_client.create_survey_definition(survey_data, questions)
+    invalidate_event_context(survey_data.get('event_id'))
+    if survey:
+        _survey_definition_cache.set(str(survey['id']), SurveyDefinition(survey))
+    return survey
 
 def get_surveys_by_event(event_id: str, is_active: bool = None) -> List[Dict[str, Any]]:
     """イベントのアンケート一覧を取得"""
@@ -397,21 +588,63 @@ def get_survey_with_questions(survey_id: str) -> Optional[Dict[str, Any]]:
     """アンケート詳細を質問と選択肢とともに取得"""
     return supabase_client.get_survey_with_questions(survey_id)
 
+def get_survey_definition(survey_id: str) -> Optional[SurveyDefinition]:
+    """アンケート定義を取得（キャッシュ経由）"""
+    def load() -> Optional[SurveyDefinition]:
+        survey = supabase_client.get_survey_with_questions(survey_id)
+        return SurveyDefinition(survey) if survey else None
+    return _survey_definition_cache.get_or_load(str(survey_id), load)
+
+def invalidate_survey_definition(survey_id: str = None) -> None:
+    """アンケート定義のキャッシュを破棄（ID未指定時は全件）"""
+    if survey_id:
+        _survey_definition_cache.invalidate(str(survey_id))
+    else:
+        _survey_definition_cache.clear()
+    # 有効なアンケートの切り替えや定義の変更を反映するため、イベント情報も破棄する
+    invalidate_event_context()
+
 def update_survey(survey_id: str, data: dict) -> bool:
     """アンケートを更新"""
-    return supabase_client.update_survey(survey_id, data)
+    result = supabase_client.update_survey(survey_id, data)
+    invalidate_survey_definition(survey_id)
+    return result
 
 def delete_survey(survey_id: str) -> bool:
     """アンケートを削除"""
-    return supabase_client.delete_survey(survey_id)
+    result = supabase_client.delete_survey(survey_id)
+    invalidate_survey_definition(survey_id)
+    return result
 
 def delete_survey_questions(survey_id: str) -> bool:
     """アンケートの質問項目をすべて削除"""
-    return supabase_client.delete_survey_questions(survey_id)
+    result = supabase_client.delete_survey_questions(survey_id)
+    invalidate_survey_definition(survey_id)
+    return result
+
+def delete_survey_questions_by_ids(survey_id: str, question_ids: List[str]) -> bool:
+    """指定した質問項目を削除"""
+    result = supabase_client.delete_survey_questions_by_ids(survey_id, question_ids)
+    invalidate_survey_definition(survey_id)
+    return result
+
+def update_survey_question(survey_id: str, question_id: str, data: dict) -> bool:
+    """質問項目を更新"""
+    result = supabase_client.update_survey_question(question_id, data)
+    invalidate_survey_definition(survey_id)
+    return result
+
+def create_survey_questions(survey_id: str, questions: List[dict]) -> bool:
+    """質問項目と選択肢を一括作成"""
+    result = supabase_client.create_survey_questions(survey_id, questions)
+    invalidate_survey_definition(survey_id)
+    return result
 
 def create_survey_question(question_data: dict) -> Optional[str]:
     """アンケート質問項目を作成"""
-    return supabase_client.create_survey_question(question_data)
+    result = supabase_client.create_survey_question(question_data)
+    invalidate_survey_definition(question_data.get('survey_id'))
+    return result
 
 def submit_survey_response(survey_id: str, cocktail_uuid: Optional[str], answers: List[Dict[str, Any]]) -> Optional[str]:
     """アンケート回答を送信（UUID使用）"""
@@ -421,31 +654,31 @@ def get_survey_responses(survey_id: str, limit: int = None, offset: int = 0) ->
     """アンケート回答一覧を取得"""
     return supabase_client.get_survey_responses(survey_id, limit, offset)
 
-def get_survey_statistics(survey_id: str) -> Dict[str, Any]:
-    """アンケート集計結果を取得"""
-    return supabase_client.get_survey_statistics(survey_id)
+def iter_survey_responses(survey_id: str, page_size: int = None) -> Iterator[List[Dict[str, Any]]]:
+    """アンケート回答をページ単位で順に取得（エクスポート用）"""
+    return supabase_client.iter_survey_responses(survey_id, page_size or settings.SURVEY_EXPORT_PAGE_SIZE)
+
+def get_survey_statistics(survey_id: str, text_sample_limit: int = None) -> Dict[str, Any]:
+    """アンケート集計結果を取得（テキスト回答は新しい順にサンプル件数まで）"""
+    if text_sample_limit is None:
+        text_sample_limit = settings.SURVEY_STATS_TEXT_SAMPLE_LIMIT
+    return supabase_client.get_survey_statistics(survey_id, text_sample_limit)
 
 def create_question_option(option_data: dict) -> Optional[str]:
     """質問の選択肢を作成"""
-    return supabase_client.create_question_option(option_data)
+    # 選択肢からはアンケートIDを辿れないため全件破棄（管理画面からの編集時のみ）
+    result = supabase_client.create_question_option(option_data)
+    invalidate_survey_definition()
+    return result
 
 # その他の不足メソッド
-def get_cocktail_by_id(cocktail_id: int) -> Optional[Dict[str, Any]]:
-    """IDでカクテルを取得"""
-    try:
-        result = supabase_client.client.table('cocktails').select('*').eq('id', cocktail_id).execute()
-        return result.data[0] if result.data else None
-    except Exception as e:
-        print(f"カクテル取得エラー: {e}")
-        return None
-
 def get_cocktails_count_by_event(event_id: Union[str, uuid.UUID]) -> int:
     """イベントのカクテル数を取得"""
     try:
         result = supabase_client.client.table('cocktails').select('id', count='exact').eq('event_id', str(event_id)).execute()
         return result.count or 0
     except Exception as e:
-        print(f"イベントカクテル数取得エラー: {e}")
+        logger.error("イベントカクテル数取得エラー: %s", e)
         return 0
 
 def get_violation_report_by_cocktail_and_reporter(cocktail_uuid: str, reporter_ip: str) -> Optional[Dict[str, Any]]:
@@ -454,7 +687,7 @@ def get_violation_report_by_cocktail_and_reporter(cocktail_uuid: str, reporter_i
         result = supabase_client.client.table('violation_reports').select('*').eq('cocktail_id', cocktail_uuid).eq('reporter_id', reporter_ip).execute()
         return result.data[0] if result.data else None
     except Exception as e:
-        print(f"違反報告取得エラー: {e}")
+        logger.error("違反報告取得エラー: %s", e)
         return None
 
 def get_violation_reports_count(cocktail_uuid: str) -> int:
@@ -463,16 +696,16 @@ def get_violation_reports_count(cocktail_uuid: str) -> int:
         result = supabase_client.client.table('violation_reports').select('id', count='exact').eq('cocktail_id', cocktail_uuid).execute()
         return result.count or 0
     except Exception as e:
-        print(f"違反報告数取得エラー: {e}")
+        logger.error("違反報告数取得エラー: %s", e)
         return 0
 
 def get_cocktail_by_uuid(cocktail_uuid: str) -> Optional[Dict[str, Any]]:
-    """IDでカクテルを取得"""
+    """IDでカクテルを取得（管理用カラム）"""
     try:
-        result = supabase_client.client.table('cocktails').select('*').eq('id', cocktail_uuid).execute()
+        result = supabase_client.client.table('cocktails').select(COCKTAIL_MODERATION_COLUMNS).eq('id', cocktail_uuid).execute()
         return result.data[0] if result.data else None
     except Exception as e:
-        print(f"カクテル取得エラー（ID）: {e}")
+        logger.error("カクテル取得エラー（ID）: %s", e)
         return None
 
 def hide_cocktail_by_uuid(cocktail_uuid: str, reason: str) -> bool:
@@ -482,15 +715,16 @@ def hide_cocktail_by_uuid(cocktail_uuid: str, reason: str) -> bool:
             'is_visible': False,
             'hidden_reason': reason
         }).eq('id', cocktail_uuid).execute()
+        invalidate_cocktail_cache(cocktail_uuid)
         
         if result.data:
-            print(f"カクテル非表示成功（ID）: {cocktail_uuid}")
+            logger.debug("カクテル非表示成功（ID）: %s", cocktail_uuid)
             return True
         else:
-            print(f"カクテル非表示失敗（ID）: {cocktail_uuid}")
+            logger.error("カクテル非表示失敗（ID）: %s", cocktail_uuid)
             return False
     except Exception as e:
-        print(f"カクテル非表示エラー（ID）: {e}")
+        logger.error("カクテル非表示エラー（ID）: %s", e)
         return False
 
 def get_violation_report_by_id(report_id: int) -> Optional[Dict[str, Any]]:
@@ -499,7 +733,7 @@ def get_violation_report_by_id(report_id: int) -> Optional[Dict[str, Any]]:
         result = supabase_client.client.table('violation_reports').select('*').eq('id', report_id).execute()
         return result.data[0] if result.data else None
     except Exception as e:
-        print(f"違反報告取得エラー: {e}")
+        logger.error("違反報告取得エラー: %s", e)
         return None
 
 def get_hidden_cocktails_count() -> int:
@@ -508,7 +742,7 @@ def get_hidden_cocktails_count() -> int:
         result = supabase_client.client.table('cocktails').select('id', count='exact').eq('is_visible', False).execute()
         return result.count or 0
     except Exception as e:
-        print(f"非表示カクテル数取得エラー: {e}")
+        logger.error("非表示カクテル数取得エラー: %s", e)
         return 0
 
 def get_cocktails_count() -> int:
@@ -517,7 +751,7 @@ def get_cocktails_count() -> int:
         result = supabase_client.client.table('cocktails').select('id', count='exact').execute()
         return result.count or 0
     except Exception as e:
-        print(f"カクテル数取得エラー: {e}")
+        logger.error("カクテル数取得エラー: %s", e)
         return 0
 
 def update_copyright_confirmation(cocktail_uuid: str, confirmed: bool) -> bool:
@@ -534,16 +768,17 @@ def update_copyright_confirmation(cocktail_uuid: str, confirmed: bool) -> bool:
             data['copyright_confirmed_at'] = datetime.now().isoformat()
         
         result = supabase_client.client.table('cocktails').update(data).eq('id', cocktail_uuid).execute()
+        invalidate_cocktail_cache(cocktail_uuid)
         
         if result.data:
-            print(f"著作権確認更新成功 - cocktail_id: {cocktail_uuid}, confirmed: {confirmed}")
+            logger.debug("著作権確認更新成功 - cocktail_id: %s, confirmed: %s", cocktail_uuid, confirmed)
             return True
         else:
-            print(f"著作権確認更新失敗 - cocktail_id: {cocktail_uuid}")
+            logger.error("著作権確認更新失敗 - cocktail_id: %s", cocktail_uuid)
             return False
             
     except Exception as e:
-        print(f"著作権確認更新エラー: {e}")
+        logger.error("著作権確認更新エラー: %s", e)
         return False
 
 def get_copyright_status(cocktail_uuid: str) -> Optional[Dict[str, Any]]:
@@ -556,9 +791,9 @@ def get_copyright_status(cocktail_uuid: str) -> Optional[Dict[str, Any]]:
         if result.data:
             return result.data[0]
         else:
-            print(f"著作権ステータス取得失敗 - cocktail_id: {cocktail_uuid}")
+            logger.error("著作権ステータス取得失敗 - cocktail_id: %s", cocktail_uuid)
             return None
             
     except Exception as e:
-        print(f"著作権ステータス取得エラー: {e}")
+        logger.error("著作権ステータス取得エラー: %s", e)
         return None
\ No newline at end of file
@@ -0,0 +1,25 @@
+"""
+カクテル作成時に参照するイベント情報（イベント名・有効なアンケート）
+"""
+from typing import Any, Dict, Optional
+
+from .survey_definition import SurveyDefinition
+
+
+class EventContext:
+    """イベントと、そのイベントで現在有効なアンケート定義をまとめたもの（キャッシュして共有するため変更しない）"""
+
+    def __init__(
+        self,
+        event: Dict[str, Any],
+        active_survey_id: Optional[str] = None,
+        survey: Optional[SurveyDefinition] = None,
+    ):
+        self.event = dict(event)
+        self.event_id = str(self.event.get('id', ''))
+        self.active_survey_id = active_survey_id
+        self.survey = survey
+
+    def event_name(self, default: str = '') -> str:
+        """イベント名（DBに名前がない場合はdefault）"""
+        return self.event.get('name', default)
@@ -1,12 +1,40 @@
+import logging
 import os
-from typing import Optional, Dict, Any, List, Union
+from typing import Optional, Dict, Any, List, Union, Callable, Iterator
 from datetime import datetime
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import uuid
 
+from utils.metrics import instrument_methods, io_method, record_retry
+from utils.tracing import instrument_httpx_client
+
+logger = logging.getLogger(__name__)
+
 load_dotenv(override=True)
 
+# cocktailsテーブルの用途別カラム（select('*')で長いテキスト列まで取得しないため）
+# 注ぎ機・注文照会: /order/, /cocktail/order, 画像取得, 注文番号からの違反報告・表示切替
+COCKTAIL_POUR_COLUMNS = (
+    'id, order_id, name, comment, '
+    'flavor_ratio1, flavor_ratio2, flavor_ratio3, flavor_ratio4, is_visible'
+)
+# ギャラリー一覧: /order/?order_id=all
+COCKTAIL_GALLERY_COLUMNS = (
+    'id, order_id, name, comment, '
+    'flavor_ratio1, flavor_ratio2, flavor_ratio3, flavor_ratio4, event_id, created_at'
+)
+# 管理・モデレーション: 非表示処理、違反報告ステータス更新、著作権確認
+COCKTAIL_MODERATION_COLUMNS = (
+    'id, order_id, name, event_id, is_visible, hidden_at, hidden_reason, '
+    'violation_reports_count, copyright_confirmed, copyright_confirmed_at, created_at'
+)
+
+# サマリーテーブルに保持するテキスト回答サンプルの件数
+# migration/20261019_03 の survey_statistics_text_sample_cap() と合わせる
+SURVEY_SUMMARY_TEXT_SAMPLE_CAP = 100
+
+@instrument_methods("supabase")
 class SupabaseClient:
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL")
@@ -15,77 +43,138 @@ class SupabaseClient:
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URLとSUPABASE_SERVICE_ROLE_KEYまたはSUPABASE_ANON_KEYが設定されていません")
         self.client: Client = create_client(self.url, self.key)
+        # PostgREST・StorageへのHTTPリクエストをトレースのスパンにする
+        # （SDK内部の属性のため、SDKの更新で見つからない場合は計装を省略する）
+        instrument_httpx_client(getattr(self.client.postgrest, 'session', None), "postgrest")
+        instrument_httpx_client(getattr(self.client.storage, '_client', None), "storage")
     
+    @io_method
     def create_tables(self):
         """新しいマイグレーションファイルを使用してテーブル作成"""
-        print("⚠️  新しいSupabaseプロジェクトでは、マイグレーションファイルを手動実行してください:")
-        print("\n📋 実行手順:")
-        print("1. Supabaseダッシュボード → SQL Editor")
-        print("2. 以下のファイルを順番に実行:")
-        print("   - migration/20250130_01_create_base_tables.sql")
-        print("   - migration/20250130_02_create_prompt_tables.sql") 
-        print("   - migration/20250130_03_create_violation_tables.sql")
-        print("   - migration/20250130_04_create_survey_tables.sql")
-        print("   - migration/20250130_05_create_indexes.sql")
-        print("   - migration/20250130_06_create_triggers.sql")
-        print("\n詳細は migration/migration_history.md を参照してください。")
+        logger.info("⚠️  新しいSupabaseプロジェクトでは、マイグレーションファイルを手動実行してください:")
+        logger.info("\n📋 実行手順:")
+        logger.info("1. Supabaseダッシュボード → SQL Editor")
+        logger.info("2. 以下のファイルを順番に実行:")
+        logger.info("   - migration/20250130_01_create_base_tables.sql")
+        logger.info("   - migration/20250130_02_create_prompt_tables.sql") 
+        logger.info("   - migration/20250130_03_create_violation_tables.sql")
+        logger.info("   - migration/20250130_04_create_survey_tables.sql")
+        logger.info("   - migration/20250130_05_create_indexes.sql")
+        logger.info("   - migration/20250130_06_create_triggers.sql")
+        logger.info("\n詳細は migration/migration_history.md を参照してください。")
     
+    @io_method
     def insert_cocktail(self, data: Dict[str, Any]) -> Optional[str]:
         """カクテルデータを挿入（UUIDプライマリキー使用）"""
         try:
             # idが指定されていない場合、データベース側でgen_random_uuid()が自動生成される
-            print(f"[DEBUG] カクテル挿入 - id: {data.get('id', 'auto-generate')}")
+            logger.debug("カクテル挿入 - id: %s", data.get('id', 'auto-generate'))
             
             result = self.client.table('cocktails').insert(data).execute()
             if result.data:
                 return result.data[0]['id']  # ID文字列を返す
             return None
         except Exception as e:
-            print(f"Supabase挿入エラー(cocktails): {e}")
+            logger.error("Supabase挿入エラー(cocktails): %s", e)
             return None
-    
-    def get_cocktail_by_order_id(self, order_id: str) -> Optional[Dict[str, Any]]:
+
+    @io_method
+    def reserve_order_id_block(self, count: int) -> List[int]:
+        """注文ID用シーケンス番号をまとめて予約（1回のRPC）"""
+        try:
+            result = self.client.rpc('reserve_order_id_block', {'p_count': count}).execute()
+            return [int(value) for value in (result.data or [])]
+        except Exception as e:
+            logger.error("注文IDシーケンス予約エラー: %s", e)
+            return []
+
+    @staticmethod
+    def _is_order_id_conflict(error: Exception) -> bool:
+        """order_idの一意制約違反かどうかを判定"""
+        if getattr(error, 'code', None) != '23505':
+            return False
+        detail = f"{getattr(error, 'message', '')} {getattr(error, 'details', '')}"
+        return 'order_id' in detail
+
+    @io_method
+    def insert_cocktail_with_order_id(
+        self,
+        data: Dict[str, Any],
+        next_order_id: Callable[[], Optional[str]],
+        max_attempts: int
+    ) -> Optional[Dict[str, Any]]:
+        """カクテルを挿入し、order_idが重複した場合は新しい番号で再試行（挿入された行を返す）"""
+        row = dict(data)
+        for attempt in range(max_attempts):
+            try:
+                result = self.client.table('cocktails').insert(row).execute()
+                return result.data[0] if result.data else None
+            except Exception as e:
+                if not self._is_order_id_conflict(e):
+                    logger.error("Supabase挿入エラー(cocktails): %s", e)
+                    return None
+                logger.debug("注文ID重複 (試行%s): %s", attempt+1, row.get('order_id'))
+                record_retry("supabase.insert_cocktail_with_order_id")
+                row['order_id'] = next_order_id()
+                if not row['order_id']:
+                    return None
+
+        logger.error("%s回試行しても注文IDの重複を解消できませんでした", max_attempts)
+        return None
+
+    @io_method
+    def get_cocktail_by_order_id(self, order_id: str, columns: str = COCKTAIL_POUR_COLUMNS) -> Optional[Dict[str, Any]]:
         """注文IDでカクテルを取得"""
         try:
-            result = self.client.table('cocktails').select('*').eq('order_id', order_id).execute()
+            result = self.client.table('cocktails').select(columns).eq('order_id', order_id).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"Supabase取得エラー: {e}")
+            logger.error("Supabase取得エラー: %s", e)
             return None
 
-    def get_cocktail_by_id(self, cocktail_id: str) -> Optional[Dict[str, Any]]:
+    @io_method
+    def get_cocktail_by_id(self, cocktail_id: str, columns: str = COCKTAIL_MODERATION_COLUMNS) -> Optional[Dict[str, Any]]:
         """UUIDでカクテルを取得（プライマリキーがUUIDに変更済み）"""
         try:
-            result = self.client.table('cocktails').select('*').eq('id', cocktail_id).execute()
+            result = self.client.table('cocktails').select(columns).eq('id', cocktail_id).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"カクテル取得エラー: {e}")
+            logger.error("カクテル取得エラー: %s", e)
             return None
 
+    @io_method
     def get_uuid_from_order_id(self, order_id: str) -> Optional[str]:
         """order_idからUUIDを取得"""
         try:
             result = self.client.table('cocktails').select('uuid').eq('order_id', order_id).execute()
             return result.data[0]['uuid'] if result.data else None
         except Exception as e:
-            print(f"UUID取得エラー: {e}")
+            logger.error("UUID取得エラー: %s", e)
             return None
 
+    @io_method
     def get_order_id_from_uuid(self, uuid_id: str) -> Optional[str]:
         """UUIDからorder_idを取得"""
         try:
             result = self.client.table('cocktails').select('order_id').eq('id', uuid_id).execute()
             return result.data[0]['order_id'] if result.data else None
         except Exception as e:
-            print(f"order_id取得エラー: {e}")
+            logger.error("order_id取得エラー: %s", e)
             return None
     
-    def get_all_cocktails(self, limit: int = None, offset: int = 0, event_id: Union[str, uuid.UUID] = None) -> Dict[str, Any]:
+    @io_method
+    def get_all_cocktails(
+        self,
+        limit: int = None,
+        offset: int = 0,
+        event_id: Union[str, uuid.UUID] = None,
+        columns: str = COCKTAIL_GALLERY_COLUMNS
+    ) -> Dict[str, Any]:
         """全カクテルを取得（作成日時降順）、event_idでフィルター可能"""
         try:
             # データを取得（limit+1で次のページの存在を確認）
             extra_limit = limit + 1 if limit else None
-            query = self.client.table('cocktails').select('*').eq('is_visible', True).eq('copyright_confirmed', True).order('created_at', desc=True)
+            query = self.client.table('cocktails').select(columns).eq('is_visible', True).eq('copyright_confirmed', True).order('created_at', desc=True)
             
             # イベントIDでフィルター
             if event_id is not None:
@@ -98,22 +187,22 @@ class SupabaseClient:
             if offset > 0:
                 query = query.offset(offset)
                 
-            print(f"デバッグ: クエリ実行 - limit={limit}, offset={offset}, extra_limit={extra_limit}")
+            logger.debug("クエリ実行 - limit=%s, offset=%s, extra_limit=%s", limit, offset, extra_limit)
             result = query.execute()
             data = result.data or []
-            print(f"デバッグ: 取得件数={len(data)}")
+            logger.debug("取得件数=%s", len(data))
             
             # 次のページがあるかを判定
             has_next = False
             if limit and len(data) > limit:
                 has_next = True
                 data = data[:limit]  # 余分な1件を削除
-                print(f"デバッグ: 次ページあり、データを{limit}件に調整")
+                logger.debug("次ページあり、データを%s件に調整", limit)
             
             # 前のページがあるかを判定
             has_prev = offset > 0
             
-            print(f"デバッグ: 結果 - データ件数={len(data)}, has_next={has_next}, has_prev={has_prev}")
+            logger.debug("結果 - データ件数=%s, has_next=%s, has_prev=%s", len(data), has_next, has_prev)
             
             # 安全な方法で全件数を取得
             total_count = self._get_total_count_safe(event_id=event_id)
@@ -127,7 +216,7 @@ class SupabaseClient:
                 'has_prev': has_prev
             }
         except Exception as e:
-            print(f"Supabase全件取得エラー: {e}")
+            logger.error("Supabase全件取得エラー: %s", e)
             # エラー時も件数取得を試行
             total_count = self._get_total_count_safe(event_id=event_id)
             
@@ -140,6 +229,7 @@ class SupabaseClient:
                 'has_prev': False
             }
     
+    @io_method
     def _get_total_count_safe(self, event_id: Union[str, uuid.UUID] = None) -> int:
         """安全に全件数を取得（タイムアウト対応）、event_idでフィルター可能"""
         try:
@@ -152,20 +242,20 @@ class SupabaseClient:
             count_result = query.execute()
             count = count_result.count
             if count is not None:
-                print(f"デバッグ: 全件数取得成功 = {count}")
+                logger.debug("全件数取得成功 = %s", count)
                 return count
         except Exception as e:
-            print(f"軽量カウントクエリエラー: {e}")
+            logger.error("軽量カウントクエリエラー: %s", e)
         
         try:
             # 方法2: さらに軽量なクエリ（created_atのみ）
             count_result = self.client.table('cocktails').select('created_at', count='exact').eq('is_visible', True).eq('copyright_confirmed', True).limit(1).execute()
             count = count_result.count
             if count is not None:
-                print(f"デバッグ: created_atカウント成功 = {count}")
+                logger.debug("created_atカウント成功 = %s", count)
                 return count
         except Exception as e:
-            print(f"created_atカウントエラー: {e}")
+            logger.error("created_atカウントエラー: %s", e)
         
         try:
             # 方法3: 複数回に分けて概算取得（1000件ずつ）
@@ -180,16 +270,17 @@ class SupabaseClient:
                 if chunk_count < limit_chunk:  # 最後のチャンクに到達
                     break
             
-            print(f"デバッグ: チャンク方式で概算取得 = {total_estimated}")
+            logger.debug("チャンク方式で概算取得 = %s", total_estimated)
             return total_estimated
             
         except Exception as e:
-            print(f"チャンク方式エラー: {e}")
+            logger.error("チャンク方式エラー: %s", e)
             
         # すべて失敗した場合はNone
-        print("デバッグ: すべての件数取得方式が失敗")
+        logger.debug("すべての件数取得方式が失敗")
         return None
     
+    @io_method
     def _get_total_count_efficient(self) -> int:
         """効率的に全件数を取得"""
         try:
@@ -197,7 +288,7 @@ class SupabaseClient:
             count_result = self.client.table('cocktails').select('uuid', count='exact').limit(1).execute()
             return count_result.count or 0
         except Exception as e:
-            print(f"件数取得エラー: {e}")
+            logger.error("件数取得エラー: %s", e)
             # エラー時は概算値として、現在取得できている最大ID+オフセットを返す
             try:
                 # 最新の1件だけ取得してIDベースで概算
@@ -209,6 +300,7 @@ class SupabaseClient:
             except:
                 return 0
     
+    @io_method
     def insert_poured_cocktail(self, data: Dict[str, Any]) -> Optional[int]:
         """注がれたカクテルデータを挿入"""
         try:
@@ -217,9 +309,10 @@ class SupabaseClient:
                 return result.data[0]['id']
             return None
         except Exception as e:
-            print(f"Supabase挿入エラー(poured_cocktails): {e}")
+            logger.error("Supabase挿入エラー(poured_cocktails): %s", e)
             return None
     
+    @io_method
     def table_exists(self, table_name: str) -> bool:
         """テーブルの存在確認"""
         try:
@@ -228,6 +321,7 @@ class SupabaseClient:
         except:
             return False
     
+    @io_method
     def get_prompts(self, prompt_type: str = None, is_active: bool = True) -> List[Dict[str, Any]]:
         """プロンプトを取得"""
         try:
@@ -239,18 +333,20 @@ class SupabaseClient:
             result = query.order('created_at', desc=True).execute()
             return result.data or []
         except Exception as e:
-            print(f"プロンプト取得エラー: {e}")
+            logger.error("プロンプト取得エラー: %s", e)
             return []
     
+    @io_method
     def get_prompt_by_id(self, prompt_id: int) -> Optional[Dict[str, Any]]:
         """IDでプロンプトを取得"""
         try:
             result = self.client.table('prompts').select('*').eq('id', prompt_id).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"プロンプト取得エラー: {e}")
+            logger.error("プロンプト取得エラー: %s", e)
             return None
     
+    @io_method
     def insert_prompt(self, data: Dict[str, Any]) -> Optional[int]:
         """プロンプトを挿入"""
         try:
@@ -259,9 +355,10 @@ class SupabaseClient:
                 return result.data[0]['id']
             return None
         except Exception as e:
-            print(f"プロンプト挿入エラー: {e}")
+            logger.error("プロンプト挿入エラー: %s", e)
             return None
     
+    @io_method
     def update_prompt(self, prompt_id: int, data: Dict[str, Any]) -> bool:
         """プロンプトを更新"""
         try:
@@ -269,9 +366,10 @@ class SupabaseClient:
             result = self.client.table('prompts').update(data).eq('id', prompt_id).execute()
             return bool(result.data)
         except Exception as e:
-            print(f"プロンプト更新エラー: {e}")
+            logger.error("プロンプト更新エラー: %s", e)
             return False
     
+    @io_method
     def link_cocktail_prompt(self, cocktail_uuid: str, prompt_id: int, prompt_type: str) -> bool:
         """カクテルとプロンプトを関連付け（UUID使用）"""
         try:
@@ -286,9 +384,55 @@ class SupabaseClient:
             result = self.client.table('cocktail_prompts').insert(data).execute()
             return bool(result.data)
         except Exception as e:
-            print(f"カクテル-プロンプト関連付けエラー: {e}")
+            logger.error("カクテル-プロンプト関連付けエラー: %s", e)
             return False
     
+    @io_method
+    def get_prompt_usage_counts(self, since: Optional[str] = None) -> Optional[Dict[int, Dict[str, Any]]]:
+        """プロンプトごとの使用回数と最終使用日時（集計RPC → 関連行の集計の順で試行）
+
+        集計が途中で失敗した場合は一部の件数を返さずNone（不完全な値がキャッシュされないようにする）
+        """
+        try:
+            result = self.client.rpc('get_prompt_usage_counts', {'p_since': since}).execute()
+            return {
+                int(row['prompt_id']): {
+                    'prompt_type': row.get('prompt_type'),
+                    'usage_count': row.get('usage_count', 0),
+                    'last_used_at': row.get('last_used_at')
+                }
+                for row in result.data or []
+            }
+        except Exception as e:
+            logger.warning("プロンプト使用回数集計RPCエラー（関連行の集計にフォールバック）: %s", e)
+        
+        counts: Dict[int, Dict[str, Any]] = {}
+        page_size = 1000
+        offset = 0
+        try:
+            while True:
+                query = self.client.table('cocktail_prompts').select('prompt_id, prompt_type, created_at')
+                if since:
+                    query = query.gte('created_at', since)
+                rows = query.order('id').range(offset, offset + page_size - 1).execute().data or []
+                for row in rows:
+                    entry = counts.setdefault(int(row['prompt_id']), {
+                        'prompt_type': row.get('prompt_type'),
+                        'usage_count': 0,
+                        'last_used_at': None
+                    })
+                    entry['usage_count'] += 1
+                    if row.get('created_at') and (entry['last_used_at'] or '') < row['created_at']:
+                        entry['last_used_at'] = row['created_at']
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+        except Exception as e:
+            logger.error("プロンプト使用回数集計エラー: %s", e)
+            return None
+        return counts
+    
+    @io_method
     def get_cocktail_prompts(self, cocktail_uuid: str) -> List[Dict[str, Any]]:
         """カクテルに関連付けられたプロンプトを取得（UUID使用）"""
         try:
@@ -297,9 +441,10 @@ class SupabaseClient:
             ).eq('cocktail_id', cocktail_uuid).execute()
             return result.data or []
         except Exception as e:
-            print(f"カクテル-プロンプト取得エラー: {e}")
+            logger.error("カクテル-プロンプト取得エラー: %s", e)
             return []
     
+    @io_method
     def get_cocktail_prompt_by_type(self, cocktail_uuid: str, prompt_type: str) -> Optional[Dict[str, Any]]:
         """カクテルの特定タイプのプロンプトを取得（UUID使用）"""
         try:
@@ -308,16 +453,17 @@ class SupabaseClient:
             ).eq('cocktail_id', cocktail_uuid).eq('prompt_type', prompt_type).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"カクテル-プロンプト取得エラー: {e}")
+            logger.error("カクテル-プロンプト取得エラー: %s", e)
             return None
     
+    @io_method
     def initialize_default_prompts(self):
         """デフォルトプロンプトの初期化"""
         try:
             # 既存のプロンプトが存在するかチェック
             existing = self.get_prompts()
             if existing:
-                print("プロンプトが既に存在します")
+                logger.debug("プロンプトが既に存在します")
                 return
             
             # デフォルトプロンプトを挿入
@@ -341,12 +487,13 @@ class SupabaseClient:
             for prompt_data in default_prompts:
                 self.insert_prompt(prompt_data)
             
-            print("デフォルトプロンプトを初期化しました")
+            logger.debug("デフォルトプロンプトを初期化しました")
             
         except Exception as e:
-            print(f"デフォルトプロンプト初期化エラー: {e}")
+            logger.error("デフォルトプロンプト初期化エラー: %s", e)
     
     # イベント関連のメソッド
+    @io_method
     def get_events(self, is_active: bool = None) -> List[Dict[str, Any]]:
         """イベント一覧を取得"""
         try:
@@ -356,54 +503,54 @@ class SupabaseClient:
             result = query.order('created_at', desc=True).execute()
             return result.data or []
         except Exception as e:
-            print(f"イベント取得エラー: {e}")
+            logger.error("イベント取得エラー: %s", e)
             return []
     
+    @io_method
     def get_event_by_id(self, event_id: Union[str, uuid.UUID]) -> Optional[Dict[str, Any]]:
         """IDでイベントを取得"""
         try:
             # UUIDの場合は文字列に変換
             event_id_str = str(event_id) if isinstance(event_id, uuid.UUID) else event_id
-            print(f"[SUPABASE] イベント取得クエリ実行: event_id='{event_id_str}'")
-            print(f"[SUPABASE] 元のevent_id: '{event_id}', 型: {type(event_id)}")
+            logger.debug("[SUPABASE] イベント取得クエリ実行: event_id='%s'", event_id_str)
+            logger.debug("[SUPABASE] 元のevent_id: '%s', 型: %s", event_id, type(event_id))
             
             result = self.client.table('events').select('*').eq('id', event_id_str).execute()
             
-            print(f"[SUPABASE] クエリ結果: データ数={len(result.data) if result.data else 0}")
+            logger.debug("[SUPABASE] クエリ結果: データ数=%s", len(result.data) if result.data else 0)
             if result.data:
-                print(f"[SUPABASE] 取得したイベント: {result.data[0]}")
+                logger.debug("[SUPABASE] 取得したイベント: %s", result.data[0])
                 return result.data[0]
             else:
-                print(f"[SUPABASE] イベントが見つかりません: '{event_id_str}'")
+                logger.debug("[SUPABASE] イベントが見つかりません: '%s'", event_id_str)
                 
                 # デバッグのために少数のイベントIDを確認
                 try:
                     sample_result = self.client.table('events').select('id, name').limit(5).execute()
                     if sample_result.data:
-                        print(f"[SUPABASE] サンプルイベント: {sample_result.data}")
+                        logger.debug("[SUPABASE] サンプルイベント: %s", sample_result.data)
                     else:
-                        print(f"[SUPABASE] eventsテーブルにデータがありません")
+                        logger.debug("[SUPABASE] eventsテーブルにデータがありません")
                 except Exception as debug_e:
-                    print(f"[SUPABASE] サンプル取得エラー: {debug_e}")
+                    logger.error("[SUPABASE] サンプル取得エラー: %s", debug_e)
                 
                 return None
                 
         except Exception as e:
-            print(f"[SUPABASE] イベント取得エラー: {e}")
-            print(f"[SUPABASE] エラー詳細: {type(e).__name__}: {str(e)}")
-            import traceback
-            print(f"[SUPABASE] スタックトレース: {traceback.format_exc()}")
+            logger.exception("[SUPABASE] イベント取得エラー: %s", e)
             return None
     
+    @io_method
     def get_event_by_name(self, event_name: str) -> Optional[Dict[str, Any]]:
         """名前でイベントを取得"""
         try:
             result = self.client.table('events').select('*').eq('name', event_name).execute()
             return result.data[0] if result.data else None
         except Exception as e:
-            print(f"イベント取得エラー: {e}")
+            logger.error("イベント取得エラー: %s", e)
             return None
     
+    @io_method
     def insert_event(self, data: Dict[str, Any]) -> Optional[str]:
         """イベントを挿入"""
         try:
@@ -412,9 +559,10 @@ class SupabaseClient:
                 return str(result.data[0]['id'])
             return None
         except Exception as e:
-            print(f"イベント挿入エラー: {e}")
+            logger.error("イベント挿入エラー: %s", e)
             return None
     
+    @io_method
     def update_event(self, event_id: Union[str, uuid.UUID], data: Dict[str, Any]) -> bool:
         """イベントを更新"""
         try:
@@ -424,10 +572,52 @@ class SupabaseClient:
             result = self.client.table('events').update(data).eq('id', event_id_str).execute()
             return bool(result.data)
         except Exception as e:
-            print(f"イベント更新エラー: {e}")
+            logger.error("イベント更新エラー: %s", e)
             return False
     
+    @io_method
+    def get_event_statistics(self, event_id: Union[str, uuid.UUID]) -> Optional[Dict[str, int]]:
+        """イベントの件数集計を取得（RPCで1回、使えない場合は件数クエリ。どちらも失敗した場合はNone）"""
+        event_id_str = str(event_id)
+        try:
+            result = self.client.rpc('get_event_statistics', {'p_event_id': event_id_str}).execute()
+            data = result.data or {}
+            return {
+                'cocktails_count': data.get('cocktails_count', 0),
+                'hidden_cocktails_count': data.get('hidden_cocktails_count', 0),
+                'surveys_count': data.get('surveys_count', 0),
+                'responses_count': data.get('responses_count', 0)
+            }
+        except Exception as e:
+            logger.warning("イベント統計RPCエラー（件数クエリにフォールバック）: %s", e)
+        
+        stats = {
+            'cocktails_count': 0,
+            'hidden_cocktails_count': 0,
+            'surveys_count': 0,
+            'responses_count': 0
+        }
+        try:
+            cocktails_result = self.client.table('cocktails').select('id', count='exact').eq('event_id', event_id_str).limit(1).execute()
+            stats['cocktails_count'] = cocktails_result.count or 0
+            
+            hidden_result = self.client.table('cocktails').select('id', count='exact').eq('event_id', event_id_str).eq('is_visible', False).limit(1).execute()
+            stats['hidden_cocktails_count'] = hidden_result.count or 0
+            
+            surveys_result = self.client.table('surveys').select('id').eq('event_id', event_id_str).execute()
+            survey_ids = [survey['id'] for survey in (surveys_result.data or [])]
+            stats['surveys_count'] = len(survey_ids)
+            
+            if survey_ids:
+                responses_result = self.client.table('survey_responses').select('id', count='exact').in_('survey_id', survey_ids).limit(1).execute()
+                stats['responses_count'] = responses_result.count or 0
+        except Exception as e:
+            logger.error("イベント統計取得エラー: %s", e)
+            return None
+        return stats
+    
     # アンケート関連メソッド
+    @io_method
     def create_survey(self, data: Dict[str, Any]) -> Optional[str]:
         """アンケートを作成"""
         try:
@@ -436,54 +626,116 @@ class SupabaseClient:
                 return str(result.data[0]['id'])
             return None
         except Exception as e:
-            print(f"アンケート作成エラー: {e}")
+            logger.error("アンケート作成エラー: %s", e)
             return None
     
+    @io_method
     def create_survey_with_questions(self, survey_data: Dict[str, Any], questions: List[Dict[str, Any]]) -> Optional[str]:
         """アンケートを質問と選択肢とともに一括作成"""
+        survey = self.create_survey_definition(survey_data, questions)
+        return str(survey['id']) if survey else None
+    
+    @staticmethod
+    def _option_value(option: Any, name: str, default: Any = None) -> Any:
+        """選択肢の属性を取得（Pydanticモデル・辞書の両方に対応）"""
+        if isinstance(option, dict):
+            return option.get(name, default)
+        return getattr(option, name, default)
+    
+    def build_survey_definition(self, survey_data: Dict[str, Any], questions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """アンケート・質問・選択肢にUUIDを採番した一括作成用のデータを組み立てる"""
+        survey_id = str(survey_data.get('id') or uuid.uuid4())
+        survey = {
+            'id': survey_id,
+            'event_id': str(survey_data['event_id']) if survey_data.get('event_id') else None,
+            'title': survey_data['title'],
+            'description': survey_data.get('description'),
+            'is_active': survey_data.get('is_active', True)
+        }
+        
+        return {'survey': survey, 'questions': self.build_survey_question_rows(survey_id, questions)}
+    
+    def build_survey_question_rows(self, survey_id: str, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """質問・選択肢にUUIDを採番した挿入用のデータ（選択肢は質問の'options'に入れる）を組み立てる"""
+        question_rows = []
+        for question_index, question_data in enumerate(questions):
+            question_id = str(question_data.get('id') or uuid.uuid4())
+            options = []
+            # 選択肢は選択式の質問のみ
+            if question_data['question_type'] in ['single_choice', 'multiple_choice']:
+                for option_index, option in enumerate(question_data.get('options') or []):
+                    options.append({
+                        'id': str(self._option_value(option, 'id') or uuid.uuid4()),
+                        'question_id': question_id,
+                        'option_text': self._option_value(option, 'option_text', ''),
+                        'display_order': self._option_value(option, 'display_order', option_index + 1)
+                    })
+            question_rows.append({
+                'id': question_id,
+                'survey_id': survey_id,
+                'question_type': question_data['question_type'],
+                'question_text': question_data['question_text'],
+                'is_required': question_data.get('is_required', False),
+                'display_order': question_data.get('display_order', question_index + 1),
+                'options': options
+            })
+        return question_rows
+    
+    @io_method
+    def _insert_survey_question_rows(self, question_rows: List[Dict[str, Any]]) -> None:
+        """組み立て済みの質問・選択肢をテーブルごとに一括挿入"""
+        questions = [
+            {key: value for key, value in question.items() if key != 'options'}
+            for question in question_rows
+        ]
+        options = [option for question in question_rows for option in question['options']]
+        if questions:
+            self.client.table('survey_questions').insert(questions).execute()
+        if options:
+            self.client.table('survey_question_options').insert(options).execute()
+    
+    @io_method
+    def create_survey_definition(self, survey_data: Dict[str, Any], questions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """アンケート・質問・選択肢を1回のRPC（1トランザクション）で作成し、質問・選択肢込みのアンケートを返す"""
+        definition = self.build_survey_definition(survey_data, questions)
+        try:
+            result = self.client.rpc('create_survey_definition', {'p_definition': definition}).execute()
+            if result.data:
+                return result.data
+        except Exception as e:
+            logger.warning("アンケート一括作成RPCエラー（テーブル単位の一括挿入にフォールバック）: %s", e)
+        
+        return self._create_survey_definition_by_tables(definition)
+    
+    @io_method
+    def _create_survey_definition_by_tables(self, definition: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """アンケート・質問・選択肢をテーブルごとに一括挿入（途中で失敗した場合はアンケートを削除）"""
+        survey_id = definition['survey']['id']
+        
         try:
-            # アンケート作成
-            survey_result = self.client.table('surveys').insert(survey_data).execute()
+            survey_result = self.client.table('surveys').insert(definition['survey']).execute()
             if not survey_result.data:
                 return None
-            
-            survey_id = str(survey_result.data[0]['id'])
-            
-            # 質問と選択肢を作成
-            for question_data in questions:
-                question_insert_data = {
-                    'survey_id': survey_id,
-                    'question_type': question_data['question_type'],
-                    'question_text': question_data['question_text'],
-                    'is_required': question_data.get('is_required', False),
-                    'display_order': question_data['display_order']
-                }
-                
-                question_result = self.client.table('survey_questions').insert(question_insert_data).execute()
-                if not question_result.data:
-                    continue
-                
-                question_id = str(question_result.data[0]['id'])
-                
-                # 選択肢がある場合は作成
-                if question_data.get('options'):
-                    options_data = []
-                    for i, option in enumerate(question_data['options']):
-                        options_data.append({
-                            'question_id': question_id,
-                            'option_text': option['option_text'],
-                            'display_order': option.get('display_order', i + 1)
-                        })
-                    
-                    if options_data:
-                        self.client.table('survey_question_options').insert(options_data).execute()
-            
-            return survey_id
-            
         except Exception as e:
-            print(f"アンケート一括作成エラー: {e}")
+            logger.error("アンケート一括作成エラー: %s", e)
+            return None
+        
+        try:
+            self._insert_survey_question_rows(definition['questions'])
+        except Exception as e:
+            logger.error("アンケート一括作成エラー（作成途中のアンケートを削除）: %s", e)
+            try:
+                # 質問・選択肢は ON DELETE CASCADE で削除される
+                self.client.table('surveys').delete().eq('id', survey_id).execute()
+            except Exception as cleanup_error:
+                logger.error("作成途中のアンケート削除エラー: %s", cleanup_error)
             return None
+        
+        survey = dict(survey_result.data[0])
+        survey['questions'] = definition['questions']
+        return survey
     
+    @io_method
     def get_surveys_by_event(self, event_id: str, is_active: bool = None) -> List[Dict[str, Any]]:
         """イベントのアンケート一覧を取得"""
         try:
@@ -493,35 +745,35 @@ class SupabaseClient:
             result = query.order('created_at', desc=True).execute()
             return result.data or []
         except Exception as e:
-            print(f"アンケート一覧取得エラー: {e}")
+            logger.error("アンケート一覧取得エラー: %s", e)
             return []
     
+    @io_method
     def get_survey_with_questions(self, survey_id: str) -> Optional[Dict[str, Any]]:
-        """アンケート詳細を質問と選択肢とともに取得"""
+        """アンケート詳細を質問と選択肢とともに取得（埋め込みselectで1回のリクエスト）"""
         try:
-            # アンケート基本情報取得
-            survey_result = self.client.table('surveys').select('*').eq('id', survey_id).execute()
-            if not survey_result.data:
+            result = self.client.table('surveys').select(
+                '*, survey_questions(*, survey_question_options(*))'
+            ).eq('id', survey_id).execute()
+            if not result.data:
                 return None
             
-            survey = survey_result.data[0]
-            
-            # 質問一覧取得
-            questions_result = self.client.table('survey_questions').select('*').eq('survey_id', survey_id).order('display_order').execute()
-            questions = questions_result.data or []
-            
-            # 各質問の選択肢を取得
+            survey = result.data[0]
+            questions = survey.pop('survey_questions', None) or []
+            questions.sort(key=lambda q: q.get('display_order') or 0)
             for question in questions:
-                options_result = self.client.table('survey_question_options').select('*').eq('question_id', question['id']).order('display_order').execute()
-                question['options'] = options_result.data or []
+                options = question.pop('survey_question_options', None) or []
+                options.sort(key=lambda o: o.get('display_order') or 0)
+                question['options'] = options
             
             survey['questions'] = questions
             return survey
             
         except Exception as e:
-            print(f"アンケート詳細取得エラー: {e}")
+            logger.error("アンケート詳細取得エラー: %s", e)
             return None
     
+    @io_method
     def update_survey(self, survey_id: str, data: Dict[str, Any]) -> bool:
         """アンケートを更新"""
         try:
@@ -529,39 +781,67 @@ class SupabaseClient:
             result = self.client.table('surveys').update(data).eq('id', survey_id).execute()
             return bool(result.data)
         except Exception as e:
-            print(f"アンケート更新エラー: {e}")
+            logger.error("アンケート更新エラー: %s", e)
             return False
     
+    @io_method
     def delete_survey(self, survey_id: str) -> bool:
         """アンケートを削除"""
         try:
             result = self.client.table('surveys').delete().eq('id', survey_id).execute()
             return bool(result.data)
         except Exception as e:
-            print(f"アンケート削除エラー: {e}")
+            logger.error("アンケート削除エラー: %s", e)
             return False
     
+    @io_method
     def delete_survey_questions(self, survey_id: str) -> bool:
-        """アンケートの質問項目をすべて削除"""
+        """アンケートの質問項目をすべて削除（選択肢・回答は ON DELETE CASCADE で削除される）"""
         try:
-            # まず既存の質問項目を取得
-            questions_result = self.client.table('survey_questions').select('id').eq('survey_id', survey_id).execute()
-            
-            for question in questions_result.data:
-                # 各質問の選択肢を削除
-                self.client.table('survey_question_options').delete().eq('question_id', question['id']).execute()
-                # 各質問の回答を削除
-                self.client.table('survey_answers').delete().eq('question_id', question['id']).execute()
-            
-            # 質問項目を削除
             self.client.table('survey_questions').delete().eq('survey_id', survey_id).execute()
-            
-            print(f"アンケート{survey_id}の質問項目削除完了")
+            logger.debug("アンケート%sの質問項目削除完了", survey_id)
+            return True
+        except Exception as e:
+            logger.error("質問項目削除エラー: %s", e)
+            return False
+    
+    @io_method
+    def delete_survey_questions_by_ids(self, survey_id: str, question_ids: List[str]) -> bool:
+        """指定した質問項目を1回で削除（選択肢・回答は ON DELETE CASCADE で削除される）"""
+        if not question_ids:
+            return True
+        try:
+            self.client.table('survey_questions').delete().eq('survey_id', survey_id).in_('id', question_ids).execute()
+            return True
+        except Exception as e:
+            logger.error("質問項目削除エラー: %s", e)
+            return False
+    
+    @io_method
+    def update_survey_question(self, question_id: str, data: Dict[str, Any]) -> bool:
+        """質問項目の文言・必須・表示順を更新"""
+        try:
+            result = self.client.table('survey_questions').update(data).eq('id', question_id).execute()
+            return bool(result.data)
+        except Exception as e:
+            logger.error("質問項目更新エラー: %s", e)
+            return False
+    
+    @io_method
+    def create_survey_questions(self, survey_id: str, questions: List[Dict[str, Any]]) -> bool:
+        """質問項目と選択肢をテーブルごとに一括作成"""
+        if not questions:
+            return True
+        question_rows = self.build_survey_question_rows(survey_id, questions)
+        try:
+            self._insert_survey_question_rows(question_rows)
             return True
         except Exception as e:
-            print(f"質問項目削除エラー: {e}")
+            logger.error("質問項目一括作成エラー（作成途中の質問項目を削除）: %s", e)
+            self.delete_survey_questions_by_ids(survey_id, [question['id'] for question in question_rows])
             return False
     
+    @io_method
     def create_survey_question(self, question_data: dict) -> Optional[str]:
         """アンケート質問項目を作成"""
         try:
@@ -584,17 +864,17 @@ class SupabaseClient:
                 return None
             
             question_id = question_result.data[0]['id']
-            print(f"質問項目作成成功: {question_id}")
+            logger.debug("質問項目作成成功: %s", question_id)
             
             # 選択肢がある場合は追加
             options = question_data.get('options', [])
-            print(f"デバッグ: 選択肢データ = {options}")
-            print(f"デバッグ: 選択肢の型 = {type(options)}")
+            logger.debug("選択肢データ = %s", options)
+            logger.debug("選択肢の型 = %s", type(options))
             
             if options and question_data['question_type'] in ['single_choice', 'multiple_choice']:
-                print(f"デバッグ: 選択肢作成開始 - {len(options)}個の選択肢")
+                logger.debug("選択肢作成開始 - %s個の選択肢", len(options))
                 for i, option in enumerate(options):
-                    print(f"デバッグ: 選択肢{i+1} = {option}, 型 = {type(option)}")
+                    logger.debug("選択肢%s = %s, 型 = %s", i+1, option, type(option))
                     
                     # オプション属性の安全な取得
                     if hasattr(option, 'option_text'):
@@ -618,31 +898,28 @@ class SupabaseClient:
                         'display_order': display_order
                     }
                     
-                    print(f"デバッグ: 挿入する選択肢データ = {option_data}")
+                    logger.debug("挿入する選択肢データ = %s", option_data)
                     
                     try:
                         option_result = self.client.table('survey_question_options').insert(option_data).execute()
-                        print(f"デバッグ: 選択肢挿入結果 = {option_result}")
+                        logger.debug("選択肢挿入結果 = %s", option_result)
                         
                         if option_result.data:
-                            print(f"選択肢作成成功: {option_data['option_text']}")
+                            logger.debug("選択肢作成成功: %s", option_data['option_text'])
                         else:
-                            print(f"選択肢作成失敗: {option_data['option_text']}")
+                            logger.error("選択肢作成失敗: %s", option_data['option_text'])
                     except Exception as option_error:
-                        print(f"選択肢作成エラー: {option_error}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception("選択肢作成エラー: %s", option_error)
             else:
-                print(f"デバッグ: 選択肢作成をスキップ - options={bool(options)}, type={question_data['question_type']}")
+                logger.debug("選択肢作成をスキップ - options=%s, type=%s", bool(options), question_data['question_type'])
             
             return question_id
             
         except Exception as e:
-            print(f"質問項目作成エラー: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("質問項目作成エラー: %s", e)
             return None
     
+    @io_method
     def submit_survey_response(self, survey_id: str, cocktail_uuid: Optional[str], answers: List[Dict[str, Any]]) -> Optional[str]:
         """アンケート回答を送信（UUID使用）"""
         try:
@@ -674,14 +951,16 @@ class SupabaseClient:
             return response_id
             
         except Exception as e:
-            print(f"アンケート回答送信エラー: {e}")
+            logger.error("アンケート回答送信エラー: %s", e)
             return None
     
+    @io_method
     def get_survey_responses(self, survey_id: str, limit: int = None, offset: int = 0) -> Dict[str, Any]:
         """アンケート回答一覧を取得"""
         try:
+            # survey_answersから選択肢へは外部キーがない（selected_option_idsは配列）ため埋め込まない
             query = self.client.table('survey_responses').select(
-                '*, survey_answers(*, survey_questions(question_text, question_type), survey_question_options(option_text))'
+                '*, survey_answers(*, survey_questions(question_text, question_type))'
             ).eq('survey_id', survey_id).order('submitted_at', desc=True)
             
             if limit:
@@ -703,7 +982,7 @@ class SupabaseClient:
             }
             
         except Exception as e:
-            print(f"アンケート回答一覧取得エラー: {e}")
+            logger.error("アンケート回答一覧取得エラー: %s", e)
             return {
                 'data': [],
                 'total_count': 0,
@@ -711,8 +990,141 @@ class SupabaseClient:
                 'offset': offset
             }
     
-    def get_survey_statistics(self, survey_id: str) -> Dict[str, Any]:
-        """アンケート集計結果を取得"""
+    @io_method
+    def iter_survey_responses(self, survey_id: str, page_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """アンケート回答をページ単位で順に取得（(submitted_at, id) のキーセットページネーション）"""
+        last_row = None
+        while True:
+            query = self.client.table('survey_responses').select(
+                'id, survey_id, cocktail_id, submitted_at, '
+                'survey_answers(question_id, answer_text, selected_option_ids)'
+            ).eq('survey_id', survey_id)
+            
+            if last_row:
+                # 前ページ最後の行より後ろの行（タイムスタンプは + や : を含むため引用符で囲む）
+                submitted_at = last_row['submitted_at']
+                query = query.or_(
+                    f'submitted_at.gt."{submitted_at}",'
+                    f'and(submitted_at.eq."{submitted_at}",id.gt.{last_row["id"]})'
+                )
+            
+            try:
+                result = query.order('submitted_at').order('id').limit(page_size).execute()
+            except Exception as e:
+                # 呼び出し側（エクスポート）で出力を打ち切れるよう、記録したうえで送出する
+                logger.error("アンケート回答ページ取得エラー（%s, 前ページ最終ID: %s）: %s", survey_id, last_row['id'] if last_row else None, e)
+                raise
+            rows = result.data or []
+            if not rows:
+                return
+            
+            yield rows
+            
+            if len(rows) < page_size:
+                return
+            last_row = rows[-1]
+    
+    @io_method
+    def get_survey_statistics(self, survey_id: str, text_sample_limit: int = 100) -> Dict[str, Any]:
+        """アンケート集計結果を取得（サマリーテーブル → 集計RPC → 従来の集計の順で試行）"""
+        # サマリーの保持件数を超えるサンプルを求められた場合は、件数が欠けないよう集計RPCを使う
+        if text_sample_limit <= SURVEY_SUMMARY_TEXT_SAMPLE_CAP:
+            summary = self._get_survey_statistics_from_summary(survey_id, text_sample_limit)
+            if summary is not None:
+                return summary
+        
+        try:
+            result = self.client.rpc('get_survey_statistics', {
+                'p_survey_id': survey_id,
+                'p_text_sample_limit': text_sample_limit
+            }).execute()
+            aggregated = result.data or {}
+            
+            statistics = {
+                'survey_id': survey_id,
+                'total_responses': aggregated.get('total_responses', 0),
+                'questions': []
+            }
+            for question in aggregated.get('questions') or []:
+                question_stat = {
+                    'question_id': question['question_id'],
+                    'question_text': question['question_text'],
+                    'question_type': question['question_type'],
+                    'responses_count': question.get('responses_count', 0),
+                    'responses': []
+                }
+                if question['question_type'] == 'text':
+                    question_stat['responses'] = question.get('text_answers') or []
+                else:
+                    question_stat['option_statistics'] = {
+                        option['option_id']: {
+                            'option_text': option['option_text'],
+                            'count': option['count']
+                        }
+                        for option in question.get('options') or []
+                    }
+                statistics['questions'].append(question_stat)
+            
+            return statistics
+            
+        except Exception as e:
+            logger.warning("アンケート集計RPCエラー（従来の集計にフォールバック）: %s", e)
+            return self._get_survey_statistics_by_queries(survey_id, text_sample_limit)
+    
+    @staticmethod
+    def _embedded_one(value: Any) -> Dict[str, Any]:
+        """1対1の埋め込みリソースを辞書で取得（PostgRESTのバージョンにより配列で返る場合がある）"""
+        if isinstance(value, list):
+            return value[0] if value else {}
+        return value or {}
+    
+    @io_method
+    def _get_survey_statistics_from_summary(self, survey_id: str, text_sample_limit: int = 100) -> Optional[Dict[str, Any]]:
+        """トリガーで更新されるサマリーテーブルから集計結果を取得（テーブルがない場合はNone）"""
+        try:
+            summary_result = self.client.table('survey_statistics_summary').select('total_responses').eq('survey_id', survey_id).execute()
+            questions_result = self.client.table('survey_questions').select(
+                'id, question_text, question_type, display_order, '
+                'survey_question_statistics(answered_count, text_samples), '
+                'survey_question_options(id, option_text, display_order, survey_option_statistics(selected_count))'
+            ).eq('survey_id', survey_id).order('display_order').execute()
+        except Exception as e:
+            logger.error("アンケート集計サマリー取得エラー: %s", e)
+            return None
+        
+        statistics = {
+            'survey_id': survey_id,
+            # サマリー行は最初の回答時に作成されるため、行がなければ回答0件
+            'total_responses': summary_result.data[0]['total_responses'] if summary_result.data else 0,
+            'questions': []
+        }
+        for question in questions_result.data or []:
+            question_summary = self._embedded_one(question.get('survey_question_statistics'))
+            question_stat = {
+                'question_id': question['id'],
+                'question_text': question['question_text'],
+                'question_type': question['question_type'],
+                'responses_count': question_summary.get('answered_count', 0),
+                'responses': []
+            }
+            if question['question_type'] == 'text':
+                question_stat['responses'] = (question_summary.get('text_samples') or [])[:text_sample_limit]
+            else:
+                options = sorted(question.get('survey_question_options') or [], key=lambda o: o.get('display_order') or 0)
+                question_stat['option_statistics'] = {
+                    option['id']: {
+                        'option_text': option['option_text'],
+                        'count': self._embedded_one(option.get('survey_option_statistics')).get('selected_count', 0)
+                    }
+                    for option in options
+                }
+            statistics['questions'].append(question_stat)
+        
+        return statistics
+    
+    @io_method
+    def _get_survey_statistics_by_queries(self, survey_id: str, text_sample_limit: int = 100) -> Dict[str, Any]:
+        """アンケート集計結果を取得（質問ごとに回答を取得してPythonで集計）"""
         try:
             # 回答総数
             total_responses_result = self.client.table('survey_responses').select('id', count='exact').eq('survey_id', survey_id).execute()
@@ -733,12 +1145,16 @@ class SupabaseClient:
                     'question_id': question['id'],
                     'question_text': question['question_text'],
                     'question_type': question['question_type'],
+                    'responses_count': 0,
                     'responses': []
                 }
                 
+                answers_count_result = self.client.table('survey_answers').select('id', count='exact').eq('question_id', question['id']).limit(1).execute()
+                question_stat['responses_count'] = answers_count_result.count or 0
+                
                 if question['question_type'] == 'text':
-                    # テキスト回答の取得
-                    text_answers_result = self.client.table('survey_answers').select('answer_text').eq('question_id', question['id']).execute()
+                    # テキスト回答の取得（新しい順にサンプル件数まで）
+                    text_answers_result = self.client.table('survey_answers').select('answer_text').eq('question_id', question['id']).neq('answer_text', '').order('created_at', desc=True).limit(text_sample_limit).execute()
                     question_stat['responses'] = [answer['answer_text'] for answer in (text_answers_result.data or []) if answer.get('answer_text')]
                     
                 else:
@@ -768,7 +1184,7 @@ class SupabaseClient:
             return statistics
             
         except Exception as e:
-            print(f"アンケート集計エラー: {e}")
+            logger.error("アンケート集計エラー: %s", e)
             return {
                 'survey_id': survey_id,
                 'total_responses': 0,
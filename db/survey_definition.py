@@ -0,0 +1,40 @@
+"""
+アンケート定義（質問・選択肢込み）の読み取り専用オブジェクト
+"""
+import copy
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class SurveyDefinition:
+    """get_survey_with_questions の結果を参照用に組み立てたもの（キャッシュして共有するため変更しない）"""
+
+    def __init__(self, survey: Dict[str, Any]):
+        self._survey = copy.deepcopy(survey)
+        self.survey_id = str(self._survey.get('id', ''))
+        self.event_id = self._survey.get('event_id')
+        self.title = self._survey.get('title', '')
+        self.description = self._survey.get('description')
+        self.is_active = bool(self._survey.get('is_active', False))
+        self.created_at = self._survey.get('created_at', '')
+        self.questions: List[Dict[str, Any]] = self._survey.get('questions', [])
+        self._questions_by_id = {question['id']: question for question in self.questions}
+
+    def question(self, question_id: str) -> Optional[Dict[str, Any]]:
+        """質問IDから質問を取得"""
+        return self._questions_by_id.get(question_id)
+
+    def selected_option_texts(self, question_id: str, option_ids: Iterable[str]) -> List[str]:
+        """選択された選択肢のテキストを表示順で取得"""
+        question = self.question(question_id)
+        if not question or not option_ids:
+            return []
+        selected = set(option_ids)
+        return [
+            option['option_text']
+            for option in question.get('options', [])
+            if option['id'] in selected
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """APIレスポンス用の辞書（呼び出し側で変更できるようコピーを返す）"""
+        return copy.deepcopy(self._survey)
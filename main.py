@@ -2,7 +2,13 @@
 リファクタリングされたFastAPIアプリケーション
 AI Bartender API v2.0 - モジュラー構成版
 """
-from fastapi import FastAPI, Request, HTTPException
+import os
+import re
+import hmac
+import uuid
+import logging
+from fastapi import FastAPI, Request, HTTPException, Response, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
@@ -10,44 +16,60 @@ from dotenv import load_dotenv
 # 環境変数を読み込み
 load_dotenv()
 
-# 設定とルーター
+# 設定とロギング（各モジュールのログ出力より先に設定する）
 from config.settings import settings
+from utils.logging_utils import setup_logging, set_request_id, reset_request_id
+from utils.metrics import render_latest, track_in_progress
+from utils.tracing import start_span
+from utils import profiler
+from utils.llm_providers import llm_chain
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+
+# ルーター
 from routers import cocktails, events, surveys, violations, prompts
 from services.prompt_service import PromptService
 
+logger = logging.getLogger(__name__)
+
+# 受け付けるX-Request-IDの形式（ログへの不正な文字列の混入を防ぐ）
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._\-]{1,64}$')
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """アプリケーション起動・終了時の処理"""
     # 起動時処理
-    print("🚀 AI Bartender API v2.0 起動中...")
+    logger.info("🚀 AI Bartender API v2.0 起動中...")
     
     # デフォルトプロンプトの初期化
     try:
         PromptService.initialize_default_prompts()
-        print("✅ デフォルトプロンプト初期化完了")
+        logger.info("✅ デフォルトプロンプト初期化完了")
     except Exception as e:
-        print(f"⚠️ デフォルトプロンプト初期化警告: {e}")
+        logger.warning("⚠️ デフォルトプロンプト初期化警告: %s", e)
     
     # API設定の検証
     api_validation = settings.validate_api_keys()
-    print(f"🔑 API設定状況: {api_validation}")
+    logger.info("🔑 API設定状況: %s", api_validation)
+    
+    # プロファイラのシグナルハンドラ（PROFILER_ENABLED時のみ）
+    profiler.install_signal_handler()
     
     # デバッグ: 環境変数の詳細確認
-    print("🔍 環境変数詳細:")
-    print(f"  - AZURE_OPENAI_API_KEY_LLM: {'設定済み' if settings.AZURE_OPENAI_API_KEY_LLM else '未設定'}")
-    print(f"  - AZURE_OPENAI_ENDPOINT_LLM: {'設定済み' if settings.AZURE_OPENAI_ENDPOINT_LLM else '未設定'}")
-    print(f"  - AZURE_OPENAI_ENDPOINT_LLM_MINI: {'設定済み' if settings.AZURE_OPENAI_ENDPOINT_LLM_MINI else '未設定'}")
-    print(f"  - GPT_API_KEY: {'設定済み' if settings.GPT_API_KEY else '未設定'}")
-    print(f"  - OPENAI_API_KEY: {'設定済み' if settings.OPENAI_API_KEY else '未設定'}")
+    logger.debug("🔍 環境変数詳細:")
+    logger.debug("  - AZURE_OPENAI_API_KEY_LLM: %s", '設定済み' if settings.AZURE_OPENAI_API_KEY_LLM else '未設定')
+    logger.debug("  - AZURE_OPENAI_ENDPOINT_LLM: %s", '設定済み' if settings.AZURE_OPENAI_ENDPOINT_LLM else '未設定')
+    logger.debug("  - AZURE_OPENAI_ENDPOINT_LLM_MINI: %s", '設定済み' if settings.AZURE_OPENAI_ENDPOINT_LLM_MINI else '未設定')
+    logger.debug("  - GPT_API_KEY: %s", '設定済み' if settings.GPT_API_KEY else '未設定')
+    logger.debug("  - OPENAI_API_KEY: %s", '設定済み' if settings.OPENAI_API_KEY else '未設定')
     
-    print("✅ AI Bartender API v2.0 起動完了")
+    logger.info("✅ AI Bartender API v2.0 起動完了")
     
     yield
     
     # 終了時処理
-    print("🛑 AI Bartender API v2.0 終了中...")
-    print("✅ AI Bartender API v2.0 終了完了")
+    logger.info("🛑 AI Bartender API v2.0 終了中...")
+    logger.info("✅ AI Bartender API v2.0 終了完了")
 
 
 # FastAPIアプリケーション初期化
@@ -69,6 +91,30 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """リクエストごとの相関IDをログに付与し、レスポンスヘッダーで返す（リクエスト全体をトレースのルートスパンにする）"""
+    request_id = request.headers.get("X-Request-ID", "")
+    if not _REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    token = set_request_id(request_id)
+    span_attributes = {"request_id": request_id, "http.method": request.method, "http.path": request.url.path}
+    try:
+        with start_span(
+            f"{request.method} {request.url.path}",
+            span_attributes,
+            kind="server",
+            traceparent=request.headers.get("traceparent"),
+        ) as span, track_in_progress():
+            response = await call_next(request)
+            span.set_http_status(response.status_code)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 # ルーター登録
 app.include_router(cocktails.router, tags=["Cocktails"])
 app.include_router(events.router, tags=["Events"])  
@@ -109,10 +155,10 @@ async def get_order_legacy(
             # 全件取得
             cocktail_data = CocktailService.get_all_cocktails(limit=limit, offset=offset, event_id=event_id)
             cocktails = cocktail_data.get('data', [])
-            print(f"[DEBUG] データ変換前のカクテル数: {len(cocktails)}")
+            logger.debug("データ変換前のカクテル数: %s", len(cocktails))
             result = []
             for i, c in enumerate(cocktails):
-                print(f"[DEBUG] カクテル{i+1} 変換前データ: order_id={c.get('order_id')}, name={c.get('name')}")
+                logger.debug("カクテル%s 変換前データ: order_id=%s, name=%s", i+1, c.get('order_id'), c.get('name'))
                 recipe = [
                     {"syrup": "ベリー", "ratio": c.get('flavor_ratio1', '')},
                     {"syrup": "青りんご", "ratio": c.get('flavor_ratio2', '')},
@@ -131,27 +177,27 @@ async def get_order_legacy(
                     base64_image = download_image_from_storage(filename)
                     if base64_image:
                         image_data = base64_image
-                        print(f"[DEBUG] UUID画像取得成功: {cocktail_uuid}")
+                        logger.debug("UUID画像取得成功: %s", cocktail_uuid)
                     else:
                         # UUID失敗時は古いorder_id形式でも試す（移行期間対応）
-                        print(f"[DEBUG] UUID画像取得失敗、order_idで試行: {order_id}")
+                        logger.debug("UUID画像取得失敗、order_idで試行: %s", order_id)
                         if order_id:
                             filename = f"cocktails/{order_id}.png"
                             base64_image = download_image_from_storage(filename)
                             if base64_image:
                                 image_data = base64_image
-                                print(f"[DEBUG] order_id画像取得成功: {order_id}")
+                                logger.debug("order_id画像取得成功: %s", order_id)
                             else:
-                                print(f"[WARNING] 画像ダウンロード失敗: uuid={cocktail_uuid}, order_id={order_id}")
+                                logger.warning("画像ダウンロード失敗: uuid=%s, order_id=%s", cocktail_uuid, order_id)
                 elif order_id:
                     # UUIDがない場合は古い形式で試す
                     filename = f"cocktails/{order_id}.png"
                     base64_image = download_image_from_storage(filename)
                     if base64_image:
                         image_data = base64_image
-                        print(f"[DEBUG] order_id画像取得成功（フォールバック）: {order_id}")
+                        logger.debug("order_id画像取得成功（フォールバック）: %s", order_id)
                     else:
-                        print(f"[WARNING] 画像ダウンロード失敗（フォールバック）: order_id={order_id}")
+                        logger.warning("画像ダウンロード失敗（フォールバック）: order_id=%s", order_id)
                 
                 cocktail_info = {
                     "order_id": c.get('order_id'),
@@ -163,11 +209,11 @@ async def get_order_legacy(
                     "event_id": c.get('event_id', ''),
                     "poured": c.get('poured', False),
                 }
-                print(f"[DEBUG] カクテル{i+1} 変換後データ: order_id={cocktail_info['order_id']}, name={cocktail_info['name']}, image_base64長さ={len(cocktail_info['image_base64']) if cocktail_info['image_base64'] else 0}")
+                logger.debug("カクテル%s 変換後データ: order_id=%s, name=%s, image_base64長さ=%s", i+1, cocktail_info['order_id'], cocktail_info['name'], len(cocktail_info['image_base64']) if cocktail_info['image_base64'] else 0)
                 result.append(cocktail_info)
             
-            print(f"[DEBUG] 最終レスポンス件数: {len(result)}")
-            print(f"[DEBUG] ページネーション情報: total_count={cocktail_data.get('total_count')}, has_next={cocktail_data.get('has_next')}, has_prev={cocktail_data.get('has_prev')}")
+            logger.debug("最終レスポンス件数: %s", len(result))
+            logger.debug("ページネーション情報: total_count=%s, has_next=%s, has_prev=%s", cocktail_data.get('total_count'), cocktail_data.get('has_next'), cocktail_data.get('has_prev'))
             
             return {
                 "data": result, 
@@ -360,6 +406,38 @@ def status_check():
     """ステータスチェック（レガシー互換）"""
     return "ready"
 
+# メトリクスエンドポイント（Prometheus）
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def metrics():
+    """処理段階ごとのレイテンシ等のメトリクス（gunicorn配下では全ワーカー分を集計）"""
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
+# プロファイルエンドポイント（PROFILER_ENABLED時のみ）
+@app.get("/debug/profile", tags=["System"], include_in_schema=False)
+async def debug_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000),
+    x_profiler_token: Optional[str] = Header(None),
+):
+    """リクエストを受けたワーカーのCPUプロファイルを採取し、collapsed stack 形式で返す"""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not settings.PROFILER_TOKEN or not x_profiler_token or not hmac.compare_digest(x_profiler_token, settings.PROFILER_TOKEN):
+        raise HTTPException(status_code=403, detail="プロファイラのトークンが正しくありません")
+    seconds = min(seconds, settings.PROFILER_MAX_SECONDS)
+    interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000
+    try:
+        # 計測中もイベントループを止めないようスレッドで待機する
+        collapsed = await run_in_threadpool(profiler.profile, seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(
+        content=collapsed,
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="profile-{os.getpid()}.collapsed"'},
+    )
+
 # システム情報エンドポイント
 @app.get("/system/info", tags=["System"])
 def get_system_info():
@@ -393,6 +471,7 @@ def debug_config():
         "api_keys_status": validation,
         "endpoints": {
             "llm_url": bool(settings.get_llm_url()),
+            "llm_providers": llm_chain.health(),
             "image_api": "OpenAI Images API"
         },
         "settings": {
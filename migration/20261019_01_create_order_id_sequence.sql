@@ -0,0 +1,28 @@
+-- 注文ID採番用シーケンス作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: 注文IDをDBシーケンスから採番するためのシーケンスとブロック予約関数を作成
+--       アプリ側は予約した番号をFeistel置換で6桁の注文IDに変換する
+
+-- 1. 採番用シーケンス
+CREATE SEQUENCE IF NOT EXISTS cocktail_order_seq
+    AS BIGINT
+    START WITH 1
+    INCREMENT BY 1
+    NO CYCLE;
+
+-- 2. 番号をまとめて予約する関数（ワーカー毎に1回の呼び出しで複数件を確保）
+CREATE OR REPLACE FUNCTION reserve_order_id_block(p_count INTEGER DEFAULT 20)
+RETURNS BIGINT[]
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT array_agg(nextval('cocktail_order_seq'))
+    FROM generate_series(1, GREATEST(p_count, 1));
+$$;
+
+GRANT USAGE ON SEQUENCE cocktail_order_seq TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION reserve_order_id_block(INTEGER) TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Order ID sequence created successfully' as status;
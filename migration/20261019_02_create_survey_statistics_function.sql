@@ -0,0 +1,81 @@
+-- アンケート集計関数作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: アンケートの回答数・選択肢別件数・テキスト回答サンプルをDB側で集計して
+--       1回のRPC呼び出しで返す関数を作成（回答行をアプリへ転送しない）
+
+-- テキスト回答サンプルを新しい順に取得するためのインデックス
+CREATE INDEX IF NOT EXISTS idx_survey_answers_question_created_at
+    ON survey_answers(question_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION get_survey_statistics(
+    p_survey_id UUID,
+    p_text_sample_limit INTEGER DEFAULT 100
+)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT jsonb_build_object(
+        'survey_id', p_survey_id,
+        'total_responses', (
+            SELECT COUNT(*) FROM survey_responses r WHERE r.survey_id = p_survey_id
+        ),
+        'questions', COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'question_id', q.id,
+                    'question_text', q.question_text,
+                    'question_type', q.question_type,
+                    'display_order', q.display_order,
+                    'responses_count', (
+                        SELECT COUNT(*) FROM survey_answers a WHERE a.question_id = q.id
+                    ),
+                    -- テキスト回答のサンプル（新しい順）
+                    'text_answers', CASE WHEN q.question_type = 'text' THEN COALESCE((
+                        SELECT jsonb_agg(t.answer_text ORDER BY t.created_at DESC)
+                        FROM (
+                            SELECT a.answer_text, a.created_at
+                            FROM survey_answers a
+                            WHERE a.question_id = q.id
+                              AND a.answer_text IS NOT NULL
+                              AND a.answer_text <> ''
+                            ORDER BY a.created_at DESC
+                            LIMIT GREATEST(p_text_sample_limit, 0)
+                        ) t
+                    ), '[]'::jsonb) ELSE '[]'::jsonb END,
+                    -- 選択肢別の件数（回答のない選択肢も0件で含める）
+                    'options', CASE WHEN q.question_type <> 'text' THEN COALESCE((
+                        SELECT jsonb_agg(
+                            jsonb_build_object(
+                                'option_id', o.id,
+                                'option_text', o.option_text,
+                                'display_order', o.display_order,
+                                'count', COALESCE(c.cnt, 0)
+                            )
+                            ORDER BY o.display_order
+                        )
+                        FROM survey_question_options o
+                        LEFT JOIN (
+                            SELECT selected.option_id, COUNT(*) AS cnt
+                            FROM survey_answers a
+                            CROSS JOIN LATERAL unnest(a.selected_option_ids) AS selected(option_id)
+                            WHERE a.question_id = q.id
+                            GROUP BY selected.option_id
+                        ) c ON c.option_id = o.id
+                        WHERE o.question_id = q.id
+                    ), '[]'::jsonb) ELSE '[]'::jsonb END
+                )
+                ORDER BY q.display_order
+            )
+            FROM survey_questions q
+            WHERE q.survey_id = p_survey_id
+        ), '[]'::jsonb)
+    );
+$$;
+
+GRANT EXECUTE ON FUNCTION get_survey_statistics(UUID, INTEGER) TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Survey statistics function created successfully' as status;
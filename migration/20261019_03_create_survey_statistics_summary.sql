@@ -0,0 +1,208 @@
+-- アンケート集計サマリーテーブル作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: 回答送信時にトリガーで集計値を逐次更新するサマリーテーブルを作成
+--       統計の取得は質問数に比例するサマリー行の読み取りのみになる
+-- 依存: 20250130_04_create_survey_tables.sql
+
+-- 1. アンケート単位の回答数
+CREATE TABLE IF NOT EXISTS survey_statistics_summary (
+    survey_id UUID PRIMARY KEY REFERENCES surveys(id) ON DELETE CASCADE,
+    total_responses BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 2. 質問単位の回答数とテキスト回答サンプル（新しい順、最大 survey_statistics_text_sample_cap() 件）
+CREATE TABLE IF NOT EXISTS survey_question_statistics (
+    question_id UUID PRIMARY KEY REFERENCES survey_questions(id) ON DELETE CASCADE,
+    survey_id UUID NOT NULL REFERENCES surveys(id) ON DELETE CASCADE,
+    answered_count BIGINT NOT NULL DEFAULT 0,
+    text_samples JSONB NOT NULL DEFAULT '[]'::jsonb,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 3. 選択肢単位の選択数
+CREATE TABLE IF NOT EXISTS survey_option_statistics (
+    option_id UUID PRIMARY KEY REFERENCES survey_question_options(id) ON DELETE CASCADE,
+    question_id UUID NOT NULL REFERENCES survey_questions(id) ON DELETE CASCADE,
+    selected_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_survey_question_statistics_survey_id ON survey_question_statistics(survey_id);
+CREATE INDEX IF NOT EXISTS idx_survey_option_statistics_question_id ON survey_option_statistics(question_id);
+
+-- テキスト回答サンプルの保持件数（トリガーと初期集計で共通）
+-- アプリ側の SURVEY_STATS_TEXT_SAMPLE_LIMIT がこの値を超える場合は、サマリーを使わず
+-- get_survey_statistics(p_text_sample_limit) で集計する（db/supabase_client.py の SURVEY_SUMMARY_TEXT_SAMPLE_CAP と合わせる）
+CREATE OR REPLACE FUNCTION survey_statistics_text_sample_cap()
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT 100;
+$$;
+
+-- 4. 回答（survey_responses）の追加・削除で回答数を更新
+CREATE OR REPLACE FUNCTION survey_statistics_on_response_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO survey_statistics_summary (survey_id, total_responses, updated_at)
+        VALUES (NEW.survey_id, 1, NOW())
+        ON CONFLICT (survey_id) DO UPDATE
+            SET total_responses = survey_statistics_summary.total_responses + 1,
+                updated_at = NOW();
+        RETURN NEW;
+    END IF;
+
+    UPDATE survey_statistics_summary
+    SET total_responses = GREATEST(total_responses - 1, 0),
+        updated_at = NOW()
+    WHERE survey_id = OLD.survey_id;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS survey_responses_statistics ON survey_responses;
+CREATE TRIGGER survey_responses_statistics
+    AFTER INSERT OR DELETE ON survey_responses
+    FOR EACH ROW
+    EXECUTE FUNCTION survey_statistics_on_response_change();
+
+-- 5. 個別回答（survey_answers）の追加・削除で質問・選択肢の集計を更新
+CREATE OR REPLACE FUNCTION survey_statistics_on_answer_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_survey_id UUID;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT survey_id INTO v_survey_id FROM survey_questions WHERE id = NEW.question_id;
+        IF v_survey_id IS NULL THEN
+            RETURN NEW;
+        END IF;
+
+        INSERT INTO survey_question_statistics (question_id, survey_id, answered_count, text_samples, updated_at)
+        VALUES (
+            NEW.question_id,
+            v_survey_id,
+            1,
+            CASE WHEN COALESCE(NEW.answer_text, '') <> '' THEN jsonb_build_array(NEW.answer_text) ELSE '[]'::jsonb END,
+            NOW()
+        )
+        ON CONFLICT (question_id) DO UPDATE
+            SET answered_count = survey_question_statistics.answered_count + 1,
+                text_samples = CASE
+                    WHEN COALESCE(NEW.answer_text, '') = '' THEN survey_question_statistics.text_samples
+                    ELSE (
+                        SELECT COALESCE(jsonb_agg(sample.value ORDER BY sample.position), '[]'::jsonb)
+                        FROM jsonb_array_elements(
+                            jsonb_build_array(NEW.answer_text) || survey_question_statistics.text_samples
+                        ) WITH ORDINALITY AS sample(value, position)
+                        WHERE sample.position <= survey_statistics_text_sample_cap()
+                    )
+                END,
+                updated_at = NOW();
+
+        IF NEW.selected_option_ids IS NOT NULL THEN
+            INSERT INTO survey_option_statistics (option_id, question_id, selected_count, updated_at)
+            SELECT o.id, o.question_id, COUNT(*), NOW()
+            FROM unnest(NEW.selected_option_ids) AS selected(option_id)
+            JOIN survey_question_options o ON o.id = selected.option_id
+            GROUP BY o.id, o.question_id
+            ON CONFLICT (option_id) DO UPDATE
+                SET selected_count = survey_option_statistics.selected_count + EXCLUDED.selected_count,
+                    updated_at = NOW();
+        END IF;
+        RETURN NEW;
+    END IF;
+
+    -- 削除時は件数のみ戻す（テキストサンプルは新しい回答で置き換わる）
+    UPDATE survey_question_statistics
+    SET answered_count = GREATEST(answered_count - 1, 0),
+        updated_at = NOW()
+    WHERE question_id = OLD.question_id;
+
+    IF OLD.selected_option_ids IS NOT NULL THEN
+        UPDATE survey_option_statistics s
+        SET selected_count = GREATEST(s.selected_count - selected.cnt, 0),
+            updated_at = NOW()
+        FROM (
+            SELECT option_id, COUNT(*) AS cnt
+            FROM unnest(OLD.selected_option_ids) AS option_id
+            GROUP BY option_id
+        ) selected
+        WHERE s.option_id = selected.option_id;
+    END IF;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS survey_answers_statistics ON survey_answers;
+CREATE TRIGGER survey_answers_statistics
+    AFTER INSERT OR DELETE ON survey_answers
+    FOR EACH ROW
+    EXECUTE FUNCTION survey_statistics_on_answer_change();
+
+-- 6. 既存データからの初期集計（再実行しても同じ結果になる）
+INSERT INTO survey_statistics_summary (survey_id, total_responses, updated_at)
+SELECT s.id, COUNT(r.id), NOW()
+FROM surveys s
+LEFT JOIN survey_responses r ON r.survey_id = s.id
+GROUP BY s.id
+ON CONFLICT (survey_id) DO UPDATE
+    SET total_responses = EXCLUDED.total_responses,
+        updated_at = NOW();
+
+INSERT INTO survey_question_statistics (question_id, survey_id, answered_count, text_samples, updated_at)
+SELECT
+    q.id,
+    q.survey_id,
+    (SELECT COUNT(*) FROM survey_answers a WHERE a.question_id = q.id),
+    COALESCE((
+        SELECT jsonb_agg(t.answer_text ORDER BY t.created_at DESC)
+        FROM (
+            SELECT a.answer_text, a.created_at
+            FROM survey_answers a
+            WHERE a.question_id = q.id
+              AND COALESCE(a.answer_text, '') <> ''
+            ORDER BY a.created_at DESC
+            LIMIT survey_statistics_text_sample_cap()
+        ) t
+    ), '[]'::jsonb),
+    NOW()
+FROM survey_questions q
+ON CONFLICT (question_id) DO UPDATE
+    SET answered_count = EXCLUDED.answered_count,
+        text_samples = EXCLUDED.text_samples,
+        updated_at = NOW();
+
+INSERT INTO survey_option_statistics (option_id, question_id, selected_count, updated_at)
+SELECT
+    o.id,
+    o.question_id,
+    (
+        SELECT COUNT(*)
+        FROM survey_answers a
+        CROSS JOIN LATERAL unnest(a.selected_option_ids) AS selected(option_id)
+        WHERE a.question_id = o.question_id
+          AND selected.option_id = o.id
+    ),
+    NOW()
+FROM survey_question_options o
+ON CONFLICT (option_id) DO UPDATE
+    SET selected_count = EXCLUDED.selected_count,
+        updated_at = NOW();
+
+GRANT SELECT ON survey_statistics_summary, survey_question_statistics, survey_option_statistics
+    TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Survey statistics summary tables created successfully' as status;
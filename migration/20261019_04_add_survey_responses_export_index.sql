@@ -0,0 +1,9 @@
+-- アンケート回答エクスポート用インデックス追加マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: 回答エクスポートのキーセットページネーション（survey_id, submitted_at, id 順）用の複合インデックスを作成
+
+CREATE INDEX IF NOT EXISTS idx_survey_responses_survey_submitted_id
+    ON survey_responses(survey_id, submitted_at, id);
+
+-- 実行完了ログ
+SELECT 'Survey responses export index created successfully' as status;
@@ -0,0 +1,36 @@
+-- イベント統計関数作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: イベントのカクテル数・非表示カクテル数・アンケート数・回答数を1回のRPC呼び出しで集計する関数を作成
+--       （poured_cocktailsはイベントと紐付く列を持たないため対象外）
+
+CREATE OR REPLACE FUNCTION get_event_statistics(p_event_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT jsonb_build_object(
+        'event_id', p_event_id,
+        'cocktails_count', (
+            SELECT COUNT(*) FROM cocktails c WHERE c.event_id = p_event_id
+        ),
+        'hidden_cocktails_count', (
+            SELECT COUNT(*) FROM cocktails c WHERE c.event_id = p_event_id AND c.is_visible = false
+        ),
+        'surveys_count', (
+            SELECT COUNT(*) FROM surveys s WHERE s.event_id = p_event_id
+        ),
+        'responses_count', (
+            SELECT COUNT(*)
+            FROM survey_responses r
+            JOIN surveys s ON s.id = r.survey_id
+            WHERE s.event_id = p_event_id
+        )
+    );
+$$;
+
+GRANT EXECUTE ON FUNCTION get_event_statistics(UUID) TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Event statistics function created successfully' as status;
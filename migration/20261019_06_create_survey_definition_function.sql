@@ -0,0 +1,81 @@
+-- アンケート一括作成関数作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: アンケート・質問・選択肢を1回のRPC呼び出し（1トランザクション）で作成する関数を作成
+--       IDはアプリ側で採番したUUIDを使用し、作成したアンケート定義（質問・選択肢込み）を返す
+--
+-- p_definition の形式:
+-- {
+--   "survey": {"id": "...", "event_id": "...", "title": "...", "description": "...", "is_active": true},
+--   "questions": [
+--     {"id": "...", "question_type": "single_choice", "question_text": "...", "is_required": true, "display_order": 1,
+--      "options": [{"id": "...", "option_text": "...", "display_order": 1}]}
+--   ]
+-- }
+
+CREATE OR REPLACE FUNCTION create_survey_definition(p_definition JSONB)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_survey JSONB := p_definition->'survey';
+    v_questions JSONB := COALESCE(p_definition->'questions', '[]'::jsonb);
+    v_survey_id UUID := COALESCE((v_survey->>'id')::uuid, gen_random_uuid());
+BEGIN
+    INSERT INTO surveys (id, event_id, title, description, is_active)
+    VALUES (
+        v_survey_id,
+        (v_survey->>'event_id')::uuid,
+        v_survey->>'title',
+        v_survey->>'description',
+        COALESCE((v_survey->>'is_active')::boolean, true)
+    );
+
+    INSERT INTO survey_questions (id, survey_id, question_type, question_text, is_required, display_order)
+    SELECT
+        (q.value->>'id')::uuid,
+        v_survey_id,
+        q.value->>'question_type',
+        q.value->>'question_text',
+        COALESCE((q.value->>'is_required')::boolean, false),
+        COALESCE((q.value->>'display_order')::integer, q.position::integer)
+    FROM jsonb_array_elements(v_questions) WITH ORDINALITY AS q(value, position);
+
+    INSERT INTO survey_question_options (id, question_id, option_text, display_order)
+    SELECT
+        (o.value->>'id')::uuid,
+        (q.value->>'id')::uuid,
+        o.value->>'option_text',
+        COALESCE((o.value->>'display_order')::integer, o.position::integer)
+    FROM jsonb_array_elements(v_questions) AS q(value)
+    CROSS JOIN LATERAL jsonb_array_elements(COALESCE(q.value->'options', '[]'::jsonb))
+        WITH ORDINALITY AS o(value, position);
+
+    RETURN (
+        SELECT to_jsonb(s) || jsonb_build_object(
+            'questions', COALESCE((
+                SELECT jsonb_agg(
+                    to_jsonb(sq) || jsonb_build_object(
+                        'options', COALESCE((
+                            SELECT jsonb_agg(to_jsonb(so) ORDER BY so.display_order)
+                            FROM survey_question_options so
+                            WHERE so.question_id = sq.id
+                        ), '[]'::jsonb)
+                    )
+                    ORDER BY sq.display_order
+                )
+                FROM survey_questions sq
+                WHERE sq.survey_id = s.id
+            ), '[]'::jsonb)
+        )
+        FROM surveys s
+        WHERE s.id = v_survey_id
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION create_survey_definition(JSONB) TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Survey definition function created successfully' as status;
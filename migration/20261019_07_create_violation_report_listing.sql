@@ -0,0 +1,26 @@
+-- 違反報告一覧用インデックス・集計ビュー作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: 違反報告の管理画面一覧を (created_at, id) のキーセットページネーションで取得するためのインデックスと、
+--       ステータス別件数を1回の集計で返すビューを作成
+-- 依存: 20250131_fix_violation_reports_schema.sql
+
+-- 1. ステータス絞り込み + 新しい順の一覧取得用
+CREATE INDEX IF NOT EXISTS idx_violation_reports_status_created_at_id
+    ON violation_reports(status, created_at DESC, id DESC);
+
+-- 2. カクテル単位・全ステータスの一覧取得用
+CREATE INDEX IF NOT EXISTS idx_violation_reports_created_at_id
+    ON violation_reports(created_at DESC, id DESC);
+
+-- 3. ステータス別件数
+CREATE OR REPLACE VIEW violation_report_status_counts AS
+SELECT
+    COALESCE(status, 'pending') AS status,
+    COUNT(*) AS report_count
+FROM violation_reports
+GROUP BY COALESCE(status, 'pending');
+
+GRANT SELECT ON violation_report_status_counts TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Violation report listing index and view created successfully' as status;
@@ -0,0 +1,96 @@
+-- 違反報告登録関数作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: 違反報告の登録・カクテルの違反報告数の加算・自動非表示を1回のRPC呼び出し（1トランザクション）で行う関数を作成
+--       重複報告は (cocktail_id, reporter_id) の一意制約で判定し、報告数の加算はカクテル行のロック下で行う
+-- 依存: 20250131_fix_violation_reports_schema.sql
+
+-- 1. 重複報告判定用の一意制約（存在しない場合のみ）
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.table_constraints
+        WHERE constraint_name = 'violation_reports_cocktail_id_reporter_id_key'
+        AND table_name = 'violation_reports'
+    ) THEN
+        ALTER TABLE violation_reports
+        ADD CONSTRAINT violation_reports_cocktail_id_reporter_id_key
+        UNIQUE(cocktail_id, reporter_id);
+        RAISE NOTICE 'Added unique constraint for cocktail_id and reporter_id';
+    END IF;
+END $$;
+
+-- 2. 違反報告数を実際の報告件数に合わせる（以降は関数内で加算）
+UPDATE cocktails c
+SET violation_reports_count = counts.report_count
+FROM (
+    SELECT cocktail_id, COUNT(*) AS report_count
+    FROM violation_reports
+    GROUP BY cocktail_id
+) counts
+WHERE c.id = counts.cocktail_id
+  AND c.violation_reports_count IS DISTINCT FROM counts.report_count;
+
+-- 3. 違反報告登録関数
+-- 戻り値: {"status": "reported" | "duplicate" | "not_found", "cocktail_id", "order_id", "violation_reports_count", "hidden"}
+CREATE OR REPLACE FUNCTION report_violation_by_order_id(
+    p_order_id TEXT,
+    p_reporter_id TEXT,
+    p_report_reason TEXT,
+    p_report_category TEXT DEFAULT 'inappropriate',
+    p_auto_hide_threshold INTEGER DEFAULT 1
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_cocktail_id UUID;
+    v_report_id INTEGER;
+    v_count INTEGER;
+    v_hidden BOOLEAN;
+BEGIN
+    SELECT id INTO v_cocktail_id FROM cocktails WHERE order_id = p_order_id;
+    IF v_cocktail_id IS NULL THEN
+        RETURN jsonb_build_object('status', 'not_found', 'order_id', p_order_id);
+    END IF;
+
+    INSERT INTO violation_reports (cocktail_id, reporter_id, report_reason, report_category)
+    VALUES (v_cocktail_id, p_reporter_id, p_report_reason, COALESCE(p_report_category, 'inappropriate'))
+    ON CONFLICT (cocktail_id, reporter_id) DO NOTHING
+    RETURNING id INTO v_report_id;
+
+    IF v_report_id IS NULL THEN
+        RETURN jsonb_build_object('status', 'duplicate', 'cocktail_id', v_cocktail_id, 'order_id', p_order_id);
+    END IF;
+
+    -- 報告数を加算し、閾値以上になったら非表示にする（既に非表示の場合は非表示日時・理由を変えない）
+    UPDATE cocktails
+    SET violation_reports_count = COALESCE(violation_reports_count, 0) + 1,
+        hidden_at = CASE
+            WHEN is_visible IS NOT FALSE AND COALESCE(violation_reports_count, 0) + 1 >= p_auto_hide_threshold
+            THEN NOW() ELSE hidden_at END,
+        hidden_reason = CASE
+            WHEN is_visible IS NOT FALSE AND COALESCE(violation_reports_count, 0) + 1 >= p_auto_hide_threshold
+            THEN '違反報告により自動非表示（報告数: ' || (COALESCE(violation_reports_count, 0) + 1) || '）'
+            ELSE hidden_reason END,
+        is_visible = CASE
+            WHEN COALESCE(violation_reports_count, 0) + 1 >= p_auto_hide_threshold
+            THEN FALSE ELSE is_visible END
+    WHERE id = v_cocktail_id
+    RETURNING violation_reports_count, NOT COALESCE(is_visible, TRUE) INTO v_count, v_hidden;
+
+    RETURN jsonb_build_object(
+        'status', 'reported',
+        'cocktail_id', v_cocktail_id,
+        'order_id', p_order_id,
+        'violation_reports_count', v_count,
+        'hidden', v_hidden
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION report_violation_by_order_id(TEXT, TEXT, TEXT, TEXT, INTEGER) TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Report violation function created successfully' as status;
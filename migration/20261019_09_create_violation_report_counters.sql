@@ -0,0 +1,80 @@
+-- 違反報告集計カウンター作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: 違反報告のステータス別・カテゴリ別件数をトリガーで逐次更新するカウンターテーブルを作成
+--       統計の取得は報告件数に関係なく数行の読み取りになる
+--       （カクテル別の報告数は cocktails.violation_reports_count を使用）
+-- 依存: 20261019_07_create_violation_report_listing.sql
+
+-- 1. カウンターテーブル（dimension: 'status' または 'category'）
+CREATE TABLE IF NOT EXISTS violation_report_counters (
+    dimension VARCHAR(20) NOT NULL,
+    key VARCHAR(50) NOT NULL,
+    report_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (dimension, key)
+);
+
+-- 2. カウンターの加減算
+CREATE OR REPLACE FUNCTION violation_report_counters_add(p_dimension TEXT, p_key TEXT, p_delta INTEGER)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    INSERT INTO violation_report_counters (dimension, key, report_count, updated_at)
+    VALUES (p_dimension, p_key, GREATEST(p_delta, 0), NOW())
+    ON CONFLICT (dimension, key) DO UPDATE
+        SET report_count = GREATEST(violation_report_counters.report_count + p_delta, 0),
+            updated_at = NOW();
+$$;
+
+-- 3. 違反報告の追加・削除・ステータス/カテゴリ変更でカウンターを更新
+CREATE OR REPLACE FUNCTION violation_report_counters_on_change()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM violation_report_counters_add('status', COALESCE(OLD.status, 'pending'), -1);
+        PERFORM violation_report_counters_add('category', COALESCE(OLD.report_category, 'other'), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM violation_report_counters_add('status', COALESCE(NEW.status, 'pending'), 1);
+        PERFORM violation_report_counters_add('category', COALESCE(NEW.report_category, 'other'), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS violation_reports_counters ON violation_reports;
+CREATE TRIGGER violation_reports_counters
+    AFTER INSERT OR DELETE OR UPDATE OF status, report_category ON violation_reports
+    FOR EACH ROW
+    EXECUTE FUNCTION violation_report_counters_on_change();
+
+-- 4. 既存データからの初期集計（再実行しても同じ結果になる）
+DELETE FROM violation_report_counters;
+
+INSERT INTO violation_report_counters (dimension, key, report_count, updated_at)
+SELECT 'status', COALESCE(status, 'pending'), COUNT(*), NOW()
+FROM violation_reports
+GROUP BY COALESCE(status, 'pending');
+
+INSERT INTO violation_report_counters (dimension, key, report_count, updated_at)
+SELECT 'category', COALESCE(report_category, 'other'), COUNT(*), NOW()
+FROM violation_reports
+GROUP BY COALESCE(report_category, 'other');
+
+-- 5. ステータス別件数ビューをカウンター参照に置き換え
+DROP VIEW IF EXISTS violation_report_status_counts;
+CREATE VIEW violation_report_status_counts AS
+SELECT key AS status, report_count
+FROM violation_report_counters
+WHERE dimension = 'status';
+
+GRANT SELECT ON violation_report_counters, violation_report_status_counts TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Violation report counters created successfully' as status;
@@ -0,0 +1,36 @@
+-- プロンプト使用回数集計関数作成マイグレーション
+-- 実行日: 2026-10-19
+-- 説明: cocktail_prompts をプロンプト単位で集計し、使用回数と最終使用日時を1回のRPC呼び出しで返す関数を作成
+--       p_since を指定した場合はその日時以降の使用のみ集計
+-- 依存: 20250130_02_create_prompt_tables.sql
+
+-- 期間指定の集計用インデックス
+CREATE INDEX IF NOT EXISTS idx_cocktail_prompts_created_at_prompt_id
+    ON cocktail_prompts(created_at, prompt_id);
+
+CREATE OR REPLACE FUNCTION get_prompt_usage_counts(p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL)
+RETURNS TABLE (
+    prompt_id INTEGER,
+    prompt_type VARCHAR(50),
+    usage_count BIGINT,
+    last_used_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT
+        cp.prompt_id,
+        MAX(cp.prompt_type)::VARCHAR(50) AS prompt_type,
+        COUNT(*) AS usage_count,
+        MAX(cp.created_at) AS last_used_at
+    FROM cocktail_prompts cp
+    WHERE p_since IS NULL OR cp.created_at >= p_since
+    GROUP BY cp.prompt_id;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_prompt_usage_counts(TIMESTAMP WITH TIME ZONE) TO anon, authenticated, service_role;
+
+-- 実行完了ログ
+SELECT 'Prompt usage function created successfully' as status;
@@ -104,6 +104,8 @@ class QuestionOption(BaseModel):
 
 
 class SurveyQuestion(BaseModel):
+    # 更新時に既存の質問を指定する場合のID（指定すると文言を変えても回答を引き継ぐ）
+    id: Optional[str] = None
     question_text: str
     question_type: Literal["text", "multiple_choice", "single_choice"]
     is_required: bool = True
@@ -81,7 +81,7 @@ def check_usernames():
         
         while True:
             print(f"  取得中: offset={offset}, limit={limit}")
-            result = get_all_cocktails(limit=limit, offset=offset)
+            result = get_all_cocktails(limit=limit, offset=offset, columns='id, order_id, user_name')
             batch_cocktails = result['data']
             
             if not batch_cocktails:
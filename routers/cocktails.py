@@ -1,6 +1,7 @@
 """
 カクテル関連APIルーター
 """
+import logging
 from fastapi import APIRouter, HTTPException, Request
 from pathlib import Path
 import base64
@@ -23,6 +24,8 @@ from utils.validation import get_client_ip
 from config.settings import settings
 from db import database as dbmodule
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/cocktail", tags=["cocktails"])
 
 # 注文番号に対応するレシピ情報（順不同）
@@ -60,26 +63,26 @@ def generate_response(order_id_str: str) -> dict:
         base64_image = download_image_from_storage(filename)
         if base64_image:
             image_data = base64_image
-            print(f"[DEBUG] UUID画像取得成功: {cocktail_uuid}")
+            logger.debug("UUID画像取得成功: %s", cocktail_uuid)
         else:
             # UUID失敗時は古いorder_id形式でも試す（移行期間対応）
-            print(f"[DEBUG] UUID画像取得失敗、order_idで試行: {order_id_str}")
+            logger.debug("UUID画像取得失敗、order_idで試行: %s", order_id_str)
             filename = f"cocktails/{order_id_str}.png"
             base64_image = download_image_from_storage(filename)
             if base64_image:
                 image_data = base64_image
-                print(f"[DEBUG] order_id画像取得成功: {order_id_str}")
+                logger.debug("order_id画像取得成功: %s", order_id_str)
             else:
-                print(f"[WARNING] 画像ダウンロード失敗: uuid={cocktail_uuid}, order_id={order_id_str}")
+                logger.warning("画像ダウンロード失敗: uuid=%s, order_id=%s", cocktail_uuid, order_id_str)
     elif order_id_str:
         # UUIDがない場合は古い形式で試す（フォールバック）
         filename = f"cocktails/{order_id_str}.png"
         base64_image = download_image_from_storage(filename)
         if base64_image:
             image_data = base64_image
-            print(f"[DEBUG] order_id画像取得成功（フォールバック）: {order_id_str}")
+            logger.debug("order_id画像取得成功（フォールバック）: %s", order_id_str)
         else:
-            print(f"[WARNING] 画像ダウンロード失敗（フォールバック）: order_id={order_id_str}")
+            logger.warning("画像ダウンロード失敗（フォールバック）: order_id=%s", order_id_str)
     
     # データベースから取得した情報でレスポンスを構築
     return {
@@ -224,14 +227,14 @@ def debug_cocktails_count():
 @router.post("/", response_model=CreateCocktailResponse)
 async def create_cocktail(req: CreateCocktailRequest):
     """カクテル作成（ユーザー情報を保存、画像はSupabaseバケットに保存）"""
-    print("post request / test")
+    logger.debug("post request / test")
     return await CocktailService.create_cocktail(req, save_user_info=req.save_user_info, use_storage=True)
 
 
 @router.post("/anonymous", response_model=CreateCocktailResponse)
 async def create_cocktail_anonymous(req: CreateCocktailAnonymousRequest):
     """匿名カクテル作成（ユーザー情報は保存しない）"""
-    print("post request / anonymous")
+    logger.debug("post request / anonymous")
     # CreateCocktailRequestに変換（nameを空文字に）
     cocktail_req = CreateCocktailRequest(
         recent_event=req.recent_event,
@@ -260,7 +263,7 @@ def order_(order_id: str):
 async def confirm_copyright(cocktail_id: str, req: CopyrightConfirmationRequest):
     """著作権確認を行う"""
     try:
-        print(f"[DEBUG] 著作権確認API呼び出し - cocktail_id: {cocktail_id}")
+        logger.debug("著作権確認API呼び出し - cocktail_id: %s", cocktail_id)
         
         # リクエストのカクテルIDとパスパラメータの一致チェック
         if req.cocktail_id != cocktail_id:
@@ -288,7 +291,7 @@ async def confirm_copyright(cocktail_id: str, req: CopyrightConfirmationRequest)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] 著作権確認APIエラー: {e}")
+        logger.error("著作権確認APIエラー: %s", e)
         raise HTTPException(status_code=500, detail=f"内部サーバーエラー: {str(e)}")
 
 
@@ -296,7 +299,7 @@ async def confirm_copyright(cocktail_id: str, req: CopyrightConfirmationRequest)
 async def get_copyright_status(cocktail_id: str):
     """著作権確認ステータスを取得"""
     try:
-        print(f"[DEBUG] 著作権ステータス取得API呼び出し - cocktail_id: {cocktail_id}")
+        logger.debug("著作権ステータス取得API呼び出し - cocktail_id: %s", cocktail_id)
         
         # ステータスを取得
         result = CocktailService.get_copyright_status(cocktail_id)
@@ -316,5 +319,5 @@ async def get_copyright_status(cocktail_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] 著作権ステータス取得APIエラー: {e}")
+        logger.error("著作権ステータス取得APIエラー: %s", e)
         raise HTTPException(status_code=500, detail=f"内部サーバーエラー: {str(e)}")
\ No newline at end of file
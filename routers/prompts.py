@@ -143,10 +143,13 @@ def initialize_default_prompts():
 
 
 @router.get("/{prompt_id}/statistics", response_model=Dict[str, Any])
-def get_prompt_statistics(prompt_id: str):
+def get_prompt_statistics(
+    prompt_id: str,
+    days: Optional[int] = Query(None, ge=1, description="直近の集計日数（未指定時は全期間）")
+):
     """プロンプト使用統計取得"""
     try:
-        stats = PromptService.get_prompt_usage_statistics(prompt_id)
+        stats = PromptService.get_prompt_usage_statistics(prompt_id, days)
         if not stats:
             raise HTTPException(status_code=404, detail="プロンプトが見つかりません")
         
@@ -162,10 +165,12 @@ def get_prompt_statistics(prompt_id: str):
 
 
 @router.get("/statistics/overview", response_model=Dict[str, Any])
-def get_all_prompt_statistics():
+def get_all_prompt_statistics(
+    days: Optional[int] = Query(None, ge=1, description="直近の集計日数（未指定時は全期間）")
+):
     """全プロンプト統計情報取得"""
     try:
-        stats = PromptService.get_all_prompt_statistics()
+        stats = PromptService.get_all_prompt_statistics(days)
         return {
             "result": "success",
             "statistics": stats
@@ -2,7 +2,8 @@
 アンケート関連APIルーター
 """
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Dict, Any, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Literal
 
 from models.requests import SurveyRequest, SurveyUpdateRequest, SurveyResponseRequest
 from services.survey_service import SurveyService
@@ -126,15 +127,42 @@ def submit_survey_response(survey_id: str, response_data: SurveyResponseRequest)
 
 
 @router.get("/{survey_id}/responses", response_model=List[Dict[str, Any]])
-def get_survey_responses(survey_id: str):
-    """アンケート回答一覧取得"""
+def get_survey_responses(
+    survey_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="取得件数"),
+    offset: int = Query(0, ge=0, description="取得開始位置")
+):
+    """アンケート回答一覧取得（全件が必要な場合は /responses/export を使用）"""
     try:
-        responses = SurveyService.get_survey_responses(survey_id)
+        responses = SurveyService.get_survey_responses(survey_id, limit, offset)
         return responses
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"アンケート回答取得エラー: {str(e)}")
 
 
+@router.get("/{survey_id}/responses/export")
+def export_survey_responses(
+    survey_id: str,
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="出力形式（ndjson または csv）")
+):
+    """アンケート回答をストリーミングでエクスポート"""
+    try:
+        rows = SurveyService.export_survey_responses(survey_id, format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"アンケート回答エクスポートエラー: {str(e)}")
+    if rows is None:
+        raise HTTPException(status_code=404, detail="アンケートが見つかりません")
+    
+    if format == "csv":
+        media_type = "text/csv; charset=utf-8"
+    else:
+        media_type = "application/x-ndjson"
+    headers = {
+        "Content-Disposition": f'attachment; filename="survey_{survey_id}_responses.{format}"'
+    }
+    return StreamingResponse(rows, media_type=media_type, headers=headers)
+
+
 @router.get("/{survey_id}/statistics", response_model=Dict[str, Any])
 def get_survey_statistics(survey_id: str):
     """アンケート統計情報取得"""
@@ -1,6 +1,7 @@
 """
 違反報告関連APIルーター
 """
+import logging
 from fastapi import APIRouter, HTTPException, Request, Query
 from typing import List, Dict, Any, Optional
 
@@ -8,6 +9,8 @@ from models.requests import ViolationReportRequest, HideCocktailRequest
 from services.violation_service import ViolationService
 from utils.validation import get_client_ip
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/violations", tags=["violations"])
 
 
@@ -17,7 +20,7 @@ def report_violation(report_data: ViolationReportRequest, request: Request):
     try:
         # IPアドレス取得
         client_ip = get_client_ip(request)
-        print(f"[DEBUG] 違反報告リクエスト - order_id: {report_data.order_id}, client_ip: {client_ip}")
+        logger.debug("違反報告リクエスト - order_id: %s, client_ip: %s", report_data.order_id, client_ip)
         
         success = ViolationService.report_violation(report_data, client_ip)
         if not success:
@@ -93,15 +96,33 @@ def get_violation_reports(
 ):
     """違反報告一覧取得"""
     try:
-        print(f"[DEBUG] 違反報告API呼び出し - cocktail_id: {cocktail_id}, status: {status}, show_all: {show_all}")
+        logger.debug("違反報告API呼び出し - cocktail_id: %s, status: %s, show_all: %s", cocktail_id, status, show_all)
         
         reports = ViolationService.get_violation_reports(cocktail_id, status, show_all)
         
-        print(f"[DEBUG] API戻り値: {len(reports)}件の報告")
+        logger.debug("API戻り値: %s件の報告", len(reports))
         return reports
         
     except Exception as e:
-        print(f"[ERROR] 違反報告API取得エラー: {e}")
+        logger.error("違反報告API取得エラー: %s", e)
+        raise HTTPException(status_code=500, detail=f"違反報告取得エラー: {str(e)}")
+
+
+@router.get("/moderation/reports", response_model=Dict[str, Any])
+def list_violation_reports(
+    cocktail_id: Optional[str] = Query(None, description="特定カクテルの報告のみ取得"),
+    status: Optional[str] = Query(None, description="特定ステータスの報告のみ取得"),
+    show_all: bool = Query(False, description="全ステータスの報告を取得"),
+    limit: Optional[int] = Query(None, ge=1, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor")
+):
+    """違反報告一覧をページ単位で取得（管理者向け、ステータス別件数付き）"""
+    try:
+        return ViolationService.list_violation_reports(cocktail_id, status, show_all, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("違反報告一覧取得エラー: %s", e)
         raise HTTPException(status_code=500, detail=f"違反報告取得エラー: {str(e)}")
 
 
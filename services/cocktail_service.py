@@ -1,8 +1,11 @@
 """
 カクテル生成関連のビジネスロジック
 """
+import logging
+import time
 import uuid
 import requests
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
@@ -15,12 +18,21 @@ from utils.text_utils import (
 )
 from utils.image_utils import crop_and_resize_base64_image, upload_image_to_storage
 from db import database as dbmodule
+from services.prompt_analytics import PromptAnalytics
+from utils.metrics import observe_stage, stage_timer, record_payload, record_retry, record_failure
+from utils.tracing import http_client_span, set_attributes
+from utils.rate_limiter import RateLimitTimeout, image_generation_limiter, retry_after_seconds
+from utils.llm_providers import CircuitOpenError, llm_chain
+from utils.retry_policy import call_with_retry, image_retry_policy, llm_retry_policy
+
+logger = logging.getLogger(__name__)
 
 
 class CocktailService:
     """カクテル生成サービス"""
     
     @staticmethod
+    @observe_stage("cocktail.create")
     async def create_cocktail(
         req: CreateCocktailRequest, 
         save_user_info: bool = True, 
@@ -28,10 +40,12 @@ class CocktailService:
     ) -> CreateCocktailResponse:
         """カクテル作成メイン処理"""
         try:
-            print(f"[DEBUG] カクテル作成開始 - event_id: {req.event_id}")
+            logger.debug("カクテル作成開始 - event_id: %s", req.event_id)
+            set_attributes(recipe_prompt_id=req.recipe_prompt_id, image_prompt_id=req.image_prompt_id)
             
             # 1. イベント処理
             event_id = await CocktailService._handle_event(req)
+            set_attributes(event_id=event_id)
             
             # 2. レシピ生成
             recipe_data = await CocktailService._generate_recipe(req, event_id)
@@ -45,7 +59,7 @@ class CocktailService:
             
             # カクテル用のUUIDを生成
             cocktail_uuid = str(uuid.uuid4())
-            print(f"[DEBUG] 生成されたUUID: {cocktail_uuid}")
+            logger.debug("生成されたUUID: %s", cocktail_uuid)
             
             # 4. 画像生成（UUIDを使用）
             image_data = await CocktailService._generate_image(
@@ -62,6 +76,9 @@ class CocktailService:
             if db_result["result"] != "success":
                 return CreateCocktailResponse(result="error", detail=db_result["detail"])
             
+            # 挿入時に重複で再採番された場合は確定した注文番号を使う
+            order_id = db_result["order_id"]
+            
             # 6. レスポンス作成
             response = CreateCocktailResponse(
                 result="success",
@@ -87,13 +104,13 @@ class CocktailService:
             
         except Exception as e:
             error_msg = f"カクテル作成処理で予期しないエラー: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.exception("%s", error_msg)
             import traceback
             tb = traceback.format_exc()
-            print(f"[ERROR] Traceback: {tb}")
             return CreateCocktailResponse(result="error", detail=f"{error_msg}\\n{tb}")
     
     @staticmethod
+    @observe_stage("cocktail.handle_event")
     async def _handle_event(req: CreateCocktailRequest) -> Optional[str]:
         """イベント関連処理"""
         event_id = req.event_id
@@ -115,10 +132,11 @@ class CocktailService:
         return event_id
     
     @staticmethod
+    @observe_stage("cocktail.generate_recipe")
     async def _generate_recipe(req: CreateCocktailRequest, event_id: Optional[str]) -> Dict[str, Any]:
         """レシピ生成処理"""
         try:
-            print(f"[DEBUG] レシピ生成開始")
+            logger.debug("レシピ生成開始")
             
             # シロップ情報読み込み
             syrup_dict = load_syrup_info_txt()
@@ -150,108 +168,103 @@ class CocktailService:
             cocktail_name = recipe_data.get("cocktail_name", "")
             filter_words = load_fusion_filter_words()
             
-            print(f"[DEBUG] 初期カクテル名: '{cocktail_name}'")
-            print(f"[DEBUG] フィルター単語数: {len(filter_words)}個")
-            print(f"[DEBUG] 初期検証実行中...")
+            logger.debug("初期カクテル名: '%s'", cocktail_name)
+            logger.debug("フィルター単語数: %s個", len(filter_words))
+            logger.debug("初期検証実行中...")
             
             initial_validation = validate_cocktail_name(cocktail_name, filter_words)
-            print(f"[DEBUG] 初期検証結果: {initial_validation}")
+            logger.debug("初期検証結果: %s", initial_validation)
             
             if not initial_validation:
-                print(f"[WARNING] カクテル名「{cocktail_name}」がフィルタに引っかかりました")
+                logger.warning("カクテル名「%s」がフィルタに引っかかりました", cocktail_name)
                 
                 # まず既存の簡易的な再生成を試みる
                 retry_success = False
                 for retry in range(settings.MAX_NAME_RETRIES):
-                    print(f"[DEBUG] 簡易再生成試行 {retry + 1}/{settings.MAX_NAME_RETRIES}")
+                    logger.debug("簡易再生成試行 %s/%s", retry + 1, settings.MAX_NAME_RETRIES)
+                    record_retry("cocktail.name_regeneration")
                     new_name = regenerate_cocktail_name_with_mini_llm(recipe_data, filter_words)
-                    print(f"[DEBUG] 簡易再生成結果: {new_name}")
+                    logger.debug("簡易再生成結果: %s", new_name)
                     if new_name and validate_cocktail_name(new_name, filter_words):
-                        print(f"[DEBUG] 簡易再生成成功: {new_name}")
+                        logger.debug("簡易再生成成功: %s", new_name)
                         recipe_data["cocktail_name"] = new_name
                         retry_success = True
                         break
                     else:
-                        print(f"[DEBUG] 簡易再生成失敗: {new_name} (検証結果: {validate_cocktail_name(new_name, filter_words) if new_name else 'None'})")
+                        logger.debug("簡易再生成失敗: %s", new_name)
                 
                 if not retry_success:
                     # 簡易的な再生成に失敗した場合、別のプロンプト戦略で再生成
-                    print(f"[INFO] 別のプロンプト戦略でカクテル名再生成を試みます")
+                    logger.info("別のプロンプト戦略でカクテル名再生成を試みます")
                     new_name = regenerate_name_with_alternative_prompt(
                         recipe_data, filter_words, cocktail_name
                     )
                     if new_name:
-                        print(f"[DEBUG] 別プロンプトで新しいカクテル名生成成功: {new_name}")
+                        logger.debug("別プロンプトで新しいカクテル名生成成功: %s", new_name)
                         recipe_data["cocktail_name"] = new_name
                     else:
                         # それでも失敗した場合は、より創造的な汎用名を生成
-                        print(f"[WARNING] 別プロンプトでも失敗しました。最終手段として創造的汎用名を生成します。")
+                        logger.warning("別プロンプトでも失敗しました。最終手段として創造的汎用名を生成します。")
                         timestamp = datetime.now().strftime("%H%M%S")
                         # 汎用名パターンを回避するために、創造的な最終案を生成
                         creative_fallback = f"今宵のインスピレーション{timestamp[-2:]}"
                         recipe_data["cocktail_name"] = creative_fallback
-                        print(f"[WARNING] 全ての再生成失敗、創造的汎用名使用: {recipe_data['cocktail_name']}")
+                        logger.warning("全ての再生成失敗、創造的汎用名使用: %s", recipe_data['cocktail_name'])
                 else:
-                    print(f"[INFO] 簡易再生成でカクテル名決定完了")
+                    logger.info("簡易再生成でカクテル名決定完了")
             else:
-                print(f"[INFO] 初期カクテル名が検証を通過: {cocktail_name}")
+                logger.info("初期カクテル名が検証を通過: %s", cocktail_name)
             
             final_name = recipe_data.get('cocktail_name', 'Unknown')
-            print(f"[DEBUG] レシピ生成完了 - 最終カクテル名: '{final_name}'")
+            logger.debug("レシピ生成完了 - 最終カクテル名: '%s'", final_name)
             return {"result": "success", "data": recipe_data}
             
         except Exception as e:
             error_msg = f"レシピ生成エラー: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.error("%s", error_msg)
             return {"result": "error", "detail": error_msg}
     
     @staticmethod
     def _build_user_prompt(req: CreateCocktailRequest, event_id: Optional[str]) -> str:
         """ユーザープロンプトを構築"""
+        # イベント名・有効なアンケートはイベント単位でキャッシュされたものを使う
+        event_context = dbmodule.get_event_context(event_id) if event_id else None
+        
         # アンケート回答データを処理
         survey_info = ""
         if req.survey_responses and event_id:
             try:
-                print(f"[DEBUG] アンケート情報処理開始")
-                surveys = dbmodule.get_surveys_by_event(event_id, is_active=True)
-                if surveys:
-                    survey = dbmodule.get_survey_with_questions(surveys[0]['id'])
-                    if survey and survey.get('questions'):
-                        event_data = dbmodule.get_event_by_id(event_id)
-                        event_name = event_data.get('name', req.event_name) if event_data else req.event_name
+                logger.debug("アンケート情報処理開始")
+                if event_context and event_context.survey:
+                    survey = event_context.survey
+                    if survey.questions:
+                        event_name = event_context.event_name(req.event_name)
                         
                         survey_info = f"\\n【イベント: {event_name}】\\n"
-                        survey_info += f"アンケート: {survey.get('title', '')}\\n"
-                        if survey.get('description'):
-                            survey_info += f"{survey['description']}\\n"
+                        survey_info += f"アンケート: {survey.title}\\n"
+                        if survey.description:
+                            survey_info += f"{survey.description}\\n"
                         survey_info += "\\n【回答内容】\\n"
                         
-                        # 質問IDと質問情報のマッピング
-                        question_map = {q['id']: q for q in survey['questions']}
-                        
                         # 回答を整形
                         for response in req.survey_responses:
                             question_id = response.get('question_id', '')
                             answer_text = response.get('answer_text', '')
                             selected_option_ids = response.get('selected_option_ids', [])
                             
-                            if question_id in question_map:
-                                question = question_map[question_id]
+                            question = survey.question(question_id)
+                            if question:
                                 survey_info += f"\\n質問: {question['question_text']}\\n"
                                 
                                 if answer_text:
                                     survey_info += f"回答: {answer_text}\\n"
-                                elif selected_option_ids and question.get('options'):
-                                    selected_texts = [
-                                        option['option_text'] 
-                                        for option in question['options'] 
-                                        if option['id'] in selected_option_ids
-                                    ]
+                                elif selected_option_ids:
+                                    selected_texts = survey.selected_option_texts(question_id, selected_option_ids)
                                     if selected_texts:
                                         survey_info += f"回答: {', '.join(selected_texts)}\\n"
-                print(f"[DEBUG] アンケート情報処理完了")
+                logger.debug("アンケート情報処理完了")
             except Exception as e:
-                print(f"[ERROR] アンケート情報処理エラー: {e}")
+                logger.error("アンケート情報処理エラー: %s", e)
                 # エラー時は基本情報で続行
                 survey_info = "\\n【アンケート回答】\\n"
                 for i, response in enumerate(req.survey_responses, 1):
@@ -269,10 +282,8 @@ class CocktailService:
         else:
             # アンケートがない場合の従来のプロンプト
             event_name = req.event_name
-            if event_id:
-                event_data = dbmodule.get_event_by_id(event_id)
-                if event_data:
-                    event_name = event_data.get('name', req.event_name)
+            if event_context:
+                event_name = event_context.event_name(req.event_name)
             
             return (
                 f"イベント: {event_name}\\n"
@@ -283,30 +294,23 @@ class CocktailService:
             )
     
     @staticmethod
+    @observe_stage("llm.chat_completion")
     async def _call_openai_api(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
         """OpenAI API呼び出し"""
         try:
             # API設定チェック
-            api_key = settings.get_llm_api_key()
-            endpoint_url = settings.get_llm_url()
+            logger.debug("AZURE_OPENAI_API_KEY_LLM: %s", '設定済み' if settings.AZURE_OPENAI_API_KEY_LLM else '未設定')
+            logger.debug("OPENAI_API_KEY: %s", '設定済み' if settings.OPENAI_API_KEY else '未設定')
+            logger.debug("LLMプロバイダー: %s", [provider.name for provider in llm_chain.providers])
             
-            print(f"[DEBUG] OpenAI API設定確認 - api_key: {'設定済み' if api_key else '未設定'}")
-            print(f"[DEBUG] AZURE_OPENAI_API_KEY_LLM: {'設定済み' if settings.AZURE_OPENAI_API_KEY_LLM else '未設定'}")
-            print(f"[DEBUG] OPENAI_API_KEY: {'設定済み' if settings.OPENAI_API_KEY else '未設定'}")
-            print(f"[DEBUG] get_llm_api_key(): {settings.get_llm_api_key()[:10] if settings.get_llm_api_key() else 'None'}...")
-            print(f"[DEBUG] endpoint_url: {'設定済み' if endpoint_url else '未設定'}")
-            
-            if not api_key or not endpoint_url:
+            if not llm_chain.providers:
                 validation = settings.validate_api_keys()
                 error_msg = f"OpenAI API設定エラー - {validation}"
                 return {"result": "error", "detail": error_msg}
             
-            print(f"[DEBUG] OpenAI APIリクエスト開始")
+            logger.debug("OpenAI APIリクエスト開始")
+            record_payload("llm.chat_completion", "request", len(system_prompt.encode('utf-8')) + len(user_prompt.encode('utf-8')))
             
-            headers = {
-                "api-key": api_key,
-                "Content-Type": "application/json"
-            }
             body = {
                 "messages": [
                     {"role": "system", "content": system_prompt},
@@ -316,14 +320,15 @@ class CocktailService:
                 "temperature": 0.7
             }
             
-            response = requests.post(
-                endpoint_url, 
-                headers=headers, 
-                json=body, 
-                timeout=settings.LLM_TIMEOUT
-            )
+            async def send(timeout: float) -> requests.Response:
+                # 障害中・遮断中のプロバイダーは飛ばして次のプロバイダーへ切り替える
+                return await llm_chain.send(body, timeout)
+            
+            # タイムアウト・5xx・429 はバックオフして再試行（遅い場合はヘッジ）
+            response = await call_with_retry(llm_retry_policy, send)
             
-            print(f"[DEBUG] OpenAI APIレスポンス - status_code: {response.status_code}")
+            logger.debug("OpenAI APIレスポンス - status_code: %s", response.status_code)
+            record_payload("llm.chat_completion", "response", len(response.content))
             
             if not response.ok:
                 error_detail = f"OpenAI API通信エラー - Status: {response.status_code}, Response: {response.text[:500]}"
@@ -331,18 +336,23 @@ class CocktailService:
             
             result = response.json()
             content = result.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-            print(f"[DEBUG] OpenAI APIレスポンス内容: {content[:200]}...")
+            logger.debug("OpenAI APIレスポンス内容: %s...", content[:200])
             
             return {"result": "success", "content": content}
             
         except requests.exceptions.Timeout:
             error_msg = f"OpenAI API通信タイムアウト（{settings.LLM_TIMEOUT}秒）"
             return {"result": "error", "detail": error_msg}
+        except RateLimitTimeout as e:
+            return {"result": "error", "detail": f"OpenAI APIが混雑しています: {str(e)}"}
+        except CircuitOpenError as e:
+            return {"result": "error", "detail": f"OpenAI API利用不可: {str(e)}"}
         except Exception as e:
             error_msg = f"OpenAI API通信例外: {str(e)}"
             return {"result": "error", "detail": error_msg}
     
     @staticmethod
+    @observe_stage("cocktail.generate_image")
     async def _generate_image(
         recipe_data: Dict, 
         req: CreateCocktailRequest, 
@@ -351,7 +361,7 @@ class CocktailService:
     ) -> Dict[str, Any]:
         """画像生成処理"""
         try:
-            print(f"[DEBUG] 画像生成開始 - use_storage: {use_storage}")
+            logger.debug("画像生成開始 - use_storage: %s", use_storage)
             
             # プロンプト構築
             color = recipe_data.get("color", "")
@@ -381,7 +391,7 @@ class CocktailService:
                 return {"result": "error", "detail": "画像生成API キーが設定されていません"}
             
             # API呼び出し
-            client_url = "https://api.openai.com/v1/images/generations"
+            client_url = settings.IMAGE_API_URL
             headers = {
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json"
@@ -393,15 +403,28 @@ class CocktailService:
                 "quality": settings.IMAGE_QUALITY,
             }
             
-            print(f"[DEBUG] 画像生成APIリクエスト開始")
-            response = requests.post(
-                client_url, 
-                headers=headers, 
-                json=body, 
-                timeout=settings.IMAGE_TIMEOUT
-            )
+            logger.debug("画像生成APIリクエスト開始")
+            async def send(timeout: float) -> requests.Response:
+                # timeout は送信枠の待ち時間も含めた上限（リトライ全体の期限を超えないようにする）
+                deadline = time.monotonic() + timeout
+                async with image_generation_limiter.limit(timeout=min(image_generation_limiter.queue_timeout, timeout)):
+                    with stage_timer("image.generation"), http_client_span("image_api", "POST", client_url) as span:
+                        response = await run_in_threadpool(
+                            requests.post,
+                            client_url, 
+                            headers=headers, 
+                            json=body, 
+                            timeout=max(0.1, deadline - time.monotonic())
+                        )
+                        span.set_http_status(response.status_code)
+                if response.status_code == 429:
+                    await image_generation_limiter.penalize(retry_after_seconds(response.headers))
+                return response
             
-            print(f"[DEBUG] 画像生成APIレスポンス - status_code: {response.status_code}")
+            response = await call_with_retry(image_retry_policy, send)
+            
+            logger.debug("画像生成APIレスポンス - status_code: %s", response.status_code)
+            record_payload("image.generation", "response", len(response.content))
             
             if not response.ok:
                 error_detail = f"画像生成API通信エラー - Status: {response.status_code}, Response: {response.text[:500]}"
@@ -416,37 +439,40 @@ class CocktailService:
                     "detail": f"画像生成APIレスポンス異常: {str(result_img)[:200]}"
                 }
             
-            print(f"[DEBUG] 画像生成完了 - サイズ: {len(image_base64)} 文字")
+            logger.debug("画像生成完了 - サイズ: %s 文字", len(image_base64))
             
             # 画像加工
             full_image_base64 = f"data:image/png;base64,{image_base64}"
             processed_image = crop_and_resize_base64_image(full_image_base64)
             
             # 保存方法による分岐
-            print(f"[DEBUG] use_storage判定: {use_storage}")
+            logger.debug("use_storage判定: %s", use_storage)
             if use_storage:
-                print(f"[DEBUG] Supabaseストレージアップロード開始 - UUID: {cocktail_uuid}")
+                logger.debug("Supabaseストレージアップロード開始 - UUID: %s", cocktail_uuid)
                 try:
                     url = upload_image_to_storage(processed_image, cocktail_uuid)
-                    print(f"[DEBUG] Supabaseストレージアップロード完了 - URL: {url}")
+                    logger.debug("Supabaseストレージアップロード完了 - URL: %s", url)
                     return {"result": "success", "image": processed_image, "url": url}
                 except Exception as storage_error:
-                    print(f"[ERROR] Supabaseストレージアップロード失敗: {storage_error}")
+                    logger.error("Supabaseストレージアップロード失敗: %s", storage_error)
                     # ストレージアップロードに失敗した場合はbase64で返す
                     return {"result": "success", "image": processed_image}
             else:
-                print(f"[DEBUG] base64形式で返却")
+                logger.debug("base64形式で返却")
                 return {"result": "success", "image": processed_image}
             
         except requests.exceptions.Timeout:
             error_msg = f"画像生成API通信タイムアウト（{settings.IMAGE_TIMEOUT}秒）"
             return {"result": "error", "detail": error_msg}
+        except RateLimitTimeout as e:
+            return {"result": "error", "detail": f"画像生成APIが混雑しています: {str(e)}"}
         except Exception as e:
             error_msg = f"画像生成処理エラー: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.error("%s", error_msg)
             return {"result": "error", "detail": error_msg}
     
     @staticmethod
+    @observe_stage("cocktail.save_to_database")
     async def _save_to_database(
         recipe_data: Dict,
         image_data: Dict,
@@ -458,7 +484,7 @@ class CocktailService:
     ) -> Dict[str, Any]:
         """データベース保存処理"""
         try:
-            print(f"[DEBUG] DB保存開始")
+            logger.debug("DB保存開始")
             
             # ユーザー情報処理
             if not save_user_info:
@@ -508,23 +534,29 @@ class CocktailService:
                 "event_id": event_id,
             }
             
-            print(f"[DEBUG] DB挿入データ準備完了: order_id={order_id}, name={recipe_data.get('cocktail_name', '')}, uuid={cocktail_uuid}")
+            logger.debug("DB挿入データ準備完了: order_id=%s, name=%s, uuid=%s", order_id, recipe_data.get('cocktail_name', ''), cocktail_uuid)
             
-            # DB挿入
-            inserted_uuid = dbmodule.insert_cocktail(db_data)
+            # DB挿入（order_idが重複した場合は再採番して再試行）
+            inserted_row = dbmodule.insert_cocktail_with_order_id(
+                db_data, generate_order_id, settings.MAX_ORDER_ID_ATTEMPTS
+            )
+            inserted_uuid = inserted_row.get('id') if inserted_row else None
             if not inserted_uuid:
                 error_msg = f"DB挿入失敗 - inserted_uuid: {inserted_uuid}"
-                print(f"[ERROR] {error_msg}")
+                logger.error("%s", error_msg)
                 return {"result": "error", "detail": error_msg}
             
-            print(f"[DEBUG] DB保存完了 - inserted_uuid: {inserted_uuid}")
+            order_id = inserted_row.get('order_id', order_id)
+            # 注ぎ機からの問い合わせに備えてキャッシュへ登録
+            dbmodule.cache_cocktail(inserted_row)
+            logger.debug("DB保存完了 - inserted_uuid: %s, order_id: %s", inserted_uuid, order_id)
             
             # アンケート回答保存
             if req.survey_responses and event_id:
                 try:
-                    surveys = dbmodule.get_surveys_by_event(event_id, is_active=True)
-                    if surveys:
-                        survey_id = surveys[0]['id']
+                    event_context = dbmodule.get_event_context(event_id)
+                    if event_context and event_context.active_survey_id:
+                        survey_id = event_context.active_survey_id
                         answers_data = [
                             {
                                 'question_id': response.get('question_id', ''),
@@ -538,91 +570,92 @@ class CocktailService:
                             survey_id, inserted_uuid, answers_data  # UUIDを使用
                         )
                         if survey_response_id:
-                            print(f"[DEBUG] アンケート回答保存完了: {survey_response_id}")
+                            logger.debug("アンケート回答保存完了: %s", survey_response_id)
                 except Exception as survey_error:
-                    print(f"[WARNING] アンケート回答保存エラー（継続）: {survey_error}")
+                    logger.warning("アンケート回答保存エラー（継続）: %s", survey_error)
+                    record_failure("cocktail.save_survey_response", type(survey_error).__name__)
             
             # プロンプトリンク処理
             try:
                 CocktailService._link_prompts(inserted_uuid, req)  # UUIDを使用
             except Exception as prompt_error:
-                print(f"[WARNING] プロンプトリンクエラー（継続）: {prompt_error}")
+                logger.warning("プロンプトリンクエラー（継続）: %s", prompt_error)
+                record_failure("cocktail.link_prompts", type(prompt_error).__name__)
             
-            return {"result": "success", "inserted_uuid": inserted_uuid}
+            return {"result": "success", "inserted_uuid": inserted_uuid, "order_id": order_id}
             
         except Exception as e:
             error_msg = f"DB保存例外: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.exception("%s", error_msg)
             import traceback
             tb = traceback.format_exc()
-            print(f"[ERROR] Traceback: {tb}")
             return {"result": "error", "detail": f"{error_msg}\n{tb}"}
     
     @staticmethod
     def _link_prompts(inserted_uuid: str, req: CreateCocktailRequest):
         """プロンプトリンク処理（UUID対応）"""
         # レシピプロンプト
-        if req.recipe_prompt_id:
-            dbmodule.link_cocktail_prompt(inserted_uuid, req.recipe_prompt_id, 'recipe')
-        else:
+        recipe_prompt_id = req.recipe_prompt_id
+        if not recipe_prompt_id:
             default_recipe_prompts = dbmodule.get_prompts('recipe', True)
             if default_recipe_prompts:
-                default_prompt_id = default_recipe_prompts[0]['id']
-                dbmodule.link_cocktail_prompt(inserted_uuid, default_prompt_id, 'recipe')
+                recipe_prompt_id = default_recipe_prompts[0]['id']
+        if recipe_prompt_id and dbmodule.link_cocktail_prompt(inserted_uuid, recipe_prompt_id, 'recipe'):
+            PromptAnalytics.record_usage(recipe_prompt_id, 'recipe')
         
         # 画像プロンプト
-        if req.image_prompt_id:
-            dbmodule.link_cocktail_prompt(inserted_uuid, req.image_prompt_id, 'image')
-        else:
+        image_prompt_id = req.image_prompt_id
+        if not image_prompt_id:
             default_image_prompts = dbmodule.get_prompts('image', True)
             if default_image_prompts:
-                default_prompt_id = default_image_prompts[0]['id']
-                dbmodule.link_cocktail_prompt(inserted_uuid, default_prompt_id, 'image')
+                image_prompt_id = default_image_prompts[0]['id']
+        if image_prompt_id and dbmodule.link_cocktail_prompt(inserted_uuid, image_prompt_id, 'image'):
+            PromptAnalytics.record_usage(image_prompt_id, 'image')
 
     @staticmethod
     def get_all_cocktails(limit: Optional[int] = None, offset: int = 0, event_id: Optional[str] = None) -> Dict[str, Any]:
         """全カクテル取得（ページネーション対応）"""
         try:
-            print(f"[DEBUG] 全カクテル取得開始 - limit: {limit}, offset: {offset}, event_id: {event_id}")
+            logger.debug("全カクテル取得開始 - limit: %s, offset: %s, event_id: %s", limit, offset, event_id)
             result = dbmodule.get_all_cocktails(limit=limit, offset=offset, event_id=event_id)
-            print(f"[DEBUG] カクテル取得完了: {result.get('total', 0)}件")
+            logger.debug("カクテル取得完了: %s件", result.get('total', 0))
             return result
         except Exception as e:
-            print(f"[ERROR] カクテル取得エラー: {e}")
+            logger.error("カクテル取得エラー: %s", e)
             return {"data": [], "total": 0}
     
     @staticmethod
     def get_cocktail_by_order_id(order_id: str) -> Optional[Dict[str, Any]]:
         """注文IDによるカクテル取得"""
         try:
-            print(f"[DEBUG] カクテル取得開始: {order_id}")
+            logger.debug("カクテル取得開始: %s", order_id)
             cocktail = dbmodule.get_cocktail_by_order_id(order_id)
             if cocktail:
-                print(f"[DEBUG] カクテル取得成功: {cocktail.get('name', 'Unknown')}")
+                logger.debug("カクテル取得成功: %s", cocktail.get('name', 'Unknown'))
             else:
-                print(f"[DEBUG] カクテルが見つかりません: {order_id}")
+                logger.debug("カクテルが見つかりません: %s", order_id)
             return cocktail
         except Exception as e:
-            print(f"[ERROR] カクテル取得エラー: {e}")
+            logger.error("カクテル取得エラー: %s", e)
             return None
     
     @staticmethod
     def insert_poured_cocktail(db_data: Dict[str, Any]) -> Optional[str]:
         """注入済みカクテル情報の保存"""
         try:
-            print(f"[DEBUG] 注入済みカクテル保存開始: {db_data.get('name')}")
+            logger.debug("注入済みカクテル保存開始: %s", db_data.get('name'))
             inserted_id = dbmodule.insert_poured_cocktail(db_data)
-            print(f"[DEBUG] 注入済みカクテル保存完了: {inserted_id}")
+            logger.debug("注入済みカクテル保存完了: %s", inserted_id)
             return inserted_id
         except Exception as e:
-            print(f"[ERROR] 注入済みカクテル保存エラー: {e}")
+            logger.error("注入済みカクテル保存エラー: %s", e)
             return None
     
     @staticmethod
     def get_cocktails_count_debug() -> Dict[str, Any]:
         """デバッグ用：カクテル件数確認"""
         try:
-            print("[DEBUG] カクテル件数取得開始")
+            logger.debug("カクテル件数取得開始")
             
             # 複数の方法で件数取得を試行
             result = {
@@ -655,11 +688,11 @@ class CocktailService:
             except Exception as e:
                 result["methods"]["poured_count"] = f"error: {str(e)}"
             
-            print(f"[DEBUG] カクテル件数取得完了: {result['total_cocktails']}件")
+            logger.debug("カクテル件数取得完了: %s件", result['total_cocktails'])
             return result
             
         except Exception as e:
-            print(f"[ERROR] カクテル件数取得エラー: {e}")
+            logger.error("カクテル件数取得エラー: %s", e)
             return {
                 "total_cocktails": 0,
                 "active_cocktails": 0,
@@ -672,7 +705,7 @@ class CocktailService:
     def confirm_copyright(cocktail_id: str) -> Dict[str, Any]:
         """著作権確認を行う"""
         try:
-            print(f"[DEBUG] 著作権確認開始 - cocktail_id: {cocktail_id}")
+            logger.debug("著作権確認開始 - cocktail_id: %s", cocktail_id)
             
             # カクテルの存在確認
             cocktail = dbmodule.get_cocktail_by_uuid(cocktail_id)
@@ -703,7 +736,7 @@ class CocktailService:
             updated_cocktail = dbmodule.get_cocktail_by_uuid(cocktail_id)
             confirmed_at = updated_cocktail.get('copyright_confirmed_at') if updated_cocktail else None
             
-            print(f"[DEBUG] 著作権確認完了 - cocktail_id: {cocktail_id}")
+            logger.debug("著作権確認完了 - cocktail_id: %s", cocktail_id)
             
             # confirmed_atがdatetimeオブジェクトの場合はisoformat()を呼び出し、文字列の場合はそのまま使用
             confirmed_at_str = None
@@ -722,7 +755,7 @@ class CocktailService:
             
         except Exception as e:
             error_msg = f"著作権確認エラー: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.error("%s", error_msg)
             return {
                 "success": False,
                 "message": error_msg
@@ -732,7 +765,7 @@ class CocktailService:
     def get_copyright_status(cocktail_id: str) -> Dict[str, Any]:
         """著作権確認ステータスを取得"""
         try:
-            print(f"[DEBUG] 著作権ステータス取得開始 - cocktail_id: {cocktail_id}")
+            logger.debug("著作権ステータス取得開始 - cocktail_id: %s", cocktail_id)
             
             # カクテルの取得
             cocktail = dbmodule.get_cocktail_by_uuid(cocktail_id)
@@ -761,7 +794,7 @@ class CocktailService:
             
         except Exception as e:
             error_msg = f"著作権ステータス取得エラー: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.error("%s", error_msg)
             return {
                 "success": False,
                 "message": error_msg
@@ -0,0 +1,67 @@
+"""
+プロンプト使用状況の集計
+"""
+from typing import Dict, Optional, Any
+from datetime import datetime, timedelta, timezone
+
+from db import database as dbmodule
+from config.settings import settings
+from utils.cache import TTLCache
+
+# 集計期間（日数、Noneは全期間）-> {prompt_id: {prompt_type, usage_count, last_used_at}} のキャッシュ
+_usage_cache = TTLCache(settings.PROMPT_USAGE_CACHE_TTL, max_entries=32)
+
+
+class PromptAnalytics:
+    """プロンプト使用回数の集計（cocktail_prompts の集計をキャッシュし、関連付け時に加算）"""
+
+    @staticmethod
+    def get_usage_counts(days: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """プロンプトごとの使用回数（days指定時は直近days日間）"""
+        def load() -> Optional[Dict[int, Dict[str, Any]]]:
+            since = None
+            if days:
+                since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+            return dbmodule.get_prompt_usage_counts(since)
+
+        # 集計に失敗した場合（None）はキャッシュせず、次の呼び出しで再集計する
+        return _usage_cache.get_or_load(days, load) or {}
+
+    @staticmethod
+    def get_prompt_usage(prompt_id: int, days: Optional[int] = None) -> Dict[str, Any]:
+        """特定プロンプトの使用回数と最終使用日時"""
+        usage = PromptAnalytics.get_usage_counts(days).get(int(prompt_id), {})
+        return {
+            'usage_count': usage.get('usage_count', 0),
+            'last_used_at': usage.get('last_used_at')
+        }
+
+    @staticmethod
+    def get_usage_by_type(days: Optional[int] = None) -> Dict[str, int]:
+        """プロンプトタイプ別の使用回数"""
+        totals = {'recipe': 0, 'image': 0}
+        for usage in PromptAnalytics.get_usage_counts(days).values():
+            prompt_type = usage.get('prompt_type') or 'unknown'
+            totals[prompt_type] = totals.get(prompt_type, 0) + usage.get('usage_count', 0)
+        return totals
+
+    @staticmethod
+    def record_usage(prompt_id: int, prompt_type: str) -> None:
+        """カクテルとプロンプトの関連付け後に、キャッシュ済みの集計へ1回分を加算"""
+        used_at = datetime.now(timezone.utc).isoformat()
+
+        def add(days: Optional[int], counts: Dict[int, Dict[str, Any]]) -> None:
+            entry = counts.setdefault(int(prompt_id), {
+                'prompt_type': prompt_type,
+                'usage_count': 0,
+                'last_used_at': None
+            })
+            entry['usage_count'] += 1
+            entry['last_used_at'] = used_at
+
+        _usage_cache.update_each(add)
+
+    @staticmethod
+    def invalidate() -> None:
+        """集計キャッシュを破棄"""
+        _usage_cache.clear()
@@ -1,11 +1,15 @@
 """
 プロンプト管理関連のビジネスロジック
 """
+import logging
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 
 from models.requests import PromptRequest
 from db import database as dbmodule
+from services.prompt_analytics import PromptAnalytics
+
+logger = logging.getLogger(__name__)
 
 
 class PromptService:
@@ -18,40 +22,40 @@ class PromptService:
     ) -> List[Dict[str, Any]]:
         """プロンプト一覧取得"""
         try:
-            print(f"[DEBUG] プロンプト取得開始 - type: {prompt_type}, active: {is_active}")
+            logger.debug("プロンプト取得開始 - type: %s, active: %s", prompt_type, is_active)
             prompts = dbmodule.get_prompts(prompt_type, is_active)
-            print(f"[DEBUG] プロンプト取得完了: {len(prompts)}件")
+            logger.debug("プロンプト取得完了: %s件", len(prompts))
             return prompts
         except Exception as e:
-            print(f"[ERROR] プロンプト取得エラー: {e}")
+            logger.error("プロンプト取得エラー: %s", e)
             return []
     
     @staticmethod
     def get_prompt_by_id(prompt_id: str) -> Optional[Dict[str, Any]]:
         """特定プロンプト取得"""
         try:
-            print(f"[DEBUG] プロンプト詳細取得開始: {prompt_id}")
+            logger.debug("プロンプト詳細取得開始: %s", prompt_id)
             prompt = dbmodule.get_prompt_by_id(prompt_id)
             if prompt:
-                print(f"[DEBUG] プロンプト取得成功: {prompt.get('name', 'Unknown')}")
+                logger.debug("プロンプト取得成功: %s", prompt.get('name', 'Unknown'))
             else:
-                print(f"[DEBUG] プロンプトが見つかりません: {prompt_id}")
+                logger.debug("プロンプトが見つかりません: %s", prompt_id)
             return prompt
         except Exception as e:
-            print(f"[ERROR] プロンプト取得エラー: {e}")
+            logger.error("プロンプト取得エラー: %s", e)
             return None
     
     @staticmethod
     def create_prompt(prompt_data: PromptRequest) -> Optional[str]:
         """新規プロンプト作成"""
         try:
-            print(f"[DEBUG] プロンプト作成開始: {prompt_data.name}")
+            logger.debug("プロンプト作成開始: %s", prompt_data.name)
             
             # 重複チェック
             existing_prompts = dbmodule.get_prompts(prompt_data.prompt_type)
             for existing in existing_prompts:
                 if existing.get('name') == prompt_data.name:
-                    print(f"[WARNING] 同名プロンプトが既に存在: {prompt_data.name}")
+                    logger.warning("同名プロンプトが既に存在: %s", prompt_data.name)
                     return None
             
             # プロンプトデータ準備
@@ -66,26 +70,26 @@ class PromptService:
             # DB挿入
             prompt_id = dbmodule.create_prompt(db_data)
             if prompt_id:
-                print(f"[DEBUG] プロンプト作成完了: {prompt_id}")
+                logger.debug("プロンプト作成完了: %s", prompt_id)
                 return prompt_id
             else:
-                print("[ERROR] プロンプト作成失敗")
+                logger.error("プロンプト作成失敗")
                 return None
                 
         except Exception as e:
-            print(f"[ERROR] プロンプト作成エラー: {e}")
+            logger.error("プロンプト作成エラー: %s", e)
             return None
     
     @staticmethod
     def update_prompt(prompt_id: str, prompt_data: PromptRequest) -> bool:
         """プロンプト更新"""
         try:
-            print(f"[DEBUG] プロンプト更新開始: {prompt_id}")
+            logger.debug("プロンプト更新開始: %s", prompt_id)
             
             # 既存プロンプト確認
             existing_prompt = dbmodule.get_prompt_by_id(prompt_id)
             if not existing_prompt:
-                print(f"[WARNING] 更新対象プロンプトが見つかりません: {prompt_id}")
+                logger.warning("更新対象プロンプトが見つかりません: %s", prompt_id)
                 return False
             
             # 更新データ準備
@@ -101,26 +105,26 @@ class PromptService:
             # DB更新
             success = dbmodule.update_prompt(prompt_id, update_data)
             if success:
-                print(f"[DEBUG] プロンプト更新完了: {prompt_id}")
+                logger.debug("プロンプト更新完了: %s", prompt_id)
                 return True
             else:
-                print(f"[ERROR] プロンプト更新失敗: {prompt_id}")
+                logger.error("プロンプト更新失敗: %s", prompt_id)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] プロンプト更新エラー: {e}")
+            logger.error("プロンプト更新エラー: %s", e)
             return False
     
     @staticmethod
     def delete_prompt(prompt_id: str) -> bool:
         """プロンプト削除（論理削除）"""
         try:
-            print(f"[DEBUG] プロンプト削除開始: {prompt_id}")
+            logger.debug("プロンプト削除開始: %s", prompt_id)
             
             # 既存プロンプト確認
             existing_prompt = dbmodule.get_prompt_by_id(prompt_id)
             if not existing_prompt:
-                print(f"[WARNING] 削除対象プロンプトが見つかりません: {prompt_id}")
+                logger.warning("削除対象プロンプトが見つかりません: %s", prompt_id)
                 return False
             
             # 論理削除（is_activeをFalseに）
@@ -131,21 +135,21 @@ class PromptService:
             
             success = dbmodule.update_prompt(prompt_id, update_data)
             if success:
-                print(f"[DEBUG] プロンプト削除完了: {prompt_id}")
+                logger.debug("プロンプト削除完了: %s", prompt_id)
                 return True
             else:
-                print(f"[ERROR] プロンプト削除失敗: {prompt_id}")
+                logger.error("プロンプト削除失敗: %s", prompt_id)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] プロンプト削除エラー: {e}")
+            logger.error("プロンプト削除エラー: %s", e)
             return False
     
     @staticmethod
     def initialize_default_prompts() -> bool:
         """デフォルトプロンプトの初期化"""
         try:
-            print("[DEBUG] デフォルトプロンプト初期化開始")
+            logger.debug("デフォルトプロンプト初期化開始")
             
             # レシピ用デフォルトプロンプト
             recipe_prompts = [
@@ -181,70 +185,59 @@ class PromptService:
                     prompt_id = dbmodule.create_prompt(prompt_data)
                     if prompt_id:
                         created_count += 1
-                        print(f"[DEBUG] デフォルトプロンプト作成: {prompt_data['name']}")
+                        logger.debug("デフォルトプロンプト作成: %s", prompt_data['name'])
                     else:
-                        print(f"[ERROR] デフォルトプロンプト作成失敗: {prompt_data['name']}")
+                        logger.error("デフォルトプロンプト作成失敗: %s", prompt_data['name'])
                 else:
-                    print(f"[INFO] デフォルトプロンプト既存: {prompt_data['name']}")
+                    logger.info("デフォルトプロンプト既存: %s", prompt_data['name'])
             
-            print(f"[DEBUG] デフォルトプロンプト初期化完了: {created_count}件作成")
+            logger.debug("デフォルトプロンプト初期化完了: %s件作成", created_count)
             return True
             
         except Exception as e:
-            print(f"[ERROR] デフォルトプロンプト初期化エラー: {e}")
+            logger.error("デフォルトプロンプト初期化エラー: %s", e)
             return False
     
     @staticmethod
-    def get_prompt_usage_statistics(prompt_id: str) -> Dict[str, Any]:
-        """プロンプト使用統計取得"""
+    def get_prompt_usage_statistics(prompt_id: str, days: Optional[int] = None) -> Dict[str, Any]:
+        """プロンプト使用統計取得（days指定時は直近days日間の使用回数）"""
         try:
-            print(f"[DEBUG] プロンプト使用統計取得開始: {prompt_id}")
+            logger.debug("プロンプト使用統計取得開始: %s", prompt_id)
             
             # プロンプト基本情報
             prompt = dbmodule.get_prompt_by_id(prompt_id)
             if not prompt:
                 return {}
             
-            # 使用統計を取得（実装は使用するDBモジュールに依存）
+            # カクテル生成での使用回数（全プロンプト分を1回で集計したキャッシュから取得）
+            usage = PromptAnalytics.get_prompt_usage(prompt['id'], days)
+            
             stats = {
                 'prompt_id': prompt_id,
                 'prompt_name': prompt.get('name', ''),
                 'prompt_type': prompt.get('prompt_type', ''),
                 'is_active': prompt.get('is_active', False),
                 'created_at': prompt.get('created_at', ''),
-                'usage_count': 0,
-                'last_used_at': None
+                'usage_count': usage['usage_count'],
+                'last_used_at': usage['last_used_at'],
+                'period_days': days
             }
             
-            # カクテル生成での使用回数を取得
-            try:
-                if prompt.get('prompt_type') == 'recipe':
-                    usage_count = dbmodule.get_recipe_prompt_usage_count(prompt_id)
-                elif prompt.get('prompt_type') == 'image':
-                    usage_count = dbmodule.get_image_prompt_usage_count(prompt_id)
-                else:
-                    usage_count = 0
-                    
-                stats['usage_count'] = usage_count
-            except AttributeError:
-                # メソッドが存在しない場合はスキップ
-                pass
-            
-            print(f"[DEBUG] プロンプト使用統計取得完了: {prompt_id}")
+            logger.debug("プロンプト使用統計取得完了: %s", prompt_id)
             return stats
             
         except Exception as e:
-            print(f"[ERROR] プロンプト使用統計取得エラー: {e}")
+            logger.error("プロンプト使用統計取得エラー: %s", e)
             return {}
     
     @staticmethod
-    def get_all_prompt_statistics() -> Dict[str, Any]:
+    def get_all_prompt_statistics(days: Optional[int] = None) -> Dict[str, Any]:
         """全プロンプトの統計情報取得"""
         try:
-            print("[DEBUG] 全プロンプト統計取得開始")
+            logger.debug("全プロンプト統計取得開始")
             
-            # 全プロンプト取得
-            all_prompts = dbmodule.get_prompts()
+            # 全プロンプト取得（無効なプロンプトも含める）
+            all_prompts = dbmodule.get_prompts(is_active=None)
             
             # タイプ別集計
             type_counts = {
@@ -274,12 +267,14 @@ class PromptService:
                 'total_prompts': len(all_prompts),
                 'type_breakdown': type_counts,
                 'active_breakdown': active_counts,
+                'usage_breakdown': PromptAnalytics.get_usage_by_type(days),
+                'period_days': days,
                 'generated_at': datetime.now().isoformat()
             }
             
-            print("[DEBUG] 全プロンプト統計取得完了")
+            logger.debug("全プロンプト統計取得完了")
             return stats
             
         except Exception as e:
-            print(f"[ERROR] 全プロンプト統計取得エラー: {e}")
-            return {}
\ No newline at end of file
+            logger.error("全プロンプト統計取得エラー: %s", e)
+            return {}
@@ -1,12 +1,20 @@
 """
 アンケート管理関連のビジネスロジック
 """
-from typing import List, Dict, Optional, Any
+import logging
+import io
+import csv
+import json
+import itertools
+from typing import List, Dict, Optional, Any, Iterator
 from datetime import datetime
 
-from models.requests import SurveyRequest, SurveyUpdateRequest, SurveyResponseRequest
+from models.requests import SurveyRequest, SurveyUpdateRequest, SurveyResponseRequest, SurveyQuestion
 from utils.validation import validate_survey_response
 from db import database as dbmodule
+from db.survey_definition import SurveyDefinition
+
+logger = logging.getLogger(__name__)
 
 
 class SurveyService:
@@ -16,12 +24,12 @@ class SurveyService:
     def create_survey(survey_data: SurveyRequest) -> Optional[str]:
         """新規アンケート作成"""
         try:
-            print(f"[DEBUG] アンケート作成開始: {survey_data.title}")
+            logger.debug("アンケート作成開始: %s", survey_data.title)
             
             # イベント存在確認
             event = dbmodule.get_event_by_id(survey_data.event_id)
             if not event:
-                print(f"[ERROR] 指定されたイベントが見つかりません: {survey_data.event_id}")
+                logger.error("指定されたイベントが見つかりません: %s", survey_data.event_id)
                 return None
             
             # アンケートデータ準備
@@ -32,84 +40,76 @@ class SurveyService:
                 'is_active': survey_data.is_active
             }
             
-            # アンケート作成
-            survey_id = dbmodule.create_survey(survey_db_data)
-            if not survey_id:
-                print("[ERROR] アンケート作成失敗")
-                return None
-            
-            # 質問作成
+            # 質問・選択肢データ準備
+            questions_data = []
             for question in survey_data.questions:
                 question_data = {
-                    'survey_id': survey_id,
                     'question_text': question.question_text,
                     'question_type': question.question_type,
                     'is_required': question.is_required,
-                    'order_index': question.order_index
+                    'display_order': question.order_index
                 }
-                
-                question_id = dbmodule.create_survey_question(question_data)
-                if not question_id:
-                    print(f"[ERROR] 質問作成失敗: {question.question_text}")
-                    continue
-                
-                # 選択肢作成（multiple_choice または single_choice の場合）
-                if question.options and question.question_type in ['multiple_choice', 'single_choice']:
-                    for option in question.options:
-                        option_data = {
-                            'question_id': question_id,
+                if question.options:
+                    question_data['options'] = [
+                        {
                             'option_text': option.option_text,
-                            'order_index': option.order_index
+                            'display_order': option.order_index
                         }
-                        
-                        option_id = dbmodule.create_question_option(option_data)
-                        if not option_id:
-                            print(f"[ERROR] 選択肢作成失敗: {option.option_text}")
+                        for option in question.options
+                    ]
+                questions_data.append(question_data)
             
-            print(f"[DEBUG] アンケート作成完了: {survey_id}")
+            # アンケート・質問・選択肢を一括作成
+            survey = dbmodule.create_survey_definition(survey_db_data, questions_data)
+            if not survey:
+                logger.error("アンケート作成失敗")
+                return None
+            survey_id = str(survey['id'])
+            
+            logger.debug("アンケート作成完了: %s", survey_id)
             return survey_id
             
         except Exception as e:
-            print(f"[ERROR] アンケート作成エラー: {e}")
+            logger.error("アンケート作成エラー: %s", e)
             return None
     
     @staticmethod
     def get_surveys_by_event(event_id: str, is_active: Optional[bool] = None) -> List[Dict[str, Any]]:
         """イベントに紐づくアンケート取得"""
         try:
-            print(f"[DEBUG] イベントアンケート取得開始: {event_id}")
+            logger.debug("イベントアンケート取得開始: %s", event_id)
             surveys = dbmodule.get_surveys_by_event(event_id, is_active)
-            print(f"[DEBUG] アンケート取得完了: {len(surveys)}件")
+            logger.debug("アンケート取得完了: %s件", len(surveys))
             return surveys
         except Exception as e:
-            print(f"[ERROR] アンケート取得エラー: {e}")
+            logger.error("アンケート取得エラー: %s", e)
             return []
     
     @staticmethod
     def get_survey_with_questions(survey_id: str) -> Optional[Dict[str, Any]]:
         """アンケートを質問と選択肢込みで取得"""
         try:
-            print(f"[DEBUG] 詳細アンケート取得開始: {survey_id}")
+            logger.debug("詳細アンケート取得開始: %s", survey_id)
             survey = dbmodule.get_survey_with_questions(survey_id)
             if survey:
-                print(f"[DEBUG] アンケート取得成功: {survey.get('title', 'Unknown')}")
+                logger.debug("アンケート取得成功: %s", survey.get('title', 'Unknown'))
             else:
-                print(f"[DEBUG] アンケートが見つかりません: {survey_id}")
+                logger.debug("アンケートが見つかりません: %s", survey_id)
             return survey
         except Exception as e:
-            print(f"[ERROR] アンケート取得エラー: {e}")
+            logger.error("アンケート取得エラー: %s", e)
             return None
     
     @staticmethod
     def update_survey(survey_id: str, update_data: SurveyUpdateRequest) -> bool:
         """アンケート更新"""
         try:
-            print(f"[DEBUG] アンケート更新開始: {survey_id}")
+            logger.debug("アンケート更新開始: %s", survey_id)
             
             # 既存アンケート確認
             existing_survey = dbmodule.get_survey_with_questions(survey_id)
             if not existing_survey:
-                print(f"[WARNING] 更新対象アンケートが見つかりません: {survey_id}")
+                logger.warning("更新対象アンケートが見つかりません: %s", survey_id)
                 return False
             
             # 基本情報の更新
@@ -125,51 +125,125 @@ class SurveyService:
                 survey_updates['updated_at'] = datetime.now().isoformat()
                 success = dbmodule.update_survey(survey_id, survey_updates)
                 if not success:
-                    print(f"[ERROR] アンケート基本情報更新失敗: {survey_id}")
+                    logger.error("アンケート基本情報更新失敗: %s", survey_id)
                     return False
             
-            # 質問の更新（提供されている場合）
+            # 質問の更新（提供されている場合、変更のあった質問のみ反映）
             if update_data.questions is not None:
-                # 既存の質問を削除
-                dbmodule.delete_survey_questions(survey_id)
-                
-                # 新しい質問を作成
-                for question in update_data.questions:
-                    question_data = {
-                        'survey_id': survey_id,
-                        'question_text': question.question_text,
-                        'question_type': question.question_type,
-                        'is_required': question.is_required,
-                        'order_index': question.order_index
-                    }
-                    
-                    question_id = dbmodule.create_survey_question(question_data)
-                    if question_id and question.options:
-                        for option in question.options:
-                            option_data = {
-                                'question_id': question_id,
-                                'option_text': option.option_text,
-                                'order_index': option.order_index
-                            }
-                            dbmodule.create_question_option(option_data)
+                if not SurveyService._sync_survey_questions(
+                    survey_id, existing_survey.get('questions', []), update_data.questions
+                ):
+                    logger.error("アンケート質問更新失敗: %s", survey_id)
+                    return False
             
-            print(f"[DEBUG] アンケート更新完了: {survey_id}")
+            logger.debug("アンケート更新完了: %s", survey_id)
             return True
             
         except Exception as e:
-            print(f"[ERROR] アンケート更新エラー: {e}")
+            logger.error("アンケート更新エラー: %s", e)
+            return False
+    
+    @staticmethod
+    def _question_structure(question: Dict[str, Any]) -> tuple:
+        """回答の解釈に関わる質問の構造（形式と選択肢）"""
+        options = []
+        if question['question_type'] in ['single_choice', 'multiple_choice']:
+            options = sorted(
+                (option['display_order'], option['option_text'])
+                for option in question.get('options') or []
+            )
+        return question['question_type'], tuple(options)
+    
+    @staticmethod
+    def _sync_survey_questions(survey_id: str, existing_questions: List[Dict[str, Any]], questions: List[SurveyQuestion]) -> bool:
+        """既存の質問と新しい質問を突き合わせ、差分のみ反映する
+        
+        - id を指定した質問はその既存の質問と対応付ける（文言の変更も更新として扱い、回答は残る）
+        - id のない質問は、文言・形式・選択肢が同じ既存の質問と対応付ける（必須・表示順の変更のみ更新）
+        - 形式・選択肢が変わった質問、対応する既存の質問がない質問は作り直す（回答は引き継がない）
+        - 対応付かなかった既存の質問は削除
+        """
+        desired = sorted(questions, key=lambda question: question.order_index)
+        existing = sorted(existing_questions, key=lambda question: question.get('display_order', 0))
+        existing_by_id = {question['id']: question for question in existing}
+        
+        matched: Dict[int, Dict[str, Any]] = {}
+        matched_ids = set()
+        # 1. IDで対応付け
+        for index, question in enumerate(desired):
+            if question.id and question.id in existing_by_id and question.id not in matched_ids:
+                matched[index] = existing_by_id[question.id]
+                matched_ids.add(question.id)
+            elif question.id:
+                logger.warning("アンケート %s に存在しない質問IDのため新規作成します: %s", survey_id, question.id)
+        
+        def to_row(question: SurveyQuestion) -> Dict[str, Any]:
+            return {
+                'question_text': question.question_text,
+                'question_type': question.question_type,
+                'is_required': question.is_required,
+                'display_order': question.order_index,
+                'options': [
+                    {'option_text': option.option_text, 'display_order': option.order_index}
+                    for option in question.options or []
+                ]
+            }
+        rows = [to_row(question) for question in desired]
+        
+        # 2. IDのない質問は文言と構造が同じ既存の質問に対応付け（表示順の早いものから）
+        for index, (question, row) in enumerate(zip(desired, rows)):
+            if index in matched or question.id:
+                continue
+            key = (row['question_text'], SurveyService._question_structure(row))
+            for current in existing:
+                if current['id'] in matched_ids:
+                    continue
+                if (current.get('question_text'), SurveyService._question_structure(current)) == key:
+                    matched[index] = current
+                    matched_ids.add(current['id'])
+                    break
+        
+        delete_ids = []
+        updates = []
+        creates = []
+        for index, row in enumerate(rows):
+            current = matched.get(index)
+            if current is None:
+                creates.append(row)
+            elif SurveyService._question_structure(current) != SurveyService._question_structure(row):
+                delete_ids.append(current['id'])
+                creates.append(row)
+            else:
+                changes = {
+                    key: row[key]
+                    for key in ('question_text', 'is_required', 'display_order')
+                    if current.get(key) != row[key]
+                }
+                if changes:
+                    updates.append((current['id'], changes))
+        delete_ids.extend(question['id'] for question in existing if question['id'] not in matched_ids)
+        
+        logger.debug("質問差分: 削除%s件, 更新%s件, 追加%s件", len(delete_ids), len(updates), len(creates))
+        
+        if delete_ids and not dbmodule.delete_survey_questions_by_ids(survey_id, delete_ids):
             return False
+        for question_id, changes in updates:
+            if not dbmodule.update_survey_question(survey_id, question_id, changes):
+                return False
+        if creates and not dbmodule.create_survey_questions(survey_id, creates):
+            return False
+        return True
     
     @staticmethod
     def delete_survey(survey_id: str) -> bool:
         """アンケート削除（論理削除）"""
         try:
-            print(f"[DEBUG] アンケート削除開始: {survey_id}")
+            logger.debug("アンケート削除開始: %s", survey_id)
             
             # 既存アンケート確認
             existing_survey = dbmodule.get_survey_with_questions(survey_id)
             if not existing_survey:
-                print(f"[WARNING] 削除対象アンケートが見つかりません: {survey_id}")
+                logger.warning("削除対象アンケートが見つかりません: %s", survey_id)
                 return False
             
             # 論理削除（is_activeをFalseに）
@@ -180,30 +254,30 @@ class SurveyService:
             
             success = dbmodule.update_survey(survey_id, update_data)
             if success:
-                print(f"[DEBUG] アンケート削除完了: {survey_id}")
+                logger.debug("アンケート削除完了: %s", survey_id)
                 return True
             else:
-                print(f"[ERROR] アンケート削除失敗: {survey_id}")
+                logger.error("アンケート削除失敗: %s", survey_id)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] アンケート削除エラー: {e}")
+            logger.error("アンケート削除エラー: %s", e)
             return False
     
     @staticmethod
     def submit_survey_response(response_data: SurveyResponseRequest) -> Optional[str]:
         """アンケート回答提出"""
         try:
-            print(f"[DEBUG] アンケート回答提出開始: {response_data.survey_id}")
+            logger.debug("アンケート回答提出開始: %s", response_data.survey_id)
             
             # アンケート存在確認
-            survey = dbmodule.get_survey_with_questions(response_data.survey_id)
+            survey = dbmodule.get_survey_definition(response_data.survey_id)
             if not survey:
-                print(f"[ERROR] 指定されたアンケートが見つかりません: {response_data.survey_id}")
+                logger.error("指定されたアンケートが見つかりません: %s", response_data.survey_id)
                 return None
             
-            if not survey.get('is_active', False):
-                print(f"[ERROR] 指定されたアンケートは非アクティブです: {response_data.survey_id}")
+            if not survey.is_active:
+                logger.error("指定されたアンケートは非アクティブです: %s", response_data.survey_id)
                 return None
             
             # 回答データの検証
@@ -216,10 +290,10 @@ class SurveyService:
                         'selected_option_ids': answer.selected_option_ids or []
                     })
                 else:
-                    print(f"[WARNING] 無効な回答データをスキップ: {answer.question_id}")
+                    logger.warning("無効な回答データをスキップ: %s", answer.question_id)
             
             if not validated_answers:
-                print("[ERROR] 有効な回答データがありません")
+                logger.error("有効な回答データがありません")
                 return None
             
             # DB保存
@@ -230,116 +304,197 @@ class SurveyService:
             )
             
             if response_id:
-                print(f"[DEBUG] アンケート回答提出完了: {response_id}")
+                logger.debug("アンケート回答提出完了: %s", response_id)
                 return response_id
             else:
-                print("[ERROR] アンケート回答提出失敗")
+                logger.error("アンケート回答提出失敗")
                 return None
                 
         except Exception as e:
-            print(f"[ERROR] アンケート回答提出エラー: {e}")
+            logger.error("アンケート回答提出エラー: %s", e)
             return None
     
     @staticmethod
-    def get_survey_responses(survey_id: str) -> List[Dict[str, Any]]:
-        """アンケート回答一覧取得"""
+    def get_survey_responses(survey_id: str, limit: Optional[int] = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """アンケート回答一覧取得（ページ単位）"""
         try:
-            print(f"[DEBUG] アンケート回答取得開始: {survey_id}")
-            responses = dbmodule.get_survey_responses(survey_id)
-            print(f"[DEBUG] アンケート回答取得完了: {len(responses)}件")
+            logger.debug("アンケート回答取得開始: %s, limit: %s, offset: %s", survey_id, limit, offset)
+            result = dbmodule.get_survey_responses(survey_id, limit, offset)
+            responses = result.get('data', [])
+            logger.debug("アンケート回答取得完了: %s件", len(responses))
             return responses
         except Exception as e:
-            print(f"[ERROR] アンケート回答取得エラー: {e}")
+            logger.error("アンケート回答取得エラー: %s", e)
             return []
     
+    EXPORT_CSV_COLUMNS = [
+        'response_id', 'submitted_at', 'cocktail_id',
+        'question_id', 'question_text', 'question_type',
+        'answer_text', 'selected_options'
+    ]
+    
+    @staticmethod
+    def export_survey_responses(survey_id: str, export_format: str = 'ndjson') -> Optional[Iterator[str]]:
+        """アンケート回答をNDJSON/CSVで順次出力するイテレータを返す（アンケートがなければNone）"""
+        survey = dbmodule.get_survey_definition(survey_id)
+        if not survey:
+            logger.warning("エクスポート対象アンケートが見つかりません: %s", survey_id)
+            return None
+        
+        # 最初のページはレスポンス開始前に取得し、取得できない場合はHTTPエラーとして返す
+        pages = dbmodule.iter_survey_responses(survey_id)
+        first_page = next(pages, None)
+        if first_page is not None:
+            pages = itertools.chain([first_page], pages)
+        
+        if export_format == 'csv':
+            return SurveyService._export_csv(survey, pages)
+        return SurveyService._export_ndjson(survey, pages)
+    
+    @staticmethod
+    def _export_ndjson(survey: SurveyDefinition, pages: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+        """1回答1行のJSON（質問文・選択肢名を付与）"""
+        exported = 0
+        try:
+            for page in pages:
+                lines = []
+                for response in page:
+                    answers = []
+                    for answer in response.get('survey_answers') or []:
+                        question = survey.question(answer.get('question_id')) or {}
+                        answers.append({
+                            'question_id': answer.get('question_id'),
+                            'question_text': question.get('question_text', ''),
+                            'question_type': question.get('question_type', ''),
+                            'answer_text': answer.get('answer_text'),
+                            'selected_option_ids': answer.get('selected_option_ids') or [],
+                            'selected_options': survey.selected_option_texts(
+                                answer.get('question_id'), answer.get('selected_option_ids') or []
+                            )
+                        })
+                    lines.append(json.dumps({
+                        'response_id': response['id'],
+                        'survey_id': response.get('survey_id'),
+                        'cocktail_id': response.get('cocktail_id'),
+                        'submitted_at': response.get('submitted_at'),
+                        'answers': answers
+                    }, ensure_ascii=False, default=str) + '\n')
+                exported += len(page)
+                yield ''.join(lines)
+        except Exception as e:
+            # ヘッダー送信後のため、途中で失敗したことを最終行で明示する
+            logger.error("アンケート回答エクスポート中断（NDJSON）: %s, %s件出力済み: %s", survey.survey_id, exported, e)
+            yield json.dumps({'error': 'export_failed', 'exported': exported}, ensure_ascii=False) + '\n'
+            return
+        logger.debug("アンケート回答エクスポート完了（NDJSON）: %s, %s件", survey.survey_id, exported)
+    
+    @staticmethod
+    def _export_csv(survey: SurveyDefinition, pages: Iterator[List[Dict[str, Any]]]) -> Iterator[str]:
+        """1回答項目1行のCSV（Excelで文字化けしないようBOM付き）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(SurveyService.EXPORT_CSV_COLUMNS)
+        yield '\ufeff' + buffer.getvalue()
+        
+        exported = 0
+        try:
+            for page in pages:
+                buffer.seek(0)
+                buffer.truncate(0)
+                for response in page:
+                    for answer in response.get('survey_answers') or []:
+                        question = survey.question(answer.get('question_id')) or {}
+                        writer.writerow([
+                            response['id'],
+                            response.get('submitted_at', ''),
+                            response.get('cocktail_id') or '',
+                            answer.get('question_id', ''),
+                            question.get('question_text', ''),
+                            question.get('question_type', ''),
+                            answer.get('answer_text') or '',
+                            ' / '.join(survey.selected_option_texts(
+                                answer.get('question_id'), answer.get('selected_option_ids') or []
+                            ))
+                        ])
+                exported += len(page)
+                yield buffer.getvalue()
+        except Exception as e:
+            # ヘッダー送信後のため、途中で失敗したことを最終行で明示する
+            logger.error("アンケート回答エクスポート中断（CSV）: %s, %s件出力済み: %s", survey.survey_id, exported, e)
+            buffer.seek(0)
+            buffer.truncate(0)
+            writer.writerow(['#ERROR', f'エクスポートが途中で失敗しました（{exported}件出力済み）'])
+            yield buffer.getvalue()
+            return
+        logger.debug("アンケート回答エクスポート完了（CSV）: %s, %s件", survey.survey_id, exported)
+    
     @staticmethod
     def get_survey_statistics(survey_id: str) -> Dict[str, Any]:
         """アンケート統計情報取得"""
         try:
-            print(f"[DEBUG] アンケート統計取得開始: {survey_id}")
+            logger.debug("アンケート統計取得開始: %s", survey_id)
             
             # アンケート基本情報
-            survey = dbmodule.get_survey_with_questions(survey_id)
+            survey = dbmodule.get_survey_definition(survey_id)
             if not survey:
                 return {}
             
-            # 回答取得
-            responses = dbmodule.get_survey_responses(survey_id)
+            # 回答の集計（DB側で集計済みの結果を取得）
+            aggregated = dbmodule.get_survey_statistics(survey_id)
+            questions = aggregated.get('questions', [])
             
             # 統計情報構築
             stats = {
                 'survey_id': survey_id,
-                'survey_title': survey.get('title', ''),
-                'total_responses': len(responses),
-                'questions_count': len(survey.get('questions', [])),
-                'is_active': survey.get('is_active', False),
-                'created_at': survey.get('created_at', ''),
+                'survey_title': survey.title,
+                'total_responses': aggregated.get('total_responses', 0),
+                'questions_count': len(questions),
+                'is_active': survey.is_active,
+                'created_at': survey.created_at,
                 'question_stats': []
             }
             
             # 質問別統計
-            for question in survey.get('questions', []):
+            for question in questions:
                 question_stats = {
-                    'question_id': question['id'],
+                    'question_id': question['question_id'],
                     'question_text': question['question_text'],
                     'question_type': question['question_type'],
-                    'responses_count': 0,
+                    'responses_count': question.get('responses_count', 0),
                     'answers': []
                 }
                 
-                # この質問に対する回答を集計
-                question_responses = []
-                for response in responses:
-                    for answer in response.get('answers', []):
-                        if answer.get('question_id') == question['id']:
-                            question_responses.append(answer)
-                
-                question_stats['responses_count'] = len(question_responses)
-                
-                # 回答内容の集計
                 if question['question_type'] == 'text':
-                    # テキスト回答の一覧
-                    text_answers = [
-                        ans.get('answer_text', '') 
-                        for ans in question_responses 
-                        if ans.get('answer_text')
-                    ]
-                    question_stats['answers'] = text_answers
+                    # テキスト回答の一覧（新しい順のサンプル）
+                    question_stats['answers'] = question.get('responses', [])
                 else:
-                    # 選択肢回答の集計
-                    option_counts = {}
-                    for ans in question_responses:
-                        selected_ids = ans.get('selected_option_ids', [])
-                        for option_id in selected_ids:
-                            option_counts[option_id] = option_counts.get(option_id, 0) + 1
-                    
                     # 選択肢名と回答数
-                    option_stats = []
-                    for option in question.get('options', []):
-                        option_stats.append({
-                            'option_id': option['id'],
+                    question_stats['answers'] = [
+                        {
+                            'option_id': option_id,
                             'option_text': option['option_text'],
-                            'count': option_counts.get(option['id'], 0)
-                        })
-                    question_stats['answers'] = option_stats
+                            'count': option['count']
+                        }
+                        for option_id, option in question.get('option_statistics', {}).items()
+                    ]
                 
                 stats['question_stats'].append(question_stats)
             
-            print(f"[DEBUG] アンケート統計取得完了: {survey_id}")
+            logger.debug("アンケート統計取得完了: %s", survey_id)
             return stats
             
         except Exception as e:
-            print(f"[ERROR] アンケート統計取得エラー: {e}")
+            logger.error("アンケート統計取得エラー: %s", e)
             return {}
 
     @staticmethod
     def create_survey_with_questions(survey_data: Dict[str, Any], questions_data: List[Dict[str, Any]]) -> Optional[str]:
         """アンケートと質問を同時に作成"""
         try:
-            print(f"[DEBUG] アンケート作成開始（質問付き）: {survey_data.get('title')}")
+            logger.debug("アンケート作成開始（質問付き）: %s", survey_data.get('title'))
             survey_id = dbmodule.create_survey_with_questions(survey_data, questions_data)
-            print(f"[DEBUG] アンケート作成完了（質問付き）: {survey_id}")
+            logger.debug("アンケート作成完了（質問付き）: %s", survey_id)
             return survey_id
         except Exception as e:
-            print(f"[ERROR] アンケート作成エラー（質問付き）: {e}")
+            logger.error("アンケート作成エラー（質問付き）: %s", e)
             return None
@@ -1,12 +1,16 @@
 """
 違反報告関連のビジネスロジック
 """
+import logging
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 
 from models.requests import ViolationReportRequest, HideCocktailRequest
 from utils.validation import get_client_ip
 from db import database as dbmodule
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
 
 
 class ViolationService:
@@ -16,161 +20,136 @@ class ViolationService:
     def report_violation(report_data: ViolationReportRequest, reporter_ip: str) -> bool:
         """違反報告提出"""
         try:
-            print(f"[DEBUG] 違反報告開始 - order_id: {report_data.order_id}, ip: {reporter_ip}")
-            
-            # 注文番号からカクテル情報を取得
-            cocktail = dbmodule.get_cocktail_by_order_id(report_data.order_id)
-            if not cocktail:
-                print(f"[ERROR] 指定された注文番号のカクテルが見つかりません: {report_data.order_id}")
-                return False
-            
-            # UUIDマイグレーション後はidを使用
-            cocktail_uuid = cocktail.get('id')
-            if not cocktail_uuid:
-                print(f"[ERROR] カクテルのUUIDが取得できません: {report_data.order_id}")
-                return False
-            
-            print(f"[DEBUG] 注文番号 {report_data.order_id} → カクテルUUID {cocktail_uuid}")
-            
-            # 重複報告チェック（UUID使用）
-            existing_report = dbmodule.get_violation_report_by_cocktail_and_reporter(
-                cocktail_uuid, reporter_ip
-            )
-            if existing_report:
-                print(f"[WARNING] 同じIPからの重複報告: {reporter_ip}")
-                return False
+            logger.debug("違反報告開始 - order_id: %s, ip: %s", report_data.order_id, reporter_ip)
             
-            # 違反報告を保存（UUID使用）
-            success = dbmodule.report_violation(
-                cocktail_uuid,
+            # 報告の登録・報告数の加算・自動非表示をまとめて実行
+            outcome = dbmodule.report_violation_by_order_id(
+                report_data.order_id,
                 reporter_ip,
                 report_data.report_reason,
-                report_data.report_category
+                report_data.report_category,
+                settings.VIOLATION_AUTO_HIDE_THRESHOLD
             )
+            status = outcome.get('status')
             
-            if success:
-                print(f"[DEBUG] 違反報告提出成功")
-                
-                # 違反報告数に応じた自動処理
-                violation_count = dbmodule.get_violation_reports_count(cocktail_uuid)
-                print(f"[DEBUG] カクテルの違反報告数: {violation_count}")
-                
-                # 閾値を超えた場合の自動非表示処理
-                auto_hide_threshold = 1  # 1件の報告で自動非表示
-                if violation_count >= auto_hide_threshold:
-                    hide_reason = f"違反報告により自動非表示（報告数: {violation_count}）"
-                    ViolationService.hide_cocktail_by_id(cocktail_uuid, hide_reason)
-                
-                return True
-            else:
-                print(f"[ERROR] 違反報告提出失敗")
+            if status == 'not_found':
+                logger.error("指定された注文番号のカクテルが見つかりません: %s", report_data.order_id)
                 return False
+            if status == 'duplicate':
+                logger.warning("同じIPからの重複報告: %s", reporter_ip)
+                return False
+            if status != 'reported':
+                logger.error("違反報告提出失敗")
+                return False
+            
+            logger.debug("違反報告提出成功 - カクテルUUID: %s, 報告数: %s, 非表示: %s", outcome.get('cocktail_id'), outcome.get('violation_reports_count'), outcome.get('hidden'))
+            return True
                 
         except Exception as e:
-            print(f"[ERROR] 違反報告エラー: {e}")
+            logger.error("違反報告エラー: %s", e)
             return False
     
     @staticmethod
     def hide_cocktail_by_id(cocktail_uuid: str, reason: str) -> bool:
         """カクテルを非表示にする（UUID使用）"""
         try:
-            print(f"[DEBUG] カクテル非表示処理開始（UUID使用): {cocktail_uuid}")
+            logger.debug("カクテル非表示処理開始（UUID使用): %s", cocktail_uuid)
             
             # カクテル存在確認
             cocktail = dbmodule.get_cocktail_by_uuid(cocktail_uuid)
             if not cocktail:
-                print(f"[ERROR] 指定されたカクテルが見つかりません（UUID）: {cocktail_uuid}")
+                logger.error("指定されたカクテルが見つかりません（UUID）: %s", cocktail_uuid)
                 return False
             
             # 既に非表示の場合はスキップ
             if not cocktail.get('is_visible', True):
-                print(f"[INFO] カクテルは既に非表示です（UUID）: {cocktail_uuid}")
+                logger.info("カクテルは既に非表示です（UUID）: %s", cocktail_uuid)
                 return True
             
             # 非表示処理
             success = dbmodule.hide_cocktail_by_uuid(cocktail_uuid, reason)
             
             if success:
-                print(f"[DEBUG] カクテル非表示完了（UUID）: {cocktail_uuid}")
+                logger.debug("カクテル非表示完了（UUID）: %s", cocktail_uuid)
                 return True
             else:
-                print(f"[ERROR] カクテル非表示失敗（UUID）: {cocktail_uuid}")
+                logger.error("カクテル非表示失敗（UUID）: %s", cocktail_uuid)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] カクテル非表示エラー（UUID）: {e}")
+            logger.error("カクテル非表示エラー（UUID）: %s", e)
             return False
     
     @staticmethod
     def hide_cocktail(order_id: str, reason: str) -> bool:
         """カクテルを非表示にする（注文番号使用）"""
         try:
-            print(f"[DEBUG] カクテル非表示処理開始: {order_id}")
+            logger.debug("カクテル非表示処理開始: %s", order_id)
             
-            # 注文番号からカクテル情報を取得
-            cocktail = dbmodule.get_cocktail_by_order_id(order_id)
+            # 注文番号からカクテル情報を取得（表示状態で処理を判断するためキャッシュを使わない）
+            cocktail = dbmodule.get_cocktail_by_order_id(order_id, use_cache=False)
             if not cocktail:
-                print(f"[ERROR] 指定された注文番号のカクテルが見つかりません: {order_id}")
+                logger.error("指定された注文番号のカクテルが見つかりません: %s", order_id)
                 return False
             
             cocktail_id = cocktail.get('id')
             if not cocktail_id:
-                print(f"[ERROR] カクテルのIDが取得できません: {order_id}")
+                logger.error("カクテルのIDが取得できません: %s", order_id)
                 return False
             
             # 既に非表示の場合はスキップ
             if not cocktail.get('is_visible', True):
-                print(f"[INFO] カクテルは既に非表示です: {order_id}")
+                logger.info("カクテルは既に非表示です: %s", order_id)
                 return True
             
             # 非表示処理
             success = dbmodule.hide_cocktail(cocktail_id, reason)
             
             if success:
-                print(f"[DEBUG] カクテル非表示完了: {order_id}")
+                logger.debug("カクテル非表示完了: %s", order_id)
                 return True
             else:
-                print(f"[ERROR] カクテル非表示失敗: {order_id}")
+                logger.error("カクテル非表示失敗: %s", order_id)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] カクテル非表示エラー: {e}")
+            logger.error("カクテル非表示エラー: %s", e)
             return False
     
     @staticmethod
     def show_cocktail(order_id: str) -> bool:
         """カクテルを再表示する（注文番号使用）"""
         try:
-            print(f"[DEBUG] カクテル再表示処理開始: {order_id}")
+            logger.debug("カクテル再表示処理開始: %s", order_id)
             
-            # 注文番号からカクテル情報を取得
-            cocktail = dbmodule.get_cocktail_by_order_id(order_id)
+            # 注文番号からカクテル情報を取得（表示状態で処理を判断するためキャッシュを使わない）
+            cocktail = dbmodule.get_cocktail_by_order_id(order_id, use_cache=False)
             if not cocktail:
-                print(f"[ERROR] 指定された注文番号のカクテルが見つかりません: {order_id}")
+                logger.error("指定された注文番号のカクテルが見つかりません: %s", order_id)
                 return False
             
             cocktail_id = cocktail.get('id')
             if not cocktail_id:
-                print(f"[ERROR] カクテルのIDが取得できません: {order_id}")
+                logger.error("カクテルのIDが取得できません: %s", order_id)
                 return False
             
             # 既に表示中の場合はスキップ
             if cocktail.get('is_visible', True):
-                print(f"[INFO] カクテルは既に表示中です: {order_id}")
+                logger.info("カクテルは既に表示中です: %s", order_id)
                 return True
             
             # 再表示処理
             success = dbmodule.show_cocktail(cocktail_id)
             
             if success:
-                print(f"[DEBUG] カクテル再表示完了: {order_id}")
+                logger.debug("カクテル再表示完了: %s", order_id)
                 return True
             else:
-                print(f"[ERROR] カクテル再表示失敗: {order_id}")
+                logger.error("カクテル再表示失敗: %s", order_id)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] カクテル再表示エラー: {e}")
+            logger.error("カクテル再表示エラー: %s", e)
             return False
     
     @staticmethod
@@ -181,39 +160,53 @@ class ViolationService:
     ) -> List[Dict[str, Any]]:
         """違反報告一覧取得"""
         try:
-            print(f"[DEBUG] 違反報告取得開始 - cocktail_id: {cocktail_id}, status: {status_filter}, show_all: {show_all}")
+            logger.debug("違反報告取得開始 - cocktail_id: %s, status: %s, show_all: %s", cocktail_id, status_filter, show_all)
             
             reports = dbmodule.get_violation_reports(cocktail_id, status_filter, show_all)
-            print(f"[DEBUG] 違反報告取得完了: {len(reports)}件")
+            logger.debug("違反報告取得完了: %s件", len(reports))
             return reports
             
         except Exception as e:
-            print(f"[ERROR] 違反報告取得エラー: {e}")
+            logger.error("違反報告取得エラー: %s", e)
             return []
     
+    @staticmethod
+    def list_violation_reports(
+        cocktail_id: Optional[str] = None,
+        status_filter: Optional[str] = None,
+        show_all: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """違反報告一覧をページ単位で取得（管理画面用、カーソルが不正な場合はValueError）"""
+        page_size = min(limit or settings.VIOLATION_REPORTS_PAGE_SIZE, settings.VIOLATION_REPORTS_MAX_PAGE_SIZE)
+        page = dbmodule.get_violation_reports_page(cocktail_id, status_filter, show_all, page_size, cursor)
+        logger.debug("違反報告ページ取得完了: %s件, 続きあり: %s", len(page['reports']), bool(page['next_cursor']))
+        return page
+    
     @staticmethod
     def update_violation_report_status(report_id: int, status: str) -> bool:
         """違反報告ステータス更新"""
         try:
-            print(f"[DEBUG] 違反報告ステータス更新開始 - report_id: {report_id}, status: {status}")
+            logger.debug("違反報告ステータス更新開始 - report_id: %s, status: %s", report_id, status)
             
             # 有効なステータスかチェック
             valid_statuses = ['pending', 'reviewing', 'resolved', 'rejected']
             if status not in valid_statuses:
-                print(f"[ERROR] 無効なステータス: {status}")
+                logger.error("無効なステータス: %s", status)
                 return False
             
             # 報告存在確認
             report = dbmodule.get_violation_report_by_id(report_id)
             if not report:
-                print(f"[ERROR] 指定された違反報告が見つかりません: {report_id}")
+                logger.error("指定された違反報告が見つかりません: %s", report_id)
                 return False
             
             # ステータス更新
             success = dbmodule.update_violation_report_status(report_id, status)
             
             if success:
-                print(f"[DEBUG] 違反報告ステータス更新完了: {report_id}")
+                logger.debug("違反報告ステータス更新完了: %s", report_id)
                 
                 # ステータスに応じた追加処理
                 cocktail_id = report.get('cocktail_id')
@@ -231,47 +224,23 @@ class ViolationService:
                 
                 return True
             else:
-                print(f"[ERROR] 違反報告ステータス更新失敗: {report_id}")
+                logger.error("違反報告ステータス更新失敗: %s", report_id)
                 return False
                 
         except Exception as e:
-            print(f"[ERROR] 違反報告ステータス更新エラー: {e}")
+            logger.error("違反報告ステータス更新エラー: %s", e)
             return False
     
     @staticmethod
     def get_violation_statistics() -> Dict[str, Any]:
         """違反報告統計情報取得"""
         try:
-            print("[DEBUG] 違反報告統計取得開始")
-            
-            # 全違反報告を取得
-            all_reports = dbmodule.get_violation_reports(show_all=True)
+            logger.debug("違反報告統計取得開始")
             
-            # ステータス別集計
-            status_counts = {
-                'pending': 0,
-                'reviewing': 0,
-                'resolved': 0,
-                'rejected': 0
-            }
-            
-            category_counts = {}
-            cocktail_violation_counts = {}
-            
-            for report in all_reports:
-                # ステータス集計
-                status = report.get('status', 'pending')
-                if status in status_counts:
-                    status_counts[status] += 1
-                
-                # カテゴリ集計
-                category = report.get('report_category', 'other')
-                category_counts[category] = category_counts.get(category, 0) + 1
-                
-                # カクテル別違反数集計
-                cocktail_id = report.get('cocktail_id')
-                if cocktail_id:
-                    cocktail_violation_counts[cocktail_id] = cocktail_violation_counts.get(cocktail_id, 0) + 1
+            # ステータス別・カテゴリ別件数とカクテル別の報告数上位（集計済みの値を読むだけ）
+            status_counts = dbmodule.get_violation_status_counts()
+            category_counts = dbmodule.get_violation_category_counts()
+            most_reported_cocktails = dbmodule.get_most_reported_cocktails(10)
             
             # 非表示カクテル数
             try:
@@ -280,20 +249,17 @@ class ViolationService:
                 hidden_cocktails_count = 0
             
             stats = {
-                'total_reports': len(all_reports),
+                'total_reports': sum(status_counts.values()),
                 'status_breakdown': status_counts,
                 'category_breakdown': category_counts,
                 'hidden_cocktails_count': hidden_cocktails_count,
-                'most_reported_cocktails': [
-                    {'cocktail_id': k, 'report_count': v}
-                    for k, v in sorted(cocktail_violation_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-                ],
+                'most_reported_cocktails': most_reported_cocktails,
                 'generated_at': datetime.now().isoformat()
             }
             
-            print("[DEBUG] 違反報告統計取得完了")
+            logger.debug("違反報告統計取得完了")
             return stats
             
         except Exception as e:
-            print(f"[ERROR] 違反報告統計取得エラー: {e}")
+            logger.error("違反報告統計取得エラー: %s", e)
             return {}
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+インメモリキャッシュユーティリティ
+"""
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """有効期限付きのスレッドセーフなLRUキャッシュ（ワーカープロセス単位）
+
+    copy_values=False は不変オブジェクトを格納する場合に使用し、取得時のコピーを省略する
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+        copy_values: bool = True,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.copy_values = copy_values
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """キャッシュから値を取得（期限切れ・未登録はNone）。呼び出し側で変更しても影響しないようコピーを返す"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value) if self.copy_values else value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """値を登録（Noneは登録しない）"""
+        if value is None or self.ttl <= 0:
+            return
+        stored = copy.deepcopy(value) if self.copy_values else value
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, stored)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """キャッシュになければloaderで取得して登録（リードスルー）"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def update_each(self, updater: Callable[[Hashable, Any], None]) -> None:
+        """有効な全エントリの値をその場で更新（値を直接変更するため copy_values=True のキャッシュで使用）"""
+        with self._lock:
+            now = self._clock()
+            for key, (expires_at, value) in list(self._entries.items()):
+                if expires_at <= now:
+                    del self._entries[key]
+                else:
+                    updater(key, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """指定キーを削除"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            self._entries.clear()
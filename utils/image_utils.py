@@ -1,6 +1,7 @@
 """
 画像処理ユーティリティ
 """
+import logging
 import base64
 import io
 from pathlib import Path
@@ -10,6 +11,9 @@ from typing import Optional
 
 from db.supabase_client import supabase_client
 from config.settings import settings
+from utils.metrics import observe_stage, record_payload
+
+logger = logging.getLogger(__name__)
 
 
 def encode_image_to_base64(image_path: Path) -> str:
@@ -23,6 +27,7 @@ def encode_image_to_base64(image_path: Path) -> str:
         raise HTTPException(status_code=500, detail=f"画像のエンコードに失敗しました: {e}")
 
 
+@observe_stage("image.crop_and_resize")
 def crop_and_resize_base64_image(
     base64_str: str, 
     target_width: int = None, 
@@ -68,10 +73,11 @@ def crop_and_resize_base64_image(
         raise Exception(f"画像加工エラー: {str(e)}")
 
 
+@observe_stage("storage.upload")
 def upload_image_to_storage(image_base64: str, cocktail_id: str) -> str:
     """Supabase Storageに画像をアップロードし、URLを返す（UUID使用）"""
     try:
-        print(f"[DEBUG] upload_image_to_storage開始 - cocktail_id: {cocktail_id}")
+        logger.debug("upload_image_to_storage開始 - cocktail_id: %s", cocktail_id)
         
         # base64ヘッダーを除去
         if "," in image_base64:
@@ -79,40 +85,41 @@ def upload_image_to_storage(image_base64: str, cocktail_id: str) -> str:
         
         # base64をバイナリに変換
         image_bytes = base64.b64decode(image_base64)
-        print(f"[DEBUG] 画像バイナリサイズ: {len(image_bytes)} bytes")
+        logger.debug("画像バイナリサイズ: %s bytes", len(image_bytes))
+        record_payload("storage.upload", "request", len(image_bytes))
         
         # ファイル名をUUIDベースで生成
         filename = f"cocktails/{cocktail_id}.png"
-        print(f"[DEBUG] アップロードファイル名: {filename}")
+        logger.debug("アップロードファイル名: %s", filename)
         
         # Supabase Storageにアップロード
-        print(f"[DEBUG] Supabase Storageアップロード実行中...")
+        logger.debug("Supabase Storageアップロード実行中...")
         response = supabase_client.client.storage.from_("cocktail-images").upload(
             filename, image_bytes, {"content-type": "image/png"}
         )
         
-        print(f"[DEBUG] Supabase Storageレスポンス: {response}")
+        logger.debug("Supabase Storageレスポンス: %s", response)
         
         # 新しいSupabase SDKのレスポンス構造に対応
         # アップロードが成功した場合、pathまたはfull_pathが存在する
         if hasattr(response, 'path') or hasattr(response, 'full_path'):
-            print(f"[DEBUG] アップロード成功: path={getattr(response, 'path', 'N/A')}")
+            logger.debug("アップロード成功: path=%s", getattr(response, 'path', 'N/A'))
         elif hasattr(response, 'error') and response.error:
-            print(f"[ERROR] Storage upload error: {response.error}")
+            logger.error("Storage upload error: %s", response.error)
             raise Exception(f"Storage upload error: {response.error}")
         else:
             # レスポンスの属性を確認
             response_attrs = [attr for attr in dir(response) if not attr.startswith('_')]
-            print(f"[DEBUG] レスポンス属性: {response_attrs}")
+            logger.debug("レスポンス属性: %s", response_attrs)
             
             # エラーがなければ成功とみなす（レスポンス構造が不明な場合の安全策）
-            print(f"[DEBUG] レスポンス構造確認: {type(response)}")
+            logger.debug("レスポンス構造確認: %s", type(response))
         
         # 公開URLを取得
-        print(f"[DEBUG] 公開URL取得中...")
+        logger.debug("公開URL取得中...")
         url_response = supabase_client.client.storage.from_("cocktail-images").get_public_url(filename)
         
-        print(f"[DEBUG] 公開URL: {url_response}")
+        logger.debug("公開URL: %s", url_response)
         
         # URLレスポンスの構造を確認
         if hasattr(url_response, 'public_url'):
@@ -126,22 +133,19 @@ def upload_image_to_storage(image_base64: str, cocktail_id: str) -> str:
             if isinstance(url_response, dict):
                 public_url = url_response.get('public_url') or url_response.get('publicURL')
             else:
-                print(f"[WARNING] 予期しないURL形式: {type(url_response)}, {url_response}")
+                logger.warning("予期しないURL形式: %s, %s", type(url_response), url_response)
                 public_url = str(url_response)
         
         # URLの末尾に余分な?がある場合は削除
         if public_url and public_url.endswith('?'):
             public_url = public_url.rstrip('?')
-            print(f"[DEBUG] 末尾の?を削除: {public_url}")
+            logger.debug("末尾の?を削除: %s", public_url)
         
-        print(f"[DEBUG] 最終公開URL: {public_url}")
+        logger.debug("最終公開URL: %s", public_url)
         return public_url
         
     except Exception as e:
-        print(f"[ERROR] upload_image_to_storage失敗: {str(e)}")
-        # より詳細なエラー情報を表示
-        import traceback
-        traceback.print_exc()
+        logger.exception("upload_image_to_storage失敗: %s", e)
         raise Exception(f"画像アップロードエラー: {str(e)}")
 
 def upload_image_by_order_id(image_base64: str, order_id: str) -> str:
@@ -157,7 +161,7 @@ def upload_image_by_order_id(image_base64: str, order_id: str) -> str:
         # UUIDベースでアップロード
         return upload_image_to_storage(image_base64, cocktail_id)
     except Exception as e:
-        print(f"[ERROR] upload_image_by_order_id失敗: {str(e)}")
+        logger.error("upload_image_by_order_id失敗: %s", str(e))
         raise
 
 def get_image_url_by_uuid(cocktail_id: str) -> Optional[str]:
@@ -177,7 +181,7 @@ def get_image_url_by_uuid(cocktail_id: str) -> Optional[str]:
         else:
             return str(url_response)
     except Exception as e:
-        print(f"[ERROR] UUID画像URL取得エラー: {e}")
+        logger.error("UUID画像URL取得エラー: %s", e)
         return None
 
 def get_image_url_by_order_id(order_id: str) -> Optional[str]:
@@ -193,7 +197,7 @@ def get_image_url_by_order_id(order_id: str) -> Optional[str]:
         # UUIDベースで画像URL取得
         return get_image_url_by_uuid(cocktail_id)
     except Exception as e:
-        print(f"[ERROR] order_id画像URL取得エラー: {e}")
+        logger.error("order_id画像URL取得エラー: %s", e)
         return None
 
 
@@ -208,14 +212,14 @@ def download_image_from_storage(filename_or_url: str) -> Optional[str]:
             if match:
                 filename = match.group(0)
             else:
-                print(f"[WARNING] URLから画像名を抽出できません: {filename_or_url}")
+                logger.warning("URLから画像名を抽出できません: %s", filename_or_url)
                 return None
         elif filename_or_url.startswith('cocktails/'):
             filename = filename_or_url
         else:
             filename = f"cocktails/{filename_or_url}"
             
-        print(f"[DEBUG] 画像ダウンロード開始 - filename: {filename}")
+        logger.debug("画像ダウンロード開始 - filename: %s", filename)
         
         # Supabase Storageから画像をダウンロード
         response = supabase_client.client.storage.from_("cocktail-images").download(filename)
@@ -225,13 +229,13 @@ def download_image_from_storage(filename_or_url: str) -> Optional[str]:
             image_base64 = base64.b64encode(response).decode('utf-8')
             # data:image/png;base64, プレフィックスを追加
             full_base64 = f"data:image/png;base64,{image_base64}"
-            print(f"[DEBUG] 画像ダウンロード成功 - サイズ: {len(full_base64)} 文字")
+            logger.debug("画像ダウンロード成功 - サイズ: %s 文字", len(full_base64))
             return full_base64
         else:
-            print(f"[WARNING] 画像ダウンロード失敗: レスポンスが空")
+            logger.warning("画像ダウンロード失敗: レスポンスが空")
             return None
             
     except Exception as e:
-        print(f"[WARNING] 画像ダウンロードエラー: {str(e)}")
+        logger.warning("画像ダウンロードエラー: %s", str(e))
         # エラーが発生した場合はNoneを返す（既存のbase64データを使用するため）
         return None
@@ -0,0 +1,246 @@
+"""
+LLMプロバイダーの切り替え（Azureメイン → Azure Mini → 公開OpenAI）
+
+プロバイダーごとにサーキットブレーカーを持ち、連続して失敗したプロバイダーは一定時間呼び出さずに
+次のプロバイダーへ即座に切り替える（劣化したデプロイでタイムアウトまで待ち続けないようにする）。
+遮断から LLM_CIRCUIT_RECOVERY_SECONDS 経過後は1件だけ試行し、成功すれば復帰する。
+ブレーカーの状態はワーカープロセス単位（メトリクスの ai_bartender_circuit_open で全ワーカー分を確認できる）
+1回の送信に渡されたタイムアウトは切り替え後のプロバイダーも含めた全体の期限とし、各プロバイダーには残り時間だけを使わせる
+"""
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import requests
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import settings
+from utils.metrics import record_failure, set_circuit_open
+from utils.rate_limiter import RateLimitTimeout, SharedRateLimiter, llm_rate_limiter, retry_after_seconds
+from utils.retry_policy import RETRYABLE_EXCEPTIONS, RETRYABLE_STATUSES, llm_retry_policy
+from utils.tracing import http_client_span
+
+logger = logging.getLogger(__name__)
+
+# プロバイダー側の障害・設定不備とみなすステータス（400などリクエスト起因のものは切り替えても同じ結果になる）
+PROVIDER_FAILURE_STATUSES = RETRYABLE_STATUSES | {401, 403, 404}
+# 残り時間がこれ未満の場合は次のプロバイダーを試さない（接続すら間に合わないため）
+MIN_PROVIDER_TIMEOUT = 1.0
+
+
+class CircuitOpenError(Exception):
+    """利用可能なLLMプロバイダーがない（全て遮断中）"""
+
+
+class CircuitBreaker:
+    """連続失敗回数で遮断するサーキットブレーカー（スレッドセーフ）
+
+    closed: 通常 / open: 遮断中（呼び出さない）/ half_open: 復帰確認の1件のみ許可
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.last_failure: Optional[str] = None
+        self.latency_ewma: Optional[float] = None
+        self._opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """呼び出してよいか（half_open では同時に1件だけ許可）"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open':
+                if now - self._opened_at < self.recovery_seconds:
+                    return False
+                self.state = 'half_open'
+                logger.info("LLMプロバイダー %s: 復帰確認のため1件試行します", self.name)
+            # 試行中のリクエストが結果を記録しないまま終わった場合に備え、一定時間で次の試行を許可
+            if self._probe_started_at is not None and now - self._probe_started_at < self.recovery_seconds:
+                return False
+            self._probe_started_at = now
+            return True
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.total_successes += 1
+            self.consecutive_failures = 0
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self._probe_started_at = None
+            if self.state != 'closed':
+                logger.info("LLMプロバイダー %s: 復帰しました", self.name)
+                self.state = 'closed'
+                set_circuit_open(self.name, False)
+
+    def record_failure(self, reason: str) -> None:
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = reason
+            self._probe_started_at = None
+            if self.state == 'half_open' or (self.state == 'closed' and self.consecutive_failures >= self.failure_threshold):
+                logger.warning(
+                    "LLMプロバイダー %s: 連続%s回失敗（%s）のため%g秒間遮断します",
+                    self.name, self.consecutive_failures, reason, self.recovery_seconds,
+                )
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                set_circuit_open(self.name, True)
+
+    def release_probe(self) -> None:
+        """結果を記録しなかった呼び出し（レート制限待ちの期限切れ・キャンセル）の後始末"""
+        with self._lock:
+            self._probe_started_at = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'total_successes': self.total_successes,
+                'total_failures': self.total_failures,
+                'last_failure': self.last_failure,
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            }
+            if self.state == 'open':
+                snapshot['retry_in_sec'] = round(max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at)), 1)
+            return snapshot
+
+
+@dataclass
+class LLMProvider:
+    """チャット補完APIの呼び出し先（extra_body は公開OpenAIの model など、プロバイダー固有の項目）"""
+    name: str
+    url: str
+    headers: Dict[str, str]
+    breaker: CircuitBreaker
+    limiter: SharedRateLimiter
+    extra_body: Dict[str, Any] = field(default_factory=dict)
+
+    async def post(self, body: Dict[str, Any], timeout: float) -> requests.Response:
+        """timeout は送信枠の待ち時間も含めた上限（秒）"""
+        deadline = time.monotonic() + timeout
+        # 全ワーカーで送信レートを制御し、待機中・通信中もイベントループを止めない
+        async with self.limiter.limit(timeout=min(self.limiter.queue_timeout, timeout)):
+            with http_client_span("llm", "POST", self.url, llm_provider=self.name) as span:
+                response = await run_in_threadpool(
+                    requests.post,
+                    self.url,
+                    headers=self.headers,
+                    json={**body, **self.extra_body},
+                    timeout=max(0.1, deadline - time.monotonic()),
+                )
+                span.set_http_status(response.status_code)
+        if response.status_code == 429:
+            await self.limiter.penalize(retry_after_seconds(response.headers))
+        return response
+
+
+class LLMProviderChain:
+    """優先順にプロバイダーを試し、失敗・遮断中のものは飛ばして次へ切り替える"""
+
+    def __init__(self, providers: List[LLMProvider]):
+        self.providers = providers
+
+    @classmethod
+    def from_settings(cls) -> 'LLMProviderChain':
+        """設定済みのプロバイダーだけで構成（メイン → Mini → 公開OpenAI）"""
+        def provider(name: str, url: str, headers: Dict[str, str], extra_body: Optional[Dict[str, Any]] = None) -> LLMProvider:
+            breaker = CircuitBreaker(name, settings.LLM_CIRCUIT_FAILURE_THRESHOLD, settings.LLM_CIRCUIT_RECOVERY_SECONDS)
+            return LLMProvider(name, url, headers, breaker, llm_rate_limiter(name), extra_body or {})
+
+        providers = []
+        api_key = settings.get_llm_api_key()
+        main_url = settings.get_llm_url()
+        if api_key and main_url:
+            providers.append(provider('azure_main', main_url, {"api-key": api_key, "Content-Type": "application/json"}))
+        if settings.AZURE_OPENAI_API_KEY_LLM and settings.AZURE_OPENAI_ENDPOINT_LLM_MINI:
+            providers.append(provider(
+                'azure_mini', settings.AZURE_OPENAI_ENDPOINT_LLM_MINI,
+                {"api-key": settings.AZURE_OPENAI_API_KEY_LLM, "Content-Type": "application/json"},
+            ))
+        if settings.OPENAI_API_KEY:
+            providers.append(provider(
+                'openai', settings.OPENAI_LLM_URL,
+                {"Authorization": f"Bearer {settings.OPENAI_API_KEY}", "Content-Type": "application/json"},
+                {"model": settings.OPENAI_LLM_MODEL},
+            ))
+        return cls(providers)
+
+    @staticmethod
+    def _failure_priority(outcome: Any) -> int:
+        """全プロバイダーが失敗した場合に返す結果の優先度（再試行で回復し得るものを優先）"""
+        if isinstance(outcome, RateLimitTimeout):
+            return 1
+        return 2 if llm_retry_policy.is_retryable(outcome) else 0
+
+    async def send(self, body: Dict[str, Any], timeout: float) -> requests.Response:
+        """最初に成功したプロバイダーの応答を返す
+
+        timeout は切り替えも含めた全体の上限で、各プロバイダーには残り時間を渡す。
+        全て失敗した場合は最も再試行に適した失敗（503・タイムアウトなど > 送信枠の待ち切れ > 401など）を
+        返す／送出する（同じ優先度なら先に試したプロバイダーのもの）
+        """
+        deadline = time.monotonic() + timeout
+        failure: Any = None
+
+        def keep(outcome: Any) -> None:
+            nonlocal failure
+            if failure is None or self._failure_priority(outcome) > self._failure_priority(failure):
+                failure = outcome
+
+        for provider in self.providers:
+            remaining = deadline - time.monotonic()
+            if failure is not None and remaining < MIN_PROVIDER_TIMEOUT:
+                logger.warning("LLMプロバイダー %s: 残り時間（%.1f秒）がないため試行しません", provider.name, remaining)
+                break
+            if not provider.breaker.allow():
+                record_failure(f"llm.{provider.name}", "circuit_open")
+                continue
+            recorded = False
+            started_at = time.monotonic()
+            try:
+                response = await provider.post(body, max(0.1, remaining))
+                if response.status_code in PROVIDER_FAILURE_STATUSES:
+                    provider.breaker.record_failure(f"HTTP {response.status_code}")
+                    recorded = True
+                    keep(response)
+                    logger.warning("LLMプロバイダー %s: HTTP %sのため次のプロバイダーを試します", provider.name, response.status_code)
+                    continue
+                provider.breaker.record_success(time.monotonic() - started_at)
+                recorded = True
+                return response
+            except RETRYABLE_EXCEPTIONS as e:
+                provider.breaker.record_failure(type(e).__name__)
+                recorded = True
+                keep(e)
+                logger.warning("LLMプロバイダー %s: %sのため次のプロバイダーを試します", provider.name, type(e).__name__)
+            except RateLimitTimeout as e:
+                # 送信枠の待ちはプロバイダーの障害ではないため、ブレーカーには数えずに次へ
+                keep(e)
+            finally:
+                if not recorded:
+                    provider.breaker.release_probe()
+
+        if failure is None:
+            raise CircuitOpenError("全てのLLMプロバイダーが遮断中です")
+        if isinstance(failure, BaseException):
+            raise failure
+        return failure
+
+    def health(self) -> List[Dict[str, Any]]:
+        """プロバイダーごとの状態（このワーカーの観測値）"""
+        return [{'name': provider.name, **provider.breaker.snapshot()} for provider in self.providers]
+
+
+llm_chain = LLMProviderChain.from_settings()
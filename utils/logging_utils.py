@@ -0,0 +1,162 @@
+"""
+ロギングユーティリティ（キュー経由の非同期出力・リクエストID・秘密情報のマスク）
+"""
+import os
+import re
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+import contextvars
+from typing import Iterable, List, Optional
+
+# リクエスト単位の相関ID（ミドルウェアで設定し、ログに付与する）
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar('request_id', default='-')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(process)d] [%(request_id)s] %(name)s: %(message)s'
+
+# 値が分からなくてもマスクする秘密情報のパターン
+_SECRET_PATTERNS = [
+    re.compile(r'(?i)(bearer\s+)[A-Za-z0-9._\-]+'),
+    re.compile(r'(?i)((?:api[-_]?key|authorization|apikey|password|secret|token)["\']?\s*[:=]\s*["\']?)[^\s"\',}]+'),
+    re.compile(r'\bsk-[A-Za-z0-9_\-]{8,}'),
+    re.compile(r'\beyJ[A-Za-z0-9_\-]{10,}\.[A-Za-z0-9_\-]+\.[A-Za-z0-9_\-]+'),
+]
+_MASK = '***'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_output_handler: Optional[logging.Handler] = None
+
+
+def get_request_id() -> str:
+    """現在のリクエストID（リクエスト外では'-'）"""
+    return request_id_var.get()
+
+
+def set_request_id(request_id: str) -> contextvars.Token:
+    """リクエストIDを設定（戻り値のトークンで reset_request_id する）"""
+    return request_id_var.set(request_id)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    """リクエストIDを元に戻す"""
+    request_id_var.reset(token)
+
+
+class RequestIdFilter(logging.Filter):
+    """ログレコードにリクエストIDを付与（呼び出し元スレッドで実行する）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SecretRedactor:
+    """ログ文字列から秘密情報（APIキー・トークン）をマスク"""
+
+    def __init__(self, secrets: Iterable[Optional[str]] = ()):
+        # 短すぎる値は誤マスクを避けるため対象外
+        self._secrets: List[str] = sorted({s for s in secrets if s and len(s) >= 8}, key=len, reverse=True)
+
+    def redact(self, text: str) -> str:
+        for secret in self._secrets:
+            if secret in text:
+                text = text.replace(secret, _MASK)
+        for pattern in _SECRET_PATTERNS:
+            if pattern.groups:
+                text = pattern.sub(lambda m: m.group(1) + _MASK, text)
+            else:
+                text = pattern.sub(_MASK, text)
+        return text
+
+
+class RedactingFormatter(logging.Formatter):
+    """整形後の文字列から秘密情報をマスクするフォーマッタ（出力スレッドで実行する）"""
+
+    def __init__(self, redactor: SecretRedactor, fmt: str = TEXT_FORMAT):
+        super().__init__(fmt)
+        self._redactor = redactor
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        return self._redactor.redact(super().format(record))
+
+
+class JsonFormatter(RedactingFormatter):
+    """1行1JSONの構造化ログ"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.process,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return self._redactor.redact(json.dumps(payload, ensure_ascii=False))
+
+
+def _configured_secrets() -> List[Optional[str]]:
+    """マスク対象の秘密情報（環境変数の値）"""
+    names = [
+        'AZURE_OPENAI_API_KEY_LLM', 'OPENAI_API_KEY', 'GPT_API_KEY',
+        'SUPABASE_SERVICE_ROLE_KEY', 'SUPABASE_ANON_KEY',
+    ]
+    return [os.environ.get(name) for name in names]
+
+
+def _start_listener() -> None:
+    """出力スレッドを開始（fork後の子プロセスでは新しいキューで作り直す）"""
+    global _listener
+    _queue_handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, _output_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    """出力スレッドを停止（キューに残ったログを出力してから終了）"""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+        _listener = None
+
+
+def setup_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> None:
+    """ルートロガーをキュー経由の非同期出力に設定（複数回呼ばれても1回だけ設定）
+
+    ログ呼び出し側はレベル判定とキューへの投入のみを行い、整形・マスク・書き込みは出力スレッドで行う
+    """
+    global _queue_handler, _output_handler
+    if _queue_handler is not None:
+        return
+
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    log_format = (log_format or os.environ.get('LOG_FORMAT', 'text')).lower()
+
+    redactor = SecretRedactor(_configured_secrets())
+    _output_handler = logging.StreamHandler(sys.stdout)
+    _output_handler.setFormatter(JsonFormatter(redactor) if log_format == 'json' else RedactingFormatter(redactor))
+
+    _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+
+    _start_listener()
+    # gunicorn(preload_app)のfork後は出力スレッドが子プロセスに引き継がれないため作り直す
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_listener)
+    atexit.register(_stop_listener)
@@ -0,0 +1,218 @@
+"""
+処理段階ごとのレイテンシ・ペイロードサイズ・リトライ・失敗のPrometheusメトリクス
+
+gunicornの複数ワーカーで集計するため、PROMETHEUS_MULTIPROC_DIR が設定されている場合は
+multiprocessモードで出力する（gunicorn.conf.py で設定）
+計測した処理段階はトレース（utils.tracing）のスパンとしても記録する
+"""
+import os
+import time
+import inspect
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from utils.tracing import current_span, start_span
+
+# LLM・画像生成は数十秒かかるため上限を広めに取る
+_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120)
+_SIZE_BUCKETS = tuple(2 ** exponent for exponent in range(8, 26, 2))  # 256B 〜 16MB
+
+STAGE_DURATION = Histogram(
+    'ai_bartender_stage_duration_seconds',
+    '処理段階ごとの所要時間',
+    ['stage', 'outcome'],
+    buckets=_DURATION_BUCKETS,
+)
+PAYLOAD_SIZE = Histogram(
+    'ai_bartender_payload_bytes',
+    '処理段階ごとの送受信データサイズ',
+    ['stage', 'direction'],
+    buckets=_SIZE_BUCKETS,
+)
+RETRIES = Counter(
+    'ai_bartender_retries_total',
+    '処理段階ごとのリトライ回数',
+    ['stage'],
+)
+FAILURES = Counter(
+    'ai_bartender_failures_total',
+    '処理段階ごとの失敗回数',
+    ['stage', 'reason'],
+)
+# ワーカーの飽和状況（multiprocessモードでは稼働中の全ワーカーの合計）
+IN_PROGRESS = Gauge(
+    'ai_bartender_requests_in_progress',
+    '処理中のHTTPリクエスト数',
+    multiprocess_mode='livesum',
+)
+# 外部APIのサーキットブレーカー（いずれかのワーカーで遮断中なら1）
+CIRCUIT_OPEN = Gauge(
+    'ai_bartender_circuit_open',
+    'サーキットブレーカーで遮断中の上流（1=遮断中）',
+    ['upstream'],
+    multiprocess_mode='livemax',
+)
+
+
+def _is_error_result(result: Any) -> bool:
+    """{"result": "error", ...} 形式の戻り値を失敗とみなす"""
+    return isinstance(result, dict) and result.get('result') == 'error'
+
+
+def _record(stage: str, started_at: float, outcome: str, reason: Optional[str] = None) -> None:
+    STAGE_DURATION.labels(stage=stage, outcome=outcome).observe(time.perf_counter() - started_at)
+    if reason:
+        FAILURES.labels(stage=stage, reason=reason).inc()
+
+
+def observe_stage(stage: str) -> Callable:
+    """関数の所要時間を計測するデコレータ（同期・非同期・ジェネレータ関数に対応）
+
+    例外、または {"result": "error"} の戻り値を失敗として数える
+    """
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(stage) as span:
+                    started_at = time.perf_counter()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        _record(stage, started_at, 'error', type(e).__name__)
+                        raise
+                    if _is_error_result(result):
+                        _record(stage, started_at, 'error', 'error_result')
+                        span.set_error(str(result.get('detail', 'error_result'))[:200])
+                    else:
+                        _record(stage, started_at, 'success')
+                    return result
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with start_span(stage):
+                    started_at = time.perf_counter()
+                    try:
+                        yield from func(*args, **kwargs)
+                    except Exception as e:
+                        _record(stage, started_at, 'error', type(e).__name__)
+                        raise
+                    _record(stage, started_at, 'success')
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(stage) as span:
+                started_at = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    _record(stage, started_at, 'error', type(e).__name__)
+                    raise
+                if _is_error_result(result):
+                    _record(stage, started_at, 'error', 'error_result')
+                    span.set_error(str(result.get('detail', 'error_result'))[:200])
+                else:
+                    _record(stage, started_at, 'success')
+                return result
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """with ブロックの所要時間を計測（関数の一部だけを計測する場合に使用）"""
+    with start_span(stage):
+        started_at = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            _record(stage, started_at, 'error', type(e).__name__)
+            raise
+        _record(stage, started_at, 'success')
+
+
+def io_method(func: Callable) -> Callable:
+    """instrument_methods の計測対象とするメソッドに付ける（外部I/Oを行うメソッドのみ）"""
+    func.__instrument_io__ = True
+    return func
+
+
+def instrument_methods(prefix: str) -> Callable:
+    """@io_method を付けたメソッドに observe_stage を適用するクラスデコレータ
+
+    純粋な補助関数まで計測するとメトリクスとスパンが増えるだけのため、対象は明示したものに限る
+    """
+    def decorator(cls: type) -> type:
+        for name, attribute in list(vars(cls).items()):
+            stage = f"{prefix}.{name}"
+            if isinstance(attribute, staticmethod):
+                if getattr(attribute.__func__, '__instrument_io__', False):
+                    setattr(cls, name, staticmethod(observe_stage(stage)(attribute.__func__)))
+            elif isinstance(attribute, classmethod):
+                if getattr(attribute.__func__, '__instrument_io__', False):
+                    setattr(cls, name, classmethod(observe_stage(stage)(attribute.__func__)))
+            elif inspect.isfunction(attribute) and getattr(attribute, '__instrument_io__', False):
+                setattr(cls, name, observe_stage(stage)(attribute))
+        return cls
+    return decorator
+
+
+@contextmanager
+def track_in_progress() -> Iterator[None]:
+    """with ブロックの間、処理中のリクエストとして数える"""
+    IN_PROGRESS.inc()
+    try:
+        yield
+    finally:
+        IN_PROGRESS.dec()
+
+
+def record_payload(stage: str, direction: str, size: int) -> None:
+    """送受信データサイズを記録（direction: 'request' または 'response'）"""
+    PAYLOAD_SIZE.labels(stage=stage, direction=direction).observe(size)
+
+
+def record_retry(stage: str) -> None:
+    """リトライを1回記録（現在のスパンにもリトライ回数を付与）"""
+    RETRIES.labels(stage=stage).inc()
+    current_span().increment_attribute(f"retry.{stage}")
+
+
+def record_failure(stage: str, reason: str) -> None:
+    """デコレータで捕捉できない失敗（継続する処理内の失敗など）を記録"""
+    FAILURES.labels(stage=stage, reason=reason).inc()
+
+
+def set_circuit_open(upstream: str, is_open: bool) -> None:
+    """サーキットブレーカーの状態を記録"""
+    CIRCUIT_OPEN.labels(upstream=upstream).set(1 if is_open else 0)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """/metrics 用の出力（multiprocessモードでは全ワーカー分を集計）"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """終了したワーカーのメトリクスファイルを片付ける（gunicornの child_exit フックから呼ぶ）"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
@@ -1,12 +1,15 @@
 """
 OpenAI APIを直接呼び出すユーティリティ
 """
+import logging
 import os
 from typing import Dict, Optional, Any
 from config.settings import settings
 import requests
 import json
 
+logger = logging.getLogger(__name__)
+
 
 def generate_chat_completion_direct(prompt: str, temperature: float = 0.7) -> Dict[str, Any]:
     """同期的にChatGPT APIを呼び出す（Azure OpenAI Mini使用）"""
@@ -35,7 +38,7 @@ def generate_chat_completion_direct(prompt: str, temperature: float = 0.7) -> Di
             "max_tokens": 500
         }
         
-        print(f"[DEBUG] Azure OpenAI Mini API呼び出し: endpoint={endpoint_url[:50]}...")
+        logger.debug("Azure OpenAI Mini API呼び出し: endpoint=%s...", endpoint_url[:50])
         
         # APIリクエスト（Azure OpenAI）
         response = requests.post(
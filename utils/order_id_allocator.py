@@ -0,0 +1,120 @@
+"""
+注文ID割り当てユーティリティ
+
+DBシーケンスからワーカー毎に番号をブロック単位で予約し、
+Feistel置換で6桁の注文ID空間（ORDER_ID_MIN〜ORDER_ID_MAX）に写像する。
+"""
+import logging
+import os
+import random
+import hashlib
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FeistelPermutation:
+    """[0, domain_size) 上の全単射（Feistel網 + サイクルウォーキング）"""
+
+    ROUNDS = 4
+
+    def __init__(self, domain_size: int, key: str):
+        if domain_size <= 0:
+            raise ValueError("domain_size は1以上である必要があります")
+        self.domain_size = domain_size
+        bits = max(2, (domain_size - 1).bit_length())
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self.key = key.encode("utf-8")
+
+    def _round(self, round_index: int, value: int) -> int:
+        digest = hashlib.blake2b(
+            value.to_bytes(8, "big"),
+            digest_size=8,
+            key=self.key[:64],
+            person=round_index.to_bytes(16, "big"),
+        ).digest()
+        return int.from_bytes(digest, "big") & self.half_mask
+
+    def _encrypt(self, value: int) -> int:
+        left = value >> self.half_bits
+        right = value & self.half_mask
+        for round_index in range(self.ROUNDS):
+            left, right = right, left ^ self._round(round_index, right)
+        return (left << self.half_bits) | right
+
+    def permute(self, value: int) -> int:
+        """value を同じ範囲内の別の値に一対一で写像する"""
+        if not 0 <= value < self.domain_size:
+            raise ValueError(f"範囲外の値です: {value}")
+        result = self._encrypt(value)
+        # 定義域の外に出た場合は戻ってくるまで暗号化を繰り返す
+        while result >= self.domain_size:
+            result = self._encrypt(result)
+        return result
+
+
+class OrderIdAllocator:
+    """シーケンス番号のブロックをワーカー毎に保持して注文IDを払い出す"""
+
+    def __init__(
+        self,
+        reserve_block: Callable[[int], List[int]],
+        block_size: int = None,
+        min_id: int = None,
+        max_id: int = None,
+        key: str = None,
+    ):
+        self._reserve_block = reserve_block
+        self.block_size = block_size or settings.ORDER_ID_BLOCK_SIZE
+        self.min_id = settings.ORDER_ID_MIN if min_id is None else min_id
+        self.max_id = settings.ORDER_ID_MAX if max_id is None else max_id
+        self._permutation = FeistelPermutation(
+            self.max_id - self.min_id + 1,
+            key or settings.ORDER_ID_PERMUTATION_KEY,
+        )
+        self._lock = threading.Lock()
+        self._block: Deque[int] = deque()
+        self._pid = os.getpid()
+
+    def sequence_to_order_id(self, sequence_value: int) -> str:
+        """シーケンス値を注文IDに変換"""
+        index = (sequence_value - 1) % self._permutation.domain_size
+        return str(self.min_id + self._permutation.permute(index))
+
+    def next_order_id(self) -> str:
+        """次の注文IDを取得（DBへの重複確認は行わない）"""
+        with self._lock:
+            # preload_app でフォークされた場合、親プロセスのブロックを引き継がない
+            if self._pid != os.getpid():
+                self._block.clear()
+                self._pid = os.getpid()
+
+            if not self._block:
+                self._block.extend(self._reserve_block(self.block_size))
+
+            if self._block:
+                return self.sequence_to_order_id(self._block.popleft())
+
+        # シーケンスが使えない場合はランダム値を返し、挿入時の一意制約リトライに任せる
+        logger.warning("注文IDシーケンスを予約できませんでした。ランダムIDを使用します")
+        return str(random.randint(self.min_id, self.max_id))
+
+
+_allocator: Optional[OrderIdAllocator] = None
+_allocator_lock = threading.Lock()
+
+
+def get_order_id_allocator() -> OrderIdAllocator:
+    """プロセス共通のアロケータを取得"""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                from db import database as dbmodule
+                _allocator = OrderIdAllocator(dbmodule.reserve_order_id_block)
+    return _allocator
@@ -0,0 +1,156 @@
+"""
+稼働中ワーカーのサンプリングプロファイラ
+
+- 一定間隔で全スレッドのスタックを採取し、flamegraph.pl / speedscope で読める
+  collapsed stack 形式（"frame;frame;frame 回数"）で出力する
+- 採取スレッドは計測中だけ動かすため、計測していないときのオーバーヘッドはない
+- 起動方法は2つ（どちらも PROFILER_ENABLED=true の場合のみ有効）
+  - 管理エンドポイント GET /debug/profile（X-Profiler-Token ヘッダーが必要）
+  - ワーカープロセスへの SIGUSR2（PROFILER_OUTPUT_DIR にファイル出力）
+    ※gunicornのマスタープロセスではSIGUSR2は再起動用のため、ワーカーのPIDへ送る
+"""
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 1プロセスで同時に実行する計測は1つだけ
+_session_lock = threading.Lock()
+# コードオブジェクト -> 表示名（採取ごとのパス整形を避ける）
+_label_cache: Dict[object, str] = {}
+
+
+def _frame_label(frame) -> str:
+    """スタックフレームの表示名（関数名とファイル:定義行）"""
+    code = frame.f_code
+    label = _label_cache.get(code)
+    if label is None:
+        label = _label_cache[code] = _code_label(code)
+    return label
+
+
+def _code_label(code) -> str:
+    filename = code.co_filename
+    try:
+        filename = os.path.relpath(filename)
+    except ValueError:
+        pass
+    if filename.startswith('..'):
+        # site-packages などプロジェクト外はパッケージ以下の部分だけ表示
+        parts = filename.replace('\\', '/').split('/site-packages/')
+        filename = parts[-1] if len(parts) > 1 else os.path.basename(filename)
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+class SamplingProfiler:
+    """全スレッドのスタックを一定間隔で採取するプロファイラ"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample_once(self, own_thread_id: int, thread_names: Dict[int, str]) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}").replace(';', ':'))
+            stack.reverse()
+            self.samples[';'.join(stack)] += 1
+        self.sample_count += 1
+
+    def _run(self) -> None:
+        own_thread_id = threading.get_ident()
+        thread_names: Dict[int, str] = {}
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            # スレッド名の取得はロックを伴うため、採取ごとではなく定期的に更新
+            if self.sample_count % 100 == 0:
+                thread_names = {t.ident: t.name for t in threading.enumerate() if t.ident is not None}
+            self._sample_once(own_thread_id, thread_names)
+            next_sample += self.interval
+            self._stop.wait(max(0.0, next_sample - time.perf_counter()))
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        """collapsed stack 形式の出力"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def profile(seconds: float, interval: float = 0.01) -> str:
+    """seconds 秒間プロファイルを採取して collapsed stack を返す（呼び出し元はその間ブロックする）
+
+    別の計測が実行中の場合は RuntimeError
+    """
+    if not _session_lock.acquire(blocking=False):
+        raise RuntimeError("このワーカーでは別のプロファイル計測が実行中です")
+    try:
+        profiler = SamplingProfiler(interval)
+        profiler.start()
+        try:
+            time.sleep(seconds)
+        finally:
+            profiler.stop()
+        logger.info("プロファイル採取完了: %s秒, %sサンプル", seconds, profiler.sample_count)
+        return profiler.collapsed()
+    finally:
+        _session_lock.release()
+
+
+def _profile_to_file() -> None:
+    """シグナル起点の計測（結果を PROFILER_OUTPUT_DIR に書き出す）"""
+    try:
+        collapsed = profile(settings.PROFILER_SIGNAL_SECONDS, settings.PROFILER_INTERVAL_MS / 1000)
+    except RuntimeError as e:
+        logger.warning("%s", e)
+        return
+    os.makedirs(settings.PROFILER_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(
+        settings.PROFILER_OUTPUT_DIR,
+        f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed",
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(collapsed)
+    logger.info("プロファイル出力: %s", path)
+
+
+def _handle_signal(signum, frame) -> None:
+    # シグナルハンドラ内では重い処理をせず、計測はスレッドで行う
+    threading.Thread(target=_profile_to_file, name='profiler-signal', daemon=True).start()
+
+
+def install_signal_handler() -> bool:
+    """SIGUSR2 でプロファイル採取を開始するハンドラを登録（メインスレッドから呼ぶ）
+
+    PROFILER_ENABLED が無効、またはSIGUSR2のないOSでは何もしない
+    """
+    if not settings.PROFILER_ENABLED or not hasattr(signal, 'SIGUSR2'):
+        return False
+    signal.signal(signal.SIGUSR2, _handle_signal)
+    logger.info("プロファイラのシグナルハンドラを登録しました（kill -USR2 %s）", os.getpid())
+    return True
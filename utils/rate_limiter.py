@@ -0,0 +1,224 @@
+"""
+外部API（画像生成・LLM）のレート制限と同時実行数制御
+
+OpenAIのレート制限はアカウント単位のため、gunicornの全ワーカーで状態を共有する。
+状態は RATE_LIMIT_STATE_DIR 配下のファイルに保存し、fcntl のファイルロックで排他する
+（同一ホスト内のワーカー間で共有。複数コンテナ間では共有しないため、台数で割った値を設定する）
+
+- レート: GCRA（仮想スケジューリング方式のトークンバケット）。到着順に送信時刻を割り当てるため、
+  バースト時もエラーにせず上限の速度で順に送信する
+- 同時実行数: ワーカーのPIDと期限付きのリースで管理（異常終了したワーカーの枠は自動で解放）。
+  空き枠はバックオフ付きのポーリングで確認するため、待機中のリクエストの取得順は到着順（FIFO）にはならない
+- 期限（queue_timeout）までに送信できない場合は RateLimitTimeout
+- 429 を受けた場合は penalize() で Retry-After の間、全ワーカーの送信を止める
+- ファイルロック・状態ファイルの読み書きはスレッドプールで実行し、イベントループを止めない
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows（開発環境）ではワーカープロセス内のみで制御
+    fcntl = None
+
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import settings
+from utils.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+_MIN_POLL_INTERVAL = 0.05
+_MAX_POLL_INTERVAL = 0.5
+
+
+class RateLimitTimeout(Exception):
+    """期限内に送信枠を確保できなかった"""
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def retry_after_seconds(headers: Mapping[str, str], default: float = 1.0) -> float:
+    """Retry-After（秒またはHTTP日付）・retry-after-ms ヘッダーから待機秒数を取得"""
+    milliseconds = headers.get('retry-after-ms')
+    if milliseconds:
+        try:
+            return max(0.0, float(milliseconds) / 1000)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class SharedRateLimiter:
+    """ワーカー間で共有するレート制限・同時実行数制御
+
+    rate_per_minute・max_concurrency が0以下の場合はそれぞれ制限しない（両方0なら何もしない）
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float,
+        burst: int,
+        max_concurrency: int,
+        queue_timeout: float,
+        lease_seconds: float,
+        state_dir: str,
+    ):
+        self.name = name
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self.burst = max(1, burst)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.lease_seconds = lease_seconds
+        self.state_dir = state_dir
+        self.path = os.path.join(state_dir, f"{name}.json")
+        self._thread_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0 or self.max_concurrency > 0
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Any]]:
+        """状態ファイルを排他ロックして読み込み、with ブロックの終了時に書き戻す"""
+        with self._thread_lock:
+            os.makedirs(self.state_dir, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'r+', encoding='utf-8') as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    logger.warning("レート制限の状態ファイルが壊れているため初期化します: %s", self.path)
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            # ファイルを閉じるとロックも解放される
+
+    def _reserve(self, deadline: float) -> Optional[float]:
+        """送信時刻を予約して返す（期限までに送信できない場合は予約せずNone）"""
+        with self._locked_state() as state:
+            now = time.time()
+            tat = max(state.get('tat', 0.0), now)
+            start_at = max(tat - (self.burst - 1) * self.interval, state.get('blocked_until', 0.0), now)
+            if start_at > deadline:
+                return None
+            state['tat'] = max(tat, start_at) + self.interval
+            return start_at
+
+    def _try_lease(self) -> Optional[str]:
+        """同時実行の枠が空いていればリースIDを返す"""
+        pid = os.getpid()
+        with self._locked_state() as state:
+            now = time.time()
+            leases = {
+                lease_id: (owner, expires_at)
+                for lease_id, (owner, expires_at) in state.get('leases', {}).items()
+                if expires_at > now and (owner == pid or _process_alive(owner))
+            }
+            lease_id = None
+            if len(leases) < self.max_concurrency:
+                lease_id = uuid.uuid4().hex
+                leases[lease_id] = (pid, now + self.lease_seconds)
+            state['leases'] = leases
+            return lease_id
+
+    def _release(self, lease_id: str) -> None:
+        with self._locked_state() as state:
+            state.get('leases', {}).pop(lease_id, None)
+
+    def _block_until(self, blocked_until: float) -> None:
+        with self._locked_state() as state:
+            state['blocked_until'] = max(state.get('blocked_until', 0.0), blocked_until)
+
+    async def penalize(self, seconds: float) -> None:
+        """429などで指定秒数の送信停止を全ワーカーに反映"""
+        if not self.enabled or seconds <= 0:
+            return
+        await run_in_threadpool(self._block_until, time.time() + seconds)
+        logger.warning("%s: レート制限を受けたため %.1f秒間送信を停止します", self.name, seconds)
+
+    @asynccontextmanager
+    async def limit(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """送信枠を確保してから with ブロックを実行（待機中はイベントループを止めない）"""
+        if not self.enabled:
+            yield
+            return
+        wait_limit = self.queue_timeout if timeout is None else timeout
+        deadline = time.time() + wait_limit
+        lease_id = None
+        with stage_timer(f"{self.name}.rate_limit_wait"):
+            if self.interval > 0:
+                start_at = await run_in_threadpool(self._reserve, deadline)
+                if start_at is None:
+                    raise RateLimitTimeout(f"{self.name}: 送信待ちが{wait_limit:g}秒を超えます")
+                await asyncio.sleep(max(0.0, start_at - time.time()))
+            if self.max_concurrency > 0:
+                poll_interval = _MIN_POLL_INTERVAL
+                while (lease_id := await run_in_threadpool(self._try_lease)) is None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"{self.name}: 同時実行数の上限（{self.max_concurrency}）で{wait_limit:g}秒待機しました")
+                    await asyncio.sleep(min(poll_interval, remaining))
+                    poll_interval = min(poll_interval * 2, _MAX_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            if lease_id is not None:
+                # キャンセルされても枠を解放し切る（解放できないとリースの期限まで枠が埋まったままになる）
+                await asyncio.shield(run_in_threadpool(self._release, lease_id))
+
+
+image_generation_limiter = SharedRateLimiter(
+    name='image',
+    rate_per_minute=settings.IMAGE_RATE_LIMIT_PER_MINUTE,
+    burst=settings.IMAGE_RATE_LIMIT_BURST,
+    max_concurrency=settings.IMAGE_MAX_CONCURRENCY,
+    queue_timeout=settings.IMAGE_RATE_LIMIT_QUEUE_SECONDS,
+    lease_seconds=settings.IMAGE_TIMEOUT + 30,
+    state_dir=settings.RATE_LIMIT_STATE_DIR,
+)
+
+
+def llm_rate_limiter(provider: str) -> SharedRateLimiter:
+    """LLMプロバイダーごとのレート制限（アカウント・デプロイごとに上限が異なるため別々に管理）"""
+    return SharedRateLimiter(
+        name=f'llm.{provider}',
+        rate_per_minute=settings.LLM_RATE_LIMIT_PER_MINUTE,
+        burst=settings.LLM_RATE_LIMIT_BURST,
+        max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        queue_timeout=settings.LLM_RATE_LIMIT_QUEUE_SECONDS,
+        lease_seconds=settings.LLM_TIMEOUT + 30,
+        state_dir=settings.RATE_LIMIT_STATE_DIR,
+    )
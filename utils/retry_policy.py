@@ -0,0 +1,208 @@
+"""
+外部API（LLM・画像生成）呼び出しのリトライポリシー
+
+- 指数バックオフ＋フルジッター（Retry-After / retry-after-ms ヘッダーがあればその秒数を優先）
+- リトライ予算: 通常の呼び出しごとに ratio 分だけ貯まるトークンを1回のリトライで1消費する
+  （障害時にリトライが殺到して負荷を増幅させないよう、リトライ量を呼び出し数の一定割合に抑える。ワーカープロセス単位）
+- ヘッジ: 直近のレイテンシの p95 を超えても応答がない場合に同じリクエストをもう1本送り、先に成功した方を使う
+- 全体の期限（deadline）を超える待機・再試行は行わない
+- 再試行する例外はポリシーごとに指定する（画像生成は読み取りタイムアウトを再試行しない）
+"""
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, FrozenSet, Optional, Tuple, Type
+
+import requests
+
+from config.settings import settings
+from utils.metrics import record_retry
+from utils.rate_limiter import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# 1回分の送信（引数はこの試行に使えるタイムアウト秒数）
+Attempt = Callable[[float], Awaitable[requests.Response]]
+
+RETRYABLE_STATUSES: FrozenSet[int] = frozenset({408, 429, 500, 502, 503, 504})
+RETRYABLE_EXCEPTIONS: Tuple[Type[BaseException], ...] = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+# 接続前の失敗のみ（ConnectTimeout は ConnectionError のサブクラス。ReadTimeout は含まない）
+CONNECT_EXCEPTIONS: Tuple[Type[BaseException], ...] = (requests.exceptions.ConnectionError,)
+
+
+class RetryBudget:
+    """呼び出し数に対するリトライの割合を制限するトークンバケット（スレッドセーフ）"""
+
+    def __init__(self, ratio: float, min_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max(min_tokens, 1.0)
+        self._tokens = self.max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class LatencyWindow:
+    """直近の成功したリクエストのレイテンシ（ヘッジの待ち時間の算出用）"""
+
+    def __init__(self, size: int = 200):
+        self._values: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentile(self, ratio: float, min_samples: int = 20) -> Optional[float]:
+        """サンプルが min_samples 未満の場合はNone"""
+        with self._lock:
+            values = sorted(self._values)
+        if len(values) < min_samples:
+            return None
+        return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+@dataclass
+class RetryPolicy:
+    """エンドポイントごとのリトライ設定（stage はメトリクスの処理段階名）"""
+    stage: str
+    max_attempts: int
+    attempt_timeout: float
+    deadline: float
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    budget: RetryBudget = field(default_factory=lambda: RetryBudget(0.2, 10))
+    hedge: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 2.0
+    latencies: LatencyWindow = field(default_factory=LatencyWindow)
+    retryable_exceptions: Tuple[Type[BaseException], ...] = RETRYABLE_EXCEPTIONS
+
+    def backoff(self, retry: int) -> float:
+        """retry 回目（0始まり）のリトライ前の待機秒数（フルジッター）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    def is_retryable(self, outcome: object) -> bool:
+        if isinstance(outcome, BaseException):
+            return isinstance(outcome, self.retryable_exceptions)
+        return outcome.status_code in RETRYABLE_STATUSES
+
+    def hedge_delay(self) -> Optional[float]:
+        """ヘッジを送るまでの待ち時間（計測が足りない間はヘッジしない）"""
+        if not self.hedge:
+            return None
+        observed = self.latencies.percentile(self.hedge_percentile)
+        if observed is None:
+            return None
+        return max(self.hedge_min_delay, observed)
+
+
+async def _timed_attempt(policy: RetryPolicy, attempt: Attempt, timeout: float) -> requests.Response:
+    started_at = time.monotonic()
+    response = await attempt(timeout)
+    if response.ok:
+        policy.latencies.add(time.monotonic() - started_at)
+    return response
+
+
+async def _hedged_attempt(policy: RetryPolicy, attempt: Attempt, timeout: float) -> requests.Response:
+    """1回分の試行。hedge_delay を過ぎても応答がなければもう1本送り、先に成功した方を返す"""
+    delay = policy.hedge_delay()
+    if delay is None or delay >= timeout:
+        return await _timed_attempt(policy, attempt, timeout)
+
+    first = asyncio.ensure_future(_timed_attempt(policy, attempt, timeout))
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done or not policy.budget.try_withdraw():
+        return await first
+
+    record_retry(f"{policy.stage}.hedge")
+    logger.debug("%s: %.2f秒応答がないためヘッジリクエストを送信", policy.stage, delay)
+    second = asyncio.ensure_future(_timed_attempt(policy, attempt, max(timeout - delay, 0.1)))
+    pending = {first, second}
+    last = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task
+                if task.exception() is None and not policy.is_retryable(task.result()):
+                    return task.result()
+        return last.result()
+    finally:
+        # 送信中のHTTPリクエスト自体は止まらないが、結果は使わない
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_retry(policy: RetryPolicy, attempt: Attempt) -> requests.Response:
+    """ポリシーに従って attempt を再試行し、最後の応答を返す（リトライ対象外・上限到達時はそのまま返す／送出する）"""
+    policy.budget.deposit()
+    deadline = time.monotonic() + policy.deadline
+    retry = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        timeout = max(0.1, min(policy.attempt_timeout, remaining))
+        try:
+            outcome = await _hedged_attempt(policy, attempt, timeout)
+        except policy.retryable_exceptions as e:
+            outcome = e
+
+        if not policy.is_retryable(outcome) or retry + 1 >= policy.max_attempts:
+            break
+        headers = outcome.headers if isinstance(outcome, requests.Response) else {}
+        wait = retry_after_seconds(headers, default=policy.backoff(retry))
+        if time.monotonic() + wait >= deadline:
+            logger.warning("%s: 期限（%s秒）内に再試行できないため中止します", policy.stage, policy.deadline)
+            break
+        if not policy.budget.try_withdraw():
+            logger.warning("%s: リトライ予算が不足しているため再試行しません", policy.stage)
+            break
+
+        reason = outcome.status_code if isinstance(outcome, requests.Response) else type(outcome).__name__
+        logger.info("%s: %sのため%.2f秒後に再試行します（%s/%s回目）", policy.stage, reason, wait, retry + 2, policy.max_attempts)
+        record_retry(policy.stage)
+        await asyncio.sleep(wait)
+        retry += 1
+
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
+
+
+llm_retry_policy = RetryPolicy(
+    stage='llm.chat_completion',
+    max_attempts=settings.LLM_MAX_ATTEMPTS,
+    attempt_timeout=settings.LLM_TIMEOUT,
+    deadline=settings.LLM_RETRY_DEADLINE,
+    base_delay=settings.RETRY_BASE_DELAY,
+    max_delay=settings.RETRY_MAX_DELAY,
+    budget=RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MIN_TOKENS),
+    hedge=settings.LLM_HEDGE_ENABLED,
+    hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+    hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY,
+)
+image_retry_policy = RetryPolicy(
+    stage='image.generation',
+    max_attempts=settings.IMAGE_MAX_ATTEMPTS,
+    attempt_timeout=settings.IMAGE_TIMEOUT,
+    deadline=settings.IMAGE_RETRY_DEADLINE,
+    base_delay=settings.RETRY_BASE_DELAY,
+    max_delay=settings.RETRY_MAX_DELAY,
+    budget=RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MIN_TOKENS),
+    # 読み取りタイムアウトは画像の生成が続いている（課金される）可能性が高く、残り時間での再試行も間に合わないため再試行しない
+    retryable_exceptions=CONNECT_EXCEPTIONS,
+)
@@ -1,22 +1,24 @@
 """
 テキスト処理ユーティリティ
 """
+import logging
 import os
 import re
 import json
-import random
 from pathlib import Path
 from typing import List, Dict, Optional
 
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 
 def load_syrup_info_txt() -> Dict[str, str]:
     """syrup.txtファイルからシロップ情報を読み込む"""
     try:
         syrup_file = Path(settings.SYRUP_INFO_FILE)
         if not syrup_file.exists():
-            print(f"[WARNING] {settings.SYRUP_INFO_FILE}が見つかりません")
+            logger.warning("%sが見つかりません", settings.SYRUP_INFO_FILE)
             return {}
             
         with syrup_file.open('r', encoding='utf-8') as f:
@@ -31,13 +33,13 @@ def load_syrup_info_txt() -> Dict[str, str]:
             if line in syrup_names:
                 if i + 1 < len(lines):
                     syrup_dict[line] = lines[i + 1]
-                    print(f"[DEBUG] シロップ登録: {line} -> {lines[i + 1][:50]}...")
+                    logger.debug("シロップ登録: %s -> %s...", line, lines[i + 1][:50])
                     
-        print(f"[DEBUG] シロップ情報読み込み完了: {len(syrup_dict)}種類")
+        logger.debug("シロップ情報読み込み完了: %s種類", len(syrup_dict))
         return syrup_dict
         
     except Exception as e:
-        print(f"[ERROR] シロップ情報読み込みエラー: {e}")
+        logger.error("シロップ情報読み込みエラー: %s", e)
         return {}
 
 
@@ -46,17 +48,17 @@ def load_fusion_filter_words() -> List[str]:
     try:
         filter_file = Path(settings.FILTER_WORDS_FILE)
         if not filter_file.exists():
-            print(f"[WARNING] {settings.FILTER_WORDS_FILE}が見つかりません")
+            logger.warning("%sが見つかりません", settings.FILTER_WORDS_FILE)
             return []
             
         with filter_file.open('r', encoding='utf-8') as f:
             words = [line.strip() for line in f if line.strip()]
             
-        print(f"[DEBUG] フィルター単語読み込み完了: {len(words)}語")
+        logger.debug("フィルター単語読み込み完了: %s語", len(words))
         return words
         
     except Exception as e:
-        print(f"[ERROR] フィルター単語読み込みエラー: {e}")
+        logger.error("フィルター単語読み込みエラー: %s", e)
         return []
 
 
@@ -78,7 +80,7 @@ def is_generic_name(name: str) -> bool:
     
     for pattern in generic_patterns:
         if re.match(pattern, name):
-            print(f"[DEBUG] 汎用名パターンにマッチ: {name} -> {pattern}")
+            logger.debug("汎用名パターンにマッチ: %s -> %s", name, pattern)
             return True
     
     return False
@@ -86,12 +88,12 @@ def is_generic_name(name: str) -> bool:
 def validate_cocktail_name(name: str, filter_words: List[str]) -> bool:
     """カクテル名がフィルター単語に引っかからないかチェック"""
     if not name:
-        print("[DEBUG] 空の名前は無効")
+        logger.debug("空の名前は無効")
         return False
     
     # 1. 汎用名チェック（新規追加）
     if is_generic_name(name):
-        print(f"[DEBUG] 汎用名として拒否: {name}")
+        logger.debug("汎用名として拒否: %s", name)
         return False
     
     # 2. フィルター単語チェック（既存ロジック）
@@ -101,10 +103,10 @@ def validate_cocktail_name(name: str, filter_words: List[str]) -> bool:
     name_lower = name.lower()
     for word in filter_words:
         if word.lower() in name_lower:
-            print(f"[DEBUG] フィルター単語にマッチ: {name} -> 単語: {word}")
+            logger.debug("フィルター単語にマッチ: %s -> 単語: %s", name, word)
             return False
     
-    print(f"[DEBUG] カクテル名検証通過: {name}")
+    logger.debug("カクテル名検証通過: %s", name)
     return True
 
 
@@ -163,26 +165,17 @@ def extract_json_from_text(text: str) -> Optional[Dict]:
         return json.loads(json_str)
         
     except Exception as e:
-        print(f"[ERROR] JSON抽出エラー: {e}")
+        logger.error("JSON抽出エラー: %s", e)
         return None
 
 
 def generate_order_id() -> Optional[str]:
-    """6桁のランダム注文IDを生成（重複チェック付き）"""
-    from db import database as dbmodule
-    
-    for attempt in range(settings.MAX_ORDER_ID_ATTEMPTS):
-        order_id = str(random.randint(settings.ORDER_ID_MIN, settings.ORDER_ID_MAX))
-        
-        # DBに同じorder_idが存在しないかチェック
-        if not dbmodule.get_cocktail_by_order_id(order_id):
-            print(f"[DEBUG] 注文ID生成完了: {order_id} (試行{attempt+1}回)")
-            return order_id
-            
-        print(f"[DEBUG] 注文ID重複 (試行{attempt+1}): {order_id}")
+    """6桁の注文IDを生成（DBシーケンス + 置換による採番、重複は挿入時の一意制約で検出）"""
+    from utils.order_id_allocator import get_order_id_allocator
     
-    print(f"[ERROR] {settings.MAX_ORDER_ID_ATTEMPTS}回試行しても注文IDが生成できませんでした")
-    return None
+    order_id = get_order_id_allocator().next_order_id()
+    logger.debug("注文ID生成完了: %s", order_id)
+    return order_id
 
 
 def regenerate_cocktail_name_with_mini_llm(
@@ -191,7 +184,7 @@ def regenerate_cocktail_name_with_mini_llm(
 ) -> Optional[str]:
     """ミニLLMを使用してカクテル名を再生成（改善版）"""
     try:
-        print("[DEBUG] 簡易再生成開始 - 汎用名回避版")
+        logger.debug("簡易再生成開始 - 汎用名回避版")
         
         # コンセプトや色から創造的な単語を抽出
         concept = cocktail_data.get('concept', '')
@@ -229,22 +222,22 @@ def regenerate_cocktail_name_with_mini_llm(
         # ランダムに並び替え
         random.shuffle(candidates)
         
-        print(f"[DEBUG] 生成した候補: {len(candidates)}個")
+        logger.debug("生成した候補: %s個", len(candidates))
         
         # 各候補をテスト
         for candidate in candidates:
-            print(f"[DEBUG] 候補テスト: {candidate}")
+            logger.debug("候補テスト: %s", candidate)
             if validate_cocktail_name(candidate, filter_words):
-                print(f"[DEBUG] 簡易再生成成功: {candidate}")
+                logger.debug("簡易再生成成功: %s", candidate)
                 return candidate
             else:
-                print(f"[DEBUG] 候補拒否: {candidate}")
+                logger.debug("候補拒否: %s", candidate)
                 
-        print("[DEBUG] 全ての候補が拒否されました")
+        logger.debug("全ての候補が拒否されました")
         return None
         
     except Exception as e:
-        print(f"[ERROR] カクテル名再生成エラー: {e}")
+        logger.error("カクテル名再生成エラー: %s", e)
         return None
 
 
@@ -276,19 +269,19 @@ def regenerate_name_with_alternative_prompt(
 名前:"""
     
     try:
-        print(f"[DEBUG] 別プロンプトでAPI呼び出し開始")
+        logger.debug("別プロンプトでAPI呼び出し開始")
         result = generate_chat_completion_direct(prompt, temperature=0.9)
-        print(f"[DEBUG] API結果: {result.get('result', 'N/A')}")
+        logger.debug("API結果: %s", result.get('result', 'N/A'))
         if result["result"] == "success":
             new_name = result["content"].strip().strip('"').strip('「').strip('」')
-            print(f"[DEBUG] 生成された候補名: {new_name}")
+            logger.debug("生成された候補名: %s", new_name)
             # 生成された名前も検証
             if validate_cocktail_name(new_name, filter_words):
-                print(f"[DEBUG] 候補名が検証を通過: {new_name}")
+                logger.debug("候補名が検証を通過: %s", new_name)
                 return new_name
             else:
-                print(f"[DEBUG] 候補名が検証に失敗: {new_name}")
+                logger.debug("候補名が検証に失敗: %s", new_name)
     except Exception as e:
-        print(f"[ERROR] 別プロンプトでの名前再生成エラー: {e}")
+        logger.error("別プロンプトでの名前再生成エラー: %s", e)
     
     return None
\ No newline at end of file
@@ -0,0 +1,395 @@
+"""
+リクエスト単位のトレース（OpenTelemetry形式のスパン）
+
+- スパンは contextvars で親子関係を引き継ぎ、バックグラウンドスレッドでまとめて出力する
+- 出力先は TRACING_EXPORTER で選択（none / jsonl / otlp）
+  - jsonl: TRACING_JSONL_PATH に1行1スパンで追記
+  - otlp: TRACING_OTLP_ENDPOINT（OTLP/HTTP JSON、例: http://localhost:4318）へ送信
+- Supabase（PostgREST・Storage）のHTTPリクエストは instrument_httpx_client でスパン化する
+"""
+import os
+import json
+import time
+import queue
+import random
+import inspect
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_KIND_CODES = {'internal': 1, 'server': 2, 'client': 3}
+
+
+class Span:
+    """1つの処理区間（開始・終了時刻、属性、ステータス）"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'status', 'status_message')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str = 'internal'):
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status = 'UNSET'
+        self.status_message = ''
+
+    @property
+    def is_recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def increment_attribute(self, key: str, amount: int = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def set_error(self, message: str) -> None:
+        self.status = 'ERROR'
+        self.status_message = message
+
+    def set_http_status(self, status_code: int) -> None:
+        """HTTPステータスを記録（4xx/5xxはエラー扱い）"""
+        self.attributes['http.status_code'] = status_code
+        if status_code >= 400:
+            self.set_error(f"HTTP {status_code}")
+
+    def traceparent(self) -> str:
+        """W3C traceparent ヘッダー値"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'status': self.status,
+            'status_message': self.status_message,
+            'service': settings.TRACING_SERVICE_NAME,
+            'process': os.getpid(),
+        }
+
+
+class _NonRecordingSpan:
+    """トレース無効時・サンプリング対象外のスパン（何も記録しない）"""
+
+    is_recording = False
+    trace_id = ''
+    span_id = ''
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def increment_attribute(self, key: str, amount: int = 1) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+    def set_http_status(self, status_code: int) -> None:
+        pass
+
+    def traceparent(self) -> str:
+        return ''
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+_current_span: contextvars.ContextVar[Any] = contextvars.ContextVar('current_span', default=None)
+
+
+class JsonlExporter:
+    """スパンをJSONLファイルに追記"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + '\n')
+
+
+class OtlpHttpExporter:
+    """スパンをOTLP/HTTP（JSONエンコード）でコレクターへ送信"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        return {'key': key, 'value': typed}
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        otlp_span = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': _KIND_CODES.get(span.kind, 1),
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns or span.start_ns),
+            'attributes': [self._attribute(k, v) for k, v in span.attributes.items()],
+            'status': {'code': 2 if span.status == 'ERROR' else 0, 'message': span.status_message},
+        }
+        if span.parent_id:
+            otlp_span['parentSpanId'] = span.parent_id
+        return otlp_span
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    self._attribute('service.name', settings.TRACING_SERVICE_NAME),
+                    self._attribute('process.pid', os.getpid()),
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': 'ai-bartender.tracing'},
+                    'spans': [self._span(span) for span in spans],
+                }],
+            }]
+        }
+        self._session.post(self.url, json=payload, timeout=self.timeout)
+
+
+class BatchSpanProcessor:
+    """終了したスパンをキューに入れ、バックグラウンドスレッドでまとめて出力"""
+
+    def __init__(self, exporter: Any, max_batch_size: int = 256, flush_interval: float = 2.0, max_queue_size: int = 10000):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._start()
+        # gunicorn(preload_app)のfork後は出力スレッドが子プロセスに引き継がれないため作り直す
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start)
+
+    def _start(self) -> None:
+        self._queue: "queue.Queue[Span]" = queue.Queue(self.max_queue_size)
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # 出力が追いつかない場合は捨てる（リクエスト処理を止めない）
+            pass
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning("スパン出力エラー（%s件破棄）: %s", len(batch), e)
+
+
+def _build_processor() -> Optional[BatchSpanProcessor]:
+    exporter_name = (settings.TRACING_EXPORTER or 'none').lower()
+    if exporter_name == 'jsonl':
+        return BatchSpanProcessor(JsonlExporter(settings.TRACING_JSONL_PATH))
+    if exporter_name == 'otlp':
+        return BatchSpanProcessor(OtlpHttpExporter(settings.TRACING_OTLP_ENDPOINT))
+    return None
+
+
+_processor = _build_processor()
+
+
+def tracing_enabled() -> bool:
+    return _processor is not None
+
+
+def current_span() -> Any:
+    """現在のスパン（スパン外・トレース無効時は記録しないスパン）"""
+    return _current_span.get() or NON_RECORDING_SPAN
+
+
+def _parse_traceparent(traceparent: Optional[str]) -> Optional[tuple]:
+    """W3C traceparent ヘッダーから (trace_id, parent_span_id) を取得"""
+    if not traceparent:
+        return None
+    parts = traceparent.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: str = 'internal',
+    traceparent: Optional[str] = None,
+) -> Iterator[Any]:
+    """スパンを開始し、with ブロックの間は現在のスパンにする（例外時はエラーとして記録）"""
+    parent = _current_span.get()
+    if _processor is None or parent is NON_RECORDING_SPAN:
+        yield NON_RECORDING_SPAN
+        return
+
+    if parent is None:
+        remote = _parse_traceparent(traceparent)
+        if remote:
+            trace_id, parent_id = remote
+        else:
+            # ルートスパンでサンプリングを判定し、子スパンは親に従う
+            if random.random() >= settings.TRACING_SAMPLE_RATIO:
+                token = _current_span.set(NON_RECORDING_SPAN)
+                try:
+                    yield NON_RECORDING_SPAN
+                finally:
+                    _current_span.reset(token)
+                return
+            trace_id, parent_id = '%032x' % random.getrandbits(128), None
+    else:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+
+    span = Span(name, trace_id, parent_id, kind)
+    if attributes:
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        _processor.on_end(span)
+
+
+def traced(name: str) -> Callable:
+    """関数全体をスパンにするデコレータ（同期・非同期・ジェネレータ関数に対応）"""
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with start_span(name):
+                    yield from func(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def set_attributes(**attributes: Any) -> None:
+    """現在のスパンに属性を設定"""
+    span = current_span()
+    for key, value in attributes.items():
+        span.set_attribute(key, value)
+
+
+class TracingTransport(httpx.BaseTransport):
+    """httpxのリクエストごとにクライアントスパンを作るトランスポート"""
+
+    def __init__(self, transport: httpx.BaseTransport, component: str):
+        self._transport = transport
+        self._component = component
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not tracing_enabled():
+            return self._transport.handle_request(request)
+        # クエリ文字列にはフィルター値（IPアドレス等）が含まれるためパスのみ記録
+        attributes = {
+            'component': self._component,
+            'http.method': request.method,
+            'http.host': request.url.host,
+            'http.path': request.url.path,
+        }
+        with start_span(f"{self._component} {request.method} {request.url.path}", attributes, kind='client') as span:
+            response = self._transport.handle_request(request)
+            span.set_http_status(response.status_code)
+            return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def instrument_httpx_client(client: Optional[httpx.Client], component: str) -> bool:
+    """httpx.Client のトランスポートを TracingTransport で包む（Supabase SDK内部のクライアント用）
+
+    SDKの内部属性に依存するため、構造が変わっていた場合は計装せずに警告のみ出す（起動は止めない）
+    """
+    transport = getattr(client, '_transport', None)
+    if not isinstance(client, httpx.Client) or not isinstance(transport, httpx.BaseTransport):
+        logger.warning("%s のHTTPクライアントを計装できないためトレースを省略します（SDKの内部構造が変更された可能性）", component)
+        return False
+    if not isinstance(transport, TracingTransport):
+        client._transport = TracingTransport(transport, component)
+    return True
+
+
+@contextmanager
+def http_client_span(component: str, method: str, url: str, **attributes: Any) -> Iterator[Any]:
+    """requests による外部API呼び出しのスパン（with ブロック内で set_http_status を呼ぶ）"""
+    parsed = urlsplit(url)
+    span_attributes = {
+        'component': component,
+        'http.method': method,
+        'http.host': parsed.hostname,
+        'http.path': parsed.path,
+    }
+    span_attributes.update(attributes)
+    with start_span(f"{component} {method} {parsed.path}", span_attributes, kind='client') as span:
+        yield span
@@ -1,11 +1,14 @@
 """
 バリデーション関連ユーティリティ
 """
+import logging
 from typing import Dict, List, Optional
 from fastapi import Request
 
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 
 def get_client_ip(request: Request) -> str:
     """クライアントIPアドレスを取得"""
@@ -41,7 +44,7 @@ def validate_recipe_ratios(recipe: List[Dict[str, str]]) -> bool:
         return total == 100
         
     except Exception as e:
-        print(f"[ERROR] レシピ比率検証エラー: {e}")
+        logger.error("レシピ比率検証エラー: %s", e)
         return False
 
 
@@ -80,5 +83,5 @@ def validate_survey_response(response_data: Dict) -> bool:
         return bool(has_answer)
         
     except Exception as e:
-        print(f"[ERROR] アンケート回答検証エラー: {e}")
+        logger.error("アンケート回答検証エラー: %s", e)
         return False
\ No newline at end of file